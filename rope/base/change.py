@@ -1,9 +1,17 @@
 import datetime
 import difflib
 import os
+import stat
+import sys
+import tempfile
 import time
 import warnings
 
+try:
+    from multiprocessing.pool import ThreadPool
+except ImportError:
+    ThreadPool = None
+
 import rope.base.fscommands
 from rope.base import taskhandle, exceptions, utils
 
@@ -60,37 +68,101 @@ class ChangeSet(Change):
         self.time = timestamp
 
     def do(self, job_set=taskhandle.NullJobSet()):
+        operations = self._get_operations()
+        operations.start_batch()
         try:
             done = []
-            for change in self.changes:
-                change.do(job_set)
-                done.append(change)
-            self.time = time.time()
-        except Exception:
-            for change in done:
-                change.undo()
-            raise
+            try:
+                for change in self._get_steps(operations, self.changes):
+                    change.do(job_set)
+                    done.append(change)
+                self.time = time.time()
+            except Exception:
+                for change in reversed(done):
+                    change.undo()
+                raise
+        finally:
+            operations.end_batch()
 
     def undo(self, job_set=taskhandle.NullJobSet()):
+        operations = self._get_operations()
+        operations.start_batch()
         try:
             done = []
-            for change in reversed(self.changes):
-                change.undo(job_set)
-                done.append(change)
-        except Exception:
-            for change in done:
-                change.do()
-            raise
+            try:
+                for change in self._get_steps(operations,
+                                              reversed(self.changes)):
+                    change.undo(job_set)
+                    done.append(change)
+            except Exception:
+                for change in reversed(done):
+                    change.do()
+                raise
+        finally:
+            operations.end_batch()
+
+    def _get_operations(self):
+        for resource in self.get_changed_resources():
+            return _ResourceOperations(resource.project)
+        return _ResourceOperations(None)
+
+    def _get_steps(self, operations, changes):
+        """Group consecutive `ChangeContents` into `_WriteGroup`\s"""
+        if not operations.transactional:
+            return list(changes)
+        result = []
+        group = []
+        resources = set()
+        for change in changes:
+            stage = isinstance(change, ChangeContents) and \
+                operations.can_stage(change.resource)
+            if stage and change.resource not in resources:
+                group.append(change)
+                resources.add(change.resource)
+                continue
+            if group:
+                result.append(_WriteGroup(operations, group))
+                group = []
+                resources = set()
+            if stage:
+                group.append(change)
+                resources.add(change.resource)
+            else:
+                result.append(change)
+        if group:
+            result.append(_WriteGroup(operations, group))
+        return result
 
     def add_change(self, change):
         self.changes.append(change)
 
     def get_description(self):
-        result = [str(self) + ':\n\n\n']
-        for change in self.changes:
-            result.append(change.get_description())
-            result.append('\n')
-        return ''.join(result)
+        return ''.join(self.iter_descriptions())
+
+    def iter_descriptions(self, context=3, max_changes=None):
+        """Generate the description of this change set piece by piece
+
+        The description of each change is made when it is needed, so
+        previews can be shown before all of the diffs are computed.
+        `context` is the number of context lines in file diffs.  If
+        `max_changes` is not `None`, only that many changes are
+        described and a line saying how many were left out follows.
+
+        """
+        yield str(self) + ':\n\n\n'
+        for index, change in enumerate(self.changes):
+            if max_changes is not None and index >= max_changes:
+                yield '... and %s more changes\n' % \
+                      (len(self.changes) - index)
+                break
+            if isinstance(change, ChangeSet):
+                for description in change.iter_descriptions(context):
+                    yield description
+            elif isinstance(change, ChangeContents):
+                yield change.get_description(context)
+            else:
+                yield change.get_description()
+            yield '\n'
 
     def __str__(self):
         if self.time is not None:
@@ -159,7 +231,7 @@ class ChangeContents(Change):
     def __str__(self):
         return 'Change <%s>' % self.resource.path
 
-    def get_description(self):
+    def get_description(self, context=3):
         new = self.new_contents
         old = self.old_contents
         if old is None:
@@ -167,10 +239,10 @@ class ChangeContents(Change):
                 old = self.resource.read()
             else:
                 old = ''
-        result = difflib.unified_diff(
+        result = _unified_diff(
             old.splitlines(True), new.splitlines(True),
-            'a/' + self.resource.path, 'b/' + self.resource.path)
-        return ''.join(list(result))
+            'a/' + self.resource.path, 'b/' + self.resource.path, context)
+        return ''.join(result)
 
     def get_changed_resources(self):
         return [self.resource]
@@ -300,6 +372,153 @@ class RemoveResource(Change):
         return [self.resource]
 
 
+class _WriteGroup(object):
+    """Performs several `ChangeContents` as a single step
+
+    The files are written using `_ResourceOperations.write_files()`;
+    either all of them are changed or none of them.
+
+    """
+
+    def __init__(self, operations, changes):
+        self.operations = operations
+        self.changes = changes
+
+    def do(self, job_set=taskhandle.NullJobSet()):
+        for change in self.changes:
+            if change.old_contents is None:
+                change.old_contents = change.resource.read()
+        self.operations.write_files(
+            [(change.resource, change.new_contents, change.old_contents)
+             for change in self.changes], job_set)
+
+    def undo(self, job_set=taskhandle.NullJobSet()):
+        for change in self.changes:
+            if change.old_contents is None:
+                raise exceptions.HistoryError(
+                    'Undoing a change that is not performed yet!')
+        self.operations.write_files(
+            [(change.resource, change.old_contents, change.new_contents)
+             for change in self.changes], job_set)
+
+
+def _unified_diff(old_lines, new_lines, old_name, new_name, context=3):
+    """Like `difflib.unified_diff()` but faster for small edits"""
+    started = False
+    for group in _group_opcodes(_get_opcodes(old_lines, new_lines), context):
+        if not started:
+            started = True
+            yield '--- %s\n' % old_name
+            yield '+++ %s\n' % new_name
+        first, last = group[0], group[-1]
+        yield '@@ -%s +%s @@\n' % (_format_range(first[1], last[2]),
+                                   _format_range(first[3], last[4]))
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                for line in old_lines[i1:i2]:
+                    yield ' ' + line
+                continue
+            for line in old_lines[i1:i2]:
+                yield '-' + line
+            for line in new_lines[j1:j2]:
+                yield '+' + line
+
+
+def _get_opcodes(old_lines, new_lines, max_lines=None):
+    """Return `difflib.SequenceMatcher.get_opcodes()` like tuples
+
+    Common leading and trailing lines are not passed to
+    `difflib.SequenceMatcher`.  When the remaining lines of both are
+    the same in number and mostly equal, as is usual for renames,
+    they are compared line by line.  If `max_lines` is not `None`
+    and more lines remain in either of them, they are reported as
+    replaced without matching them.
+
+    """
+    start = 0
+    end = min(len(old_lines), len(new_lines))
+    while start < end and old_lines[start] == new_lines[start]:
+        start += 1
+    old_end = len(old_lines)
+    new_end = len(new_lines)
+    while old_end > start and new_end > start and \
+          old_lines[old_end - 1] == new_lines[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    result = []
+    if start > 0:
+        result.append(('equal', 0, start, 0, start))
+    if old_end - start == new_end - start and \
+       _count_different(old_lines, new_lines, start, old_end) * 2 <= \
+       old_end - start:
+        line = start
+        while line < old_end:
+            equal = old_lines[line] == new_lines[line]
+            run = line + 1
+            while run < old_end and \
+                  (old_lines[run] == new_lines[run]) == equal:
+                run += 1
+            result.append(('equal' if equal else 'replace',
+                           line, run, line, run))
+            line = run
+    elif max_lines is not None and \
+         (old_end - start > max_lines or new_end - start > max_lines):
+        result.append(('replace', start, old_end, start, new_end))
+    elif start < old_end or start < new_end:
+        matcher = difflib.SequenceMatcher(None, old_lines[start:old_end],
+                                          new_lines[start:new_end])
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            result.append((tag, start + i1, start + i2,
+                           start + j1, start + j2))
+    if old_end < len(old_lines):
+        result.append(('equal', old_end, len(old_lines),
+                       new_end, len(new_lines)))
+    return result
+
+
+def _count_different(old_lines, new_lines, start, end):
+    result = 0
+    for index in xrange(start, end):
+        if old_lines[index] != new_lines[index]:
+            result += 1
+    return result
+
+
+def _group_opcodes(opcodes, context):
+    """Group opcodes like `difflib.SequenceMatcher.get_grouped_opcodes()`"""
+    if not opcodes:
+        opcodes = [('equal', 0, 1, 0, 1)]
+    opcodes = list(opcodes)
+    tag, i1, i2, j1, j2 = opcodes[0]
+    if tag == 'equal':
+        opcodes[0] = (tag, max(i1, i2 - context), i2,
+                      max(j1, j2 - context), j2)
+    tag, i1, i2, j1, j2 = opcodes[-1]
+    if tag == 'equal':
+        opcodes[-1] = (tag, i1, min(i2, i1 + context),
+                       j1, min(j2, j1 + context))
+    group = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal' and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context),
+                          j1, min(j2, j1 + context)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _format_range(start, stop):
+    length = stop - start
+    if length == 1:
+        return '%s' % (start + 1)
+    if not length:
+        start -= 1
+    return '%s,%s' % (start + 1, length)
+
+
 def count_changes(change):
     """Counts the number of basic changes a `Change` will make"""
     if isinstance(change, ChangeSet):
@@ -317,9 +536,111 @@ class _ResourceOperations(object):
 
     def __init__(self, project):
         self.project = project
-        self.fscommands = project.fscommands
+        self.fscommands = getattr(project, 'fscommands', None)
         self.direct_commands = rope.base.fscommands.FileSystemCommands()
 
+    def start_batch(self):
+        """Batch resource events and version control operations
+
+        See `rope.base.fscommands` module and `Project.batch_events()`.
+
+        """
+        if self.project is not None:
+            self.project.batch_events()
+        if hasattr(self.fscommands, 'start_batch'):
+            self.fscommands.start_batch()
+
+    def end_batch(self):
+        try:
+            if hasattr(self.fscommands, 'end_batch'):
+                self.fscommands.end_batch()
+        finally:
+            if self.project is not None:
+                self.project.flush_events()
+
+    @property
+    def transactional(self):
+        return self.project is not None and \
+            self.project.prefs.get('transactional_changes', False)
+
+    def can_stage(self, resource):
+        """Whether `write_files()` can write to `resource`
+
+        Only fscommands whose `write()` just writes the file are
+        bypassed; subclasses may override `write()`.
+
+        """
+        return type(self._get_fscommands(resource)) in _plain_writers
+
+    def write_files(self, files, job_set=taskhandle.NullJobSet()):
+        """Change the contents of several files at once
+
+        `files` is a list of ``(resource, contents, old_contents)``
+        tuples.  The contents are written to temporary files next to
+        the old ones, using a few threads, and are renamed over them
+        only when all of them are written.  Files that have hard
+        links, whose owner cannot be kept or whose folder does not
+        allow creating the temporary file are written in place after
+        that.  If that fails, the files that are changed already get
+        `old_contents` back.  Observers are informed after all files
+        are changed.
+
+        """
+        staged = []
+        error = None
+        # all results are read so that no temporary file is left behind
+        # `os.umask()` cannot be read without changing it; it is read
+        # before starting the threads
+        umask = _get_umask()
+        stage = lambda file_info: _stage_file(file_info, umask)
+        for resource, temp, exc_info in _map_threads(stage, files):
+            if exc_info is None:
+                staged.append((resource, temp))
+            if error is not None:
+                continue
+            try:
+                job_set.started_job('Change <%s>' % resource.path)
+                if exc_info is not None:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+                job_set.finished_job()
+            except:
+                error = sys.exc_info()
+        if error is not None:
+            for resource, temp in staged:
+                if temp is not None:
+                    _remove_quietly(temp)
+            raise error[0], error[1], error[2]
+        # the files written in place come last; they cannot be undone
+        # by removing a temporary file
+        staged.sort(key=lambda item: item[1] is None)
+        new_contents = dict((resource, new) for resource, new, old in files)
+        written = set()
+        try:
+            for resource, temp in staged:
+                if temp is not None:
+                    _replace(temp, _get_target(resource))
+                else:
+                    self._write_in_place(resource, new_contents[resource])
+                written.add(resource)
+        except:
+            old_contents = dict((resource, old)
+                                for resource, new, old in files)
+            for resource, temp in staged:
+                if resource in written:
+                    self._write_in_place(resource, old_contents[resource])
+                elif temp is not None:
+                    _remove_quietly(temp)
+            raise
+        self.project.batch_events()
+        for resource, temp in staged:
+            self.project._report_event('changed', resource)
+        self.project.flush_events()
+
+    def _write_in_place(self, resource, contents):
+        self.direct_commands.write(
+            resource.real_path,
+            rope.base.fscommands.unicode_to_file_data(contents))
+
     def _get_fscommands(self, resource):
         if self.project.is_ignored(resource):
             return self.direct_commands
@@ -329,28 +650,24 @@ class _ResourceOperations(object):
         data = rope.base.fscommands.unicode_to_file_data(contents)
         fscommands = self._get_fscommands(resource)
         fscommands.write(resource.real_path, data)
-        for observer in list(self.project.observers):
-            observer.resource_changed(resource)
+        self.project._report_event('changed', resource)
 
     def move(self, resource, new_resource):
         fscommands = self._get_fscommands(resource)
         fscommands.move(resource.real_path, new_resource.real_path)
-        for observer in list(self.project.observers):
-            observer.resource_moved(resource, new_resource)
+        self.project._report_event('moved', resource, new_resource)
 
     def create(self, resource):
         if resource.is_folder():
             self._create_resource(resource.path, kind='folder')
         else:
             self._create_resource(resource.path)
-        for observer in list(self.project.observers):
-            observer.resource_created(resource)
+        self.project._report_event('created', resource)
 
     def remove(self, resource):
         fscommands = self._get_fscommands(resource)
         fscommands.remove(resource.real_path)
-        for observer in list(self.project.observers):
-            observer.resource_removed(resource)
+        self.project._report_event('removed', resource)
 
     def _create_resource(self, file_name, kind='file'):
         resource_path = self.project._get_resource_path(file_name)
@@ -371,6 +688,120 @@ class _ResourceOperations(object):
             raise exceptions.RopeError(e)
 
 
+_plain_writers = (rope.base.fscommands.FileSystemCommands,
+                  rope.base.fscommands.SubversionCommands,
+                  rope.base.fscommands.MercurialCommands,
+                  rope.base.fscommands.GITCommands,
+                  rope.base.fscommands.DarcsCommands)
+
+
+def _stage_file(file_info, umask):
+    """Write the contents of a file to a temporary file beside it
+
+    Returns a ``(resource, temp_path, exc_info)`` tuple; either
+    `temp_path` or `exc_info` is `None`.  Both are `None` if the file
+    should be written in place: renaming a file over it would break
+    its hard links or change its owner, or the temporary file cannot
+    be created.
+    `umask` is the umask of the process.
+
+    """
+    resource, contents = file_info[:2]
+    temp = None
+    try:
+        data = rope.base.fscommands.unicode_to_file_data(contents)
+        path = _get_target(resource)
+        try:
+            info = os.stat(path)
+        except OSError:
+            info = None
+        if info is not None and info.st_nlink > 1:
+            return resource, None, None
+        mode = 0666 & ~umask
+        if info is not None:
+            mode = stat.S_IMODE(info.st_mode)
+        folder, name = os.path.split(path)
+        # the names are unique even if several resources are links to
+        # the same file
+        try:
+            fd, temp = tempfile.mkstemp(prefix='.%s.' % name,
+                                        suffix='.rope', dir=folder)
+        except OSError:
+            # the folder may not be writable while the file is
+            if info is None:
+                raise
+            return resource, None, None
+        output = os.fdopen(fd, 'wb')
+        try:
+            output.write(data)
+            temp_info = os.fstat(output.fileno())
+        finally:
+            output.close()
+        os.chmod(temp, mode)
+        if info is not None and \
+           (info.st_uid, info.st_gid) != (temp_info.st_uid, temp_info.st_gid):
+            try:
+                os.chown(temp, info.st_uid, info.st_gid)
+            except (OSError, AttributeError):
+                _remove_quietly(temp)
+                return resource, None, None
+    except Exception:
+        if temp is not None:
+            _remove_quietly(temp)
+        return resource, None, sys.exc_info()
+    return resource, temp, None
+
+
+def _map_threads(function, items, threads=8, minimum=32):
+    """Generate ``function(item)`` for `items` using a few threads
+
+    The results are generated in the order of `items`.  Starting
+    threads is not worth it for less than `minimum` items.
+
+    """
+    if ThreadPool is None or len(items) < minimum:
+        for item in items:
+            yield function(item)
+        return
+    pool = ThreadPool(min(threads, len(items)))
+    try:
+        for result in pool.imap(function, items):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _get_target(resource):
+    path = resource.real_path
+    if os.path.islink(path):
+        return os.path.realpath(path)
+    return path
+
+
+def _replace(temp, path):
+    if os.name == 'nt' and os.path.exists(path):
+        os.remove(path)
+    os.rename(temp, path)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_umask = None
+
+def _get_umask():
+    global _umask
+    if _umask is None:
+        _umask = os.umask(0)
+        os.umask(_umask)
+    return _umask
+
+
 def _get_destination_for_move(resource, destination):
     dest_path = resource.project._get_resource_path(destination)
     if os.path.isdir(dest_path):
@@ -406,6 +837,8 @@ class ChangeToData(object):
         change_type = type(change)
         if change_type in (CreateFolder, CreateFile):
             change_type = CreateResource
+        elif isinstance(change, ChangeSet):
+            change_type = ChangeSet
         method = getattr(self, 'convert' + change_type.__name__)
         return (change_type.__name__, method(change))
 
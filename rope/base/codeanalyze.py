@@ -1,7 +1,10 @@
+import array
 import bisect
+import collections
 import re
 import token
 import tokenize
+import weakref
 
 
 class ChangeCollector(object):
@@ -37,25 +40,14 @@ class ChangeCollector(object):
 class SourceLinesAdapter(object):
     """Adapts source to Lines interface
 
-    Note: The creation of this class is expensive.
+    The offsets of the lines are computed once for equal sources
+    that are in use at the same time; use `PyModule.lines` for the
+    source of a module.
     """
 
     def __init__(self, source_code):
         self.code = source_code
-        self.starts = None
-        self._initialize_line_starts()
-
-    def _initialize_line_starts(self):
-        self.starts = []
-        self.starts.append(0)
-        try:
-            i = 0
-            while True:
-                i = self.code.index('\n', i) + 1
-                self.starts.append(i)
-        except ValueError:
-            pass
-        self.starts.append(len(self.code) + 1)
+        self.starts = _get_line_starts(source_code)
 
     def get_line(self, lineno):
         return self.code[self.starts[lineno - 1]:
@@ -74,6 +66,33 @@ class SourceLinesAdapter(object):
         return self.starts[lineno] - 1
 
 
+_line_starts = weakref.WeakValueDictionary()
+_recent_line_starts = collections.deque(maxlen=8)
+
+def _get_line_starts(code):
+    """Return an array of the offsets the lines of `code` start at
+
+    The last item is ``len(code) + 1``.  The arrays are kept in a
+    weak-valued cache keyed by the code and are shared; they should
+    not be modified.  The last few arrays are kept alive, since the
+    adapters of a source are often created one after another.
+
+    """
+    key = (type(code), code)
+    starts = _line_starts.get(key)
+    if starts is None:
+        offsets = [0]
+        append = offsets.append
+        offset = 0
+        for length in map(len, code.split('\n')):
+            offset += length + 1
+            append(offset)
+        starts = array.array('l', offsets)
+        _line_starts[key] = starts
+        _recent_line_starts.append(starts)
+    return starts
+
+
 class ArrayLinesAdapter(object):
 
     def __init__(self, lines):
@@ -248,6 +267,13 @@ def tokenizer_generator(lines):
 
 
 class CachingLogicalLineFinder(object):
+    """Finds logical lines using the regions computed for all lines
+
+    The regions are computed once; `starts` and `ends` are sorted
+    arrays of the first and last lines of logical lines that are
+    searched using bisection.
+
+    """
 
     def __init__(self, lines, generate=custom_generator):
         self.lines = lines
@@ -269,30 +295,37 @@ class CachingLogicalLineFinder(object):
 
     def _init_logicals(self):
         """Should initialize _starts and _ends attributes"""
-        size = self.lines.length() + 1
-        self._starts = [None] * size
-        self._ends = [None] * size
+        starts = set()
+        ends = set()
         for start, end in self._generate(self.lines):
-            self._starts[start] = True
-            self._ends[end] = True
+            starts.add(start)
+            ends.add(end)
+        self._starts = array.array('i', sorted(starts))
+        self._ends = array.array('i', sorted(ends))
 
     def logical_line_in(self, line_number):
-        start = line_number
-        while start > 0 and not self.starts[start]:
-            start -= 1
-        if start == 0:
-            try:
-                start = self.starts.index(True, line_number)
-            except ValueError:
-                return (line_number, line_number)
-        return (start, self.ends.index(True, start))
+        if self._starts is None:
+            self._init_logicals()
+        starts = self._starts
+        index = bisect.bisect(starts, line_number)
+        if index > 0:
+            start = starts[index - 1]
+        elif starts:
+            start = starts[0]
+        else:
+            return (line_number, line_number)
+        ends = self._ends
+        return (start, ends[bisect.bisect_left(ends, start)])
 
     def generate_starts(self, start_line=1, end_line=None):
         if end_line is None:
             end_line = self.lines.length()
-        for index in range(start_line, end_line):
-            if self.starts[index]:
-                yield index
+        starts = self.starts
+        index = bisect.bisect_left(starts, start_line)
+        end = bisect.bisect_left(starts, end_line)
+        while index < end:
+            yield starts[index]
+            index += 1
 
 
 def get_block_start(lines, lineno, maximum_indents=80):
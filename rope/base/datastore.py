@@ -0,0 +1,258 @@
+"""Keyed stores for the data rope saves in ``.ropeproject`` folder
+
+Rope used to pickle whole objects like the object database in one
+file; opening a project unpickled all of it and each sync pickled it
+again.  The stores in this module map string keys to picklable
+values and can read and write single records.  Changes are kept in
+memory and are saved when `write()` is called; only the records that
+have changed since the last write are saved.
+
+`SQLiteStore` uses the ``sqlite3`` module.  If it is not available,
+`PickleStore` is used which keeps everything in a single pickled
+file, like the old format.  Stores can be used from more than one
+thread; dynamic object analysis, for instance, receives its data in
+a separate thread.
+
+"""
+import cPickle as pickle
+import os
+import threading
+import zlib
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+
+class Store(object):
+    """The base class for keyed stores"""
+
+    def keys(self):
+        pass
+
+    def get(self, key, default=None):
+        pass
+
+    def __setitem__(self, key, value):
+        pass
+
+    def __delitem__(self, key):
+        pass
+
+    def write(self):
+        pass
+
+    def close(self):
+        pass
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def clear(self):
+        for key in self.keys():
+            del self[key]
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def __getitem__(self, key):
+        result = self.get(key, _missing)
+        if result is _missing:
+            raise KeyError(key)
+        return result
+
+
+_missing = object()
+
+
+class MemoryStore(Store):
+    """A store that is not saved anywhere"""
+
+    def __init__(self):
+        self.data = {}
+
+    def keys(self):
+        return self.data.keys()
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+
+    def __delitem__(self, key):
+        del self.data[key]
+
+
+class SQLiteStore(Store):
+    """A store kept in a sqlite database
+
+    If `compress` is `True` the values are compressed using ``zlib``.
+
+    """
+
+    def __init__(self, path, compress=False):
+        self.path = path
+        self.compress = compress
+        self.changed = {}
+        self.removed = set()
+        self._connection = None
+        self._lock = threading.RLock()
+
+    def keys(self):
+        result = set(row[0] for row in
+                     self._execute('SELECT key FROM data'))
+        result.difference_update(self.removed)
+        result.update(self.changed)
+        return list(result)
+
+    def items(self):
+        result = dict((key, self._loads(value)) for key, value in
+                      self._execute('SELECT key, value FROM data')
+                      if key not in self.removed)
+        result.update(self.changed)
+        return result.items()
+
+    def get(self, key, default=None):
+        if key in self.changed:
+            return self.changed[key]
+        if key in self.removed:
+            return default
+        for row in self._execute('SELECT value FROM data WHERE key = ?',
+                                 (key,)):
+            return self._loads(row[0])
+        return default
+
+    def __contains__(self, key):
+        if key in self.changed:
+            return True
+        if key in self.removed:
+            return False
+        for row in self._execute('SELECT 1 FROM data WHERE key = ?',
+                                 (key,)):
+            return True
+        return False
+
+    def __setitem__(self, key, value):
+        self.removed.discard(key)
+        self.changed[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.changed.pop(key, None)
+        self.removed.add(key)
+
+    def clear(self):
+        self.changed.clear()
+        self.removed.update(self.keys())
+
+    def write(self):
+        if not self.changed and not self.removed:
+            return
+        self._lock.acquire()
+        try:
+            connection = self._get_connection()
+            try:
+                connection.executemany('DELETE FROM data WHERE key = ?',
+                                       [(key,) for key in self.removed])
+                connection.executemany(
+                    'INSERT OR REPLACE INTO data (key, value) VALUES (?, ?)',
+                    [(key, self._dumps(value))
+                     for key, value in self.changed.items()])
+                connection.commit()
+            except:
+                connection.rollback()
+                raise
+            self.changed.clear()
+            self.removed.clear()
+        finally:
+            self._lock.release()
+
+    def close(self):
+        """Close the database; it is opened again when needed"""
+        self._lock.acquire()
+        try:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+        finally:
+            self._lock.release()
+
+    def _execute(self, sql, parameters=()):
+        self._lock.acquire()
+        try:
+            # the database is created when something is written
+            if self._connection is None and not os.path.exists(self.path):
+                return []
+            return self._get_connection().execute(sql, parameters).fetchall()
+        finally:
+            self._lock.release()
+
+    def _get_connection(self):
+        # the connection is shared by the threads using the store;
+        # `self._lock` serializes its use
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path,
+                                               check_same_thread=False)
+            self._connection.text_factory = str
+            self._connection.execute('CREATE TABLE IF NOT EXISTS data '
+                                     '(key TEXT PRIMARY KEY, value BLOB)')
+        return self._connection
+
+    def _dumps(self, value):
+        data = pickle.dumps(value, 2)
+        if self.compress:
+            data = zlib.compress(data)
+        return sqlite3.Binary(data)
+
+    def _loads(self, data):
+        data = str(data)
+        if self.compress:
+            data = zlib.decompress(data)
+        return pickle.loads(data)
+
+
+class PickleStore(Store):
+    """A store kept in a single pickled file
+
+    The whole dictionary is read when it is first accessed and is
+    written again whenever it changes.
+
+    """
+
+    def __init__(self, data_files, name, compress=False, import_=False):
+        self.data_files = data_files
+        self.name = name
+        self.compress = compress
+        self.import_ = import_
+        self.data = None
+        self.dirty = False
+
+    def keys(self):
+        return self._get_data().keys()
+
+    def get(self, key, default=None):
+        return self._get_data().get(key, default)
+
+    def __setitem__(self, key, value):
+        self._get_data()[key] = value
+        self.dirty = True
+
+    def __delitem__(self, key):
+        del self._get_data()[key]
+        self.dirty = True
+
+    def write(self):
+        if self.dirty:
+            self.data_files.write_data(self.name, self.data, self.compress)
+            self.dirty = False
+
+    def _get_data(self):
+        if self.data is None:
+            self.data = self.data_files.read_data(
+                self.name, compress=self.compress, import_=self.import_)
+            if self.data is None:
+                self.data = {}
+        return self.data
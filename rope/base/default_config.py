@@ -38,6 +38,20 @@ def set_prefs(prefs):
     # Should rope save object information or not.
     prefs['save_objectdb'] = True
     prefs['compress_objectdb'] = False
+    # The number of files whose object information is kept in memory.
+    prefs['objectdb_cache_size'] = 1000
+
+    # Should rope save module summaries (the global names, classes,
+    # functions and imports of modules) or not.  They make generating
+    # the autoimport cache faster.
+    prefs['save_summaries'] = True
+    prefs['compress_summaries'] = False
+
+    # Should rope save the index of the names used in project files.
+    # Refactorings use it for skipping files that do not contain the
+    # name they look for.
+    prefs['save_nameindex'] = True
+    prefs['compress_nameindex'] = False
 
     # If `True`, rope analyzes each module when it is being saved.
     prefs['automatic_soa'] = True
@@ -58,6 +72,13 @@ def set_prefs(prefs):
     prefs['save_history'] = True
     prefs['compress_history'] = False
 
+    # If `True`, the files changed by a refactoring are written to
+    # temporary files first and are renamed over the old ones only
+    # when all of them are written; a failure leaves them unchanged.
+    # Files with hard links, files whose owner would change and files
+    # in folders rope cannot create files in are written in place.
+    prefs['transactional_changes'] = True
+
     # Set the number spaces used for indenting.  According to
     # :PEP:`8`, it is best to use 4 spaces.  Since most of rope's
     # unit-tests use 4 spaces it is more reliable, too.
@@ -50,6 +50,10 @@ class ModuleSyntaxError(RopeError):
             'Syntax error in file <%s> line <%s>: %s' %
             (filename, lineno, message))
 
+    def __reduce__(self):
+        return (ModuleSyntaxError,
+                (self.filename, self.lineno, self.message_))
+
 
 class ModuleDecodeError(RopeError):
     """Cannot decode module"""
@@ -59,3 +63,6 @@ class ModuleDecodeError(RopeError):
         self.message_ = message
         super(ModuleDecodeError, self).__init__(
             'Cannot decode file <%s>: %s' % (filename, message))
+
+    def __reduce__(self):
+        return (ModuleDecodeError, (self.filename, self.message_))
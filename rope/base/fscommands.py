@@ -5,6 +5,14 @@ version control systems can be supported by implementing the interface
 provided by `FileSystemCommands` class.  See `SubversionCommands` and
 `MercurialCommands` for example.
 
+Commands that run external programs can also implement `start_batch()`
+and `end_batch()` methods.  Rope calls them around performing a
+`rope.base.change.ChangeSet`; the version control operations performed
+between them can be delayed and run together in `end_batch()`.  Batches
+can be nested; only the outermost `end_batch()` should run them.  The
+files should still be created, moved and removed immediately, since
+later changes in the batch depend on them.
+
 """
 import os
 import shutil
@@ -127,26 +135,105 @@ class GITCommands(object):
         self.root = root
         self._do(['version'])
         self.normal_actions = FileSystemCommands()
+        self.batch = None
+        self.batch_depth = 0
+
+    def start_batch(self):
+        self.batch_depth += 1
+        if self.batch is None:
+            self.batch = []
+
+    def end_batch(self):
+        self.batch_depth -= 1
+        if self.batch_depth == 0:
+            batch = self.batch
+            self.batch = None
+            if batch:
+                self._update_index(batch)
 
     def create_file(self, path):
         self.normal_actions.create_file(path)
-        self._do(['add', self._in_dir(path)])
+        if self.batch is not None:
+            self.batch.append(('add', self._in_dir(path)))
+        else:
+            self._do(['add', self._in_dir(path)])
 
     def create_folder(self, path):
         self.normal_actions.create_folder(path)
 
     def move(self, path, new_location):
-        self._do(['mv', self._in_dir(path), self._in_dir(new_location)])
+        if self.batch is not None:
+            self.normal_actions.move(path, new_location)
+            self.batch.append(('move', self._in_dir(path),
+                               self._in_dir(new_location)))
+        else:
+            self._do(['mv', self._in_dir(path), self._in_dir(new_location)])
 
     def remove(self, path):
-        self._do(['rm', self._in_dir(path)])
+        if self.batch is not None:
+            self.normal_actions.remove(path)
+            self.batch.append(('remove', self._in_dir(path)))
+        else:
+            self._do(['rm', self._in_dir(path)])
 
     def write(self, path, data):
         # XXX: should we use ``git add``?
         self.normal_actions.write(path, data)
 
-    def _do(self, args):
-        _execute(['git'] + args, cwd=self.root)
+    def _do(self, args, input=None):
+        _execute(['git'] + args, cwd=self.root, input=input)
+
+    def _update_index(self, batch):
+        """Perform the index changes of a batch
+
+        Moves and removals of batched operations have already been
+        performed in the working tree.  The index entries they affect
+        are read once, the operations are replayed on them in order
+        and the result is written back using ``git update-index``;
+        like ``git mv``, moved entries keep their staged contents.
+        Created files are added with a single ``git add``.
+
+        """
+        paths = set()
+        for operation in batch:
+            paths.update(operation[1:])
+        old_index = {}
+        for chunk in _chunks(sorted(paths)):
+            output = _read_output(['git', 'ls-files', '-s', '-z', '--'] +
+                                  chunk, cwd=self.root)
+            for entry in output.split('\0'):
+                if not entry:
+                    continue
+                info, path = entry.split('\t', 1)
+                mode, sha, stage = info.split()
+                if stage == '0':
+                    old_index[path] = (mode, sha)
+        index = dict(old_index)
+        for operation in batch:
+            # created files are marked with `None`
+            if operation[0] == 'add':
+                index[operation[1]] = None
+            elif operation[0] == 'remove':
+                for path in _get_entries(index, operation[1]):
+                    del index[path]
+            else:
+                old, new = operation[1:]
+                for path in _get_entries(index, old):
+                    index[new + path[len(old):]] = index.pop(path)
+        changes = []
+        for path, entry in old_index.items():
+            if index.get(path) is None:
+                changes.append('0 %s\t%s\0' % ('0' * len(entry[1]), path))
+        for path, entry in index.items():
+            if entry is not None and entry != old_index.get(path):
+                changes.append('%s %s\t%s\0' % (entry[0], entry[1], path))
+        if changes:
+            self._do(['update-index', '-z', '--index-info'],
+                     input=''.join(changes))
+        added = [path for path, entry in index.items() if entry is None and
+                 os.path.exists(os.path.join(self.root, path))]
+        for chunk in _chunks(sorted(added)):
+            self._do(['add', '--'] + chunk)
 
     def _in_dir(self, path):
         if path.startswith(self.root):
@@ -159,16 +246,31 @@ class DarcsCommands(object):
     def __init__(self, root):
         self.root = root
         self.normal_actions = FileSystemCommands()
+        self.added = None
+        self.batch_depth = 0
+
+    def start_batch(self):
+        self.batch_depth += 1
+        if self.added is None:
+            self.added = []
+
+    def end_batch(self):
+        self.batch_depth -= 1
+        if self.batch_depth == 0:
+            self._add_files()
+            self.added = None
 
     def create_file(self, path):
         self.normal_actions.create_file(path)
-        self._do(['add', path])
+        self._add(path)
 
     def create_folder(self, path):
         self.normal_actions.create_folder(path)
-        self._do(['add', path])
+        self._add(path)
 
     def move(self, path, new_location):
+        # the files created before should be added first
+        self._add_files()
         self._do(['mv', path, new_location])
 
     def remove(self, path):
@@ -177,16 +279,47 @@ class DarcsCommands(object):
     def write(self, path, data):
         self.normal_actions.write(path, data)
 
+    def _add(self, path):
+        if self.added is not None:
+            self.added.append(path)
+        else:
+            self._do(['add', path])
+
+    def _add_files(self):
+        if self.added:
+            for chunk in _chunks(self.added):
+                self._do(['add'] + chunk)
+            del self.added[:]
+
     def _do(self, args):
         _execute(['darcs'] + args, cwd=self.root)
 
 
-def _execute(args, cwd=None):
-    process = subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE)
-    process.wait()
+def _execute(args, cwd=None, input=None):
+    process = subprocess.Popen(args, cwd=cwd, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE)
+    process.communicate(input)
     return process.returncode
 
 
+def _read_output(args, cwd=None):
+    process = subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE)
+    return process.communicate()[0]
+
+
+def _chunks(paths, size=500):
+    """Split `paths` so that command lines do not get too long"""
+    for start in range(0, len(paths), size):
+        yield paths[start:start + size]
+
+
+def _get_entries(index, path):
+    if path in index:
+        return [path]
+    prefix = path + '/'
+    return [entry for entry in index if entry.startswith(prefix)]
+
+
 def unicode_to_file_data(contents, encoding=None):
     if not isinstance(contents, unicode):
         return contents
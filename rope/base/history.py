@@ -1,3 +1,8 @@
+import bisect
+import cPickle
+import hashlib
+import zlib
+
 from rope.base import exceptions, change, taskhandle
 
 
@@ -9,20 +14,36 @@ class History(object):
         self._undo_list = []
         self._redo_list = []
         self._maxundos = maxundos
+        self._store = None
+        self._keys = {}
+        self._refs = {}
+        self._digests = {}
+        self._index = None
         self._load_history()
         self.project.data_files.add_write_hook(self.write)
         self.current_change = None
 
     def _load_history(self):
         if self.save:
-            result = self.project.data_files.read_data(
-                'history', compress=self.compress, import_=True)
-            if result is not None:
-                to_change = change.DataToChange(self.project)
-                for data in result[0]:
-                    self._undo_list.append(to_change(data))
-                for data in result[1]:
-                    self._redo_list.append(to_change(data))
+            store = self._get_store()
+            to_change = change.DataToChange(self.project)
+            for change_list, name in ((self._undo_list, 'undo'),
+                                      (self._redo_list, 'redo')):
+                for key in store.get(name, []):
+                    data = store[key]
+                    if data[0] == 'StoredChangeSet':
+                        change_ = _StoredChangeSet(self, key, *data[1])
+                    else:
+                        change_ = to_change(data)
+                    self._keys[change_] = (key, name)
+                    change_list.append(change_)
+
+    def _get_store(self):
+        if self._store is None:
+            self._store = self.project.data_files.get_store(
+                'history', compress=self.compress, import_=True,
+                convert=_convert_pickled_history)
+        return self._store
 
     def do(self, changes, task_handle=taskhandle.NullTaskHandle()):
         """Perform the change and add it to the `self.undo_list`
@@ -36,14 +57,25 @@ class History(object):
             changes.do(change.create_job_set(task_handle, changes))
         finally:
             self.current_change = None
+        self._forget(self.redo_list)
         if self._is_change_interesting(changes):
             self.undo_list.append(changes)
+            if self._index is not None:
+                self._index.add(changes)
             self._remove_extra_items()
-        del self.redo_list[:]
 
     def _remove_extra_items(self):
         if len(self.undo_list) > self.max_undos:
-            del self.undo_list[0:len(self.undo_list) - self.max_undos]
+            self._forget(self.undo_list,
+                         0, len(self.undo_list) - self.max_undos)
+
+    def _forget(self, change_list, start=0, end=None):
+        if end is None:
+            end = len(change_list)
+        if self._index is not None:
+            for change_ in change_list[start:end]:
+                self._index.remove(change_)
+        del change_list[start:end]
 
     def _is_change_interesting(self, changes):
         for resource in changes.get_changed_resources():
@@ -74,7 +106,7 @@ class History(object):
         self._perform_undos(len(dependencies), task_handle)
         result = self.redo_list[-len(dependencies):]
         if drop:
-            del self.redo_list[-len(dependencies):]
+            self._forget(self.redo_list, -len(dependencies))
         return result
 
     def redo(self, change=None, task_handle=taskhandle.NullTaskHandle()):
@@ -103,7 +135,26 @@ class History(object):
 
     def _find_dependencies(self, change_list, change):
         index = change_list.index(change)
-        return _FindChangeDependencies(change_list[index:])()
+        return _find_dependencies(self._get_index(change_list[index:]),
+                                  change_list[index:])
+
+    def _get_index(self, changes=()):
+        """Return the `_ResourceIndex` of the changes in the history
+
+        The index is made when it is needed for the first time and is
+        updated as changes are added to or removed from the history.
+        Moving changes between undo and redo lists does not change
+        it.  `changes` are indexed if they are not in the index.
+
+        """
+        if self._index is None:
+            self._index = _ResourceIndex()
+            for change_ in self.undo_list + self.redo_list:
+                self._index.add(change_)
+        for change_ in changes:
+            if change_ not in self._index:
+                self._index.add(change_)
+        return self._index
 
     def _perform_undos(self, count, task_handle):
         for i in range(count):
@@ -150,22 +201,137 @@ class History(object):
                 return change_.old_contents
 
     def write(self):
+        """Save the history
+
+        Only the changes that have been added since the last write are
+        saved; changes moved between undo and redo lists keep their
+        records.
+
+        `ChangeSet`\s are saved in three records: a header with their
+        description, the list of changed resources and their changes.
+        File contents are compressed and saved in separate records
+        that are shared by all changes.  The old contents of a
+        `ChangeContents` usually are the new contents of an older
+        change; if not, they are saved as a delta against its new
+        contents.  Only headers are read when the history is loaded.
+
+        """
         if self.save:
-            data = []
-            to_data = change.ChangeToData()
+            store = self._get_store()
             self._remove_extra_items()
-            data.append([to_data(change_) for change_ in self.undo_list])
-            data.append([to_data(change_) for change_ in self.redo_list])
-            self.project.data_files.write_data('history', data,
-                                               compress=self.compress)
+            keys = {}
+            for change_list, name in ((self.undo_list, 'undo'),
+                                      (self.redo_list, 'redo')):
+                store[name] = [self._save_change(store, change_, name, keys)
+                               for change_ in change_list]
+            for change_, (key, name) in self._keys.items():
+                if change_ not in keys:
+                    self._remove_change(store, key)
+            self._keys = keys
+            store.write()
+
+    def _save_change(self, store, change_, name, keys):
+        key = self._keys.get(change_, (None, None))[0]
+        # changes do not change after they are done; saved changes
+        # are only moved between the lists
+        if key is None:
+            key = str(store.get('next', 0))
+            store['next'] = int(key) + 1
+            data = change.ChangeToData()(change_)
+            if data[0] == 'ChangeSet':
+                blobs = {}
+                packed = self._pack(data, blobs, store)
+                store[key + ':changes'] = zlib.compress(
+                    cPickle.dumps(packed, 2))
+                store[key + ':resources'] = [
+                    (resource.path, resource.is_folder())
+                    for resource in change_.get_changed_resources()]
+                store[key + ':blobs'] = blobs.keys()
+                for digest, contents in blobs.items():
+                    count = self._get_refs(store, digest)
+                    if count == 0:
+                        store['blob:' + digest] = _compress(contents)
+                    self._set_refs(store, digest, count + 1)
+                data = ('StoredChangeSet', (data[1][0], data[1][2]))
+            store[key] = data
+        keys[change_] = (key, name)
+        return key
+
+    def _remove_change(self, store, key):
+        for digest in store.get(key + ':blobs', ()):
+            count = self._get_refs(store, digest) - 1
+            self._set_refs(store, digest, count)
+            if count <= 0:
+                del store['blob:' + digest]
+        for name in ('', ':changes', ':resources', ':blobs'):
+            if key + name in store:
+                del store[key + name]
+
+    def _get_refs(self, store, digest):
+        if digest not in self._refs:
+            self._refs[digest] = store.get('refs:' + digest, 0)
+        return self._refs[digest]
+
+    def _set_refs(self, store, digest, count):
+        if count > 0:
+            store['refs:' + digest] = count
+            self._refs[digest] = count
+        else:
+            del store['refs:' + digest]
+            self._refs[digest] = 0
 
-    def get_file_undo_list(self, resource):
-        result = []
-        for change in self.undo_list:
-            if resource in change.get_changed_resources():
-                result.append(change)
+    def _pack(self, data, blobs, store):
+        """Replace file contents in `ChangeToData` output with digests
+
+        The contents are added to `blobs` dict.  Old contents are
+        replaced with a digest, too, if they are in `blobs` or `store`
+        already and with a delta otherwise.  The digests of the last
+        saved contents of each file are kept, because they are usually
+        the old contents of the next change to that file.
+
+        """
+        kind, args = data
+        if kind == 'ChangeSet':
+            description, changes, timestamp = args
+            return (kind, (description, [self._pack(child, blobs, store)
+                                         for child in changes], timestamp))
+        if kind == 'ChangeContents':
+            path, new_contents, old_contents = args
+            digest = _get_digest(new_contents)
+            blobs[digest] = new_contents
+            old = None
+            if old_contents is not None:
+                contents, old = self._digests.get(path, (None, None))
+                if type(contents) is not type(old_contents) or \
+                   contents != old_contents:
+                    old = _get_digest(old_contents)
+                if old in blobs or self._get_refs(store, old):
+                    blobs[old] = old_contents
+                else:
+                    old = _get_delta(new_contents, old_contents)
+            self._digests[path] = (new_contents, digest)
+            return ('PackedContents', (path, digest, old))
+        return data
+
+    def _load_changes(self, key):
+        store = self._get_store()
+        packed = cPickle.loads(zlib.decompress(store[key + ':changes']))
+        data = _unpack(packed, store)
+        return change.DataToChange(self.project)(data).changes
+
+    def _load_resources(self, key):
+        result = set()
+        for path, is_folder in self._get_store()[key + ':resources']:
+            if is_folder:
+                result.add(self.project.get_folder(path))
+            else:
+                result.add(self.project.get_file(path))
         return result
 
+    def get_file_undo_list(self, resource):
+        changes = self._get_index(self.undo_list).exact.get(resource, ())
+        return [change_ for change_ in self.undo_list if change_ in changes]
+
     def __str__(self):
         return 'History holds %s changes in memory' % \
                (len(self.undo_list) + len(self.redo_list))
@@ -202,34 +368,301 @@ class History(object):
 
     def clear(self):
         """Forget all undo and redo information"""
-        del self.undo_list[:]
-        del self.redo_list[:]
-
+        self._forget(self.undo_list)
+        self._forget(self.redo_list)
+
+
+def _convert_pickled_history(data):
+    result = {'undo': [], 'redo': [], 'next': 0}
+    for change_list, name in ((data[0], 'undo'), (data[1], 'redo')):
+        for change_data in change_list:
+            key = str(result['next'])
+            result[key] = change_data
+            result[name].append(key)
+            result['next'] += 1
+    return result
+
+
+class _StoredChangeSet(change.ChangeSet):
+    """A `ChangeSet` whose changes are read when they are needed"""
+
+    def __init__(self, history, key, description, timestamp):
+        self.history = history
+        self.key = key
+        self._changes = None
+        self._resources = None
+        super(_StoredChangeSet, self).__init__(description, timestamp)
+
+    def _get_changes(self):
+        if self._changes is None:
+            self._changes = self.history._load_changes(self.key)
+        return self._changes
+
+    def _set_changes(self, changes):
+        if changes:
+            self._changes = changes
+
+    changes = property(_get_changes, _set_changes)
+
+    def get_changed_resources(self):
+        if self._changes is not None:
+            return super(_StoredChangeSet, self).get_changed_resources()
+        if self._resources is None:
+            self._resources = self.history._load_resources(self.key)
+        return set(self._resources)
+
+
+def _unpack(data, store):
+    kind, args = data
+    if kind == 'ChangeSet':
+        description, changes, timestamp = args
+        return (kind, (description, [_unpack(child, store)
+                                     for child in changes], timestamp))
+    if kind == 'PackedContents':
+        path, digest, old = args
+        new_contents = _decompress(digest, store['blob:' + digest])
+        old_contents = None
+        if isinstance(old, basestring):
+            old_contents = _decompress(old, store['blob:' + old])
+        elif old is not None:
+            old_contents = _apply_delta(new_contents, old)
+        return ('ChangeContents', (path, new_contents, old_contents))
+    return data
+
+
+def _get_digest(contents):
+    if isinstance(contents, unicode):
+        return 'u' + hashlib.sha1(contents.encode('utf-8')).hexdigest()
+    return 's' + hashlib.sha1(contents).hexdigest()
+
+
+def _compress(contents):
+    if isinstance(contents, unicode):
+        contents = contents.encode('utf-8')
+    return zlib.compress(contents)
+
+
+def _decompress(digest, data):
+    # the type of the contents is kept in the first letter of its digest
+    contents = zlib.decompress(data)
+    if digest.startswith('u'):
+        return contents.decode('utf-8')
+    return contents
+
+
+def _get_delta(new, old):
+    """Return the changes that turn `new` to `old`
+
+    The result is a list of ``(start, end)`` ranges of the lines of
+    `new` and the strings to insert between them.
+
+    """
+    new_lines = new.splitlines(True)
+    old_lines = old.splitlines(True)
+    result = []
+    _match_lines(new_lines, old_lines, 0, len(new_lines),
+                 0, len(old_lines), result)
+    return result
+
+
+def _match_lines(new, old, start1, end1, start2, end2, result):
+    """Add the changes that turn `new[start1:end1]` to `old[start2:end2]`
+
+    Lines that appear only once in both are matched first and the
+    lines between them are matched recursively.  It is much faster
+    than `difflib` for sources with many repeated lines, like blank
+    lines, but does not always find the shortest delta.
+
+    """
+    prefix = 0
+    while start1 + prefix < end1 and start2 + prefix < end2 and \
+          new[start1 + prefix] == old[start2 + prefix]:
+        prefix += 1
+    _add_delta(result, (start1, start1 + prefix))
+    start1 += prefix
+    start2 += prefix
+    suffix = 0
+    while start1 < end1 - suffix and start2 < end2 - suffix and \
+          new[end1 - suffix - 1] == old[end2 - suffix - 1]:
+        suffix += 1
+    end1 -= suffix
+    end2 -= suffix
+    anchors = []
+    # a single line left on either side is not worth matching
+    if end1 - start1 > 1 and end2 - start2 > 1:
+        anchors = _get_anchors(new, old, start1, end1, start2, end2)
+    for index1, index2 in anchors:
+        _match_lines(new, old, start1, index1, start2, index2, result)
+        _add_delta(result, (index1, index1 + 1))
+        start1 = index1 + 1
+        start2 = index2 + 1
+    _add_delta(result, ''.join(old[start2:end2]))
+    _add_delta(result, (end1, end1 + suffix))
+
+
+def _get_anchors(new, old, start1, end1, start2, end2):
+    counts = {}
+    for index in range(start1, end1):
+        line = new[index]
+        if line in counts:
+            counts[line] = None
+        else:
+            counts[line] = index
+    seen = {}
+    for index in range(start2, end2):
+        line = old[index]
+        if counts.get(line) is not None:
+            if line in seen:
+                seen[line] = None
+            else:
+                seen[line] = index
+    pairs = sorted((index2, counts[line])
+                   for line, index2 in seen.items() if index2 is not None)
+    # the longest increasing subsequence of the lines in `new`
+    tails = []
+    links = {}
+    for index2, index1 in pairs:
+        position = bisect.bisect(tails, (index1, index2))
+        if position > 0:
+            links[index2] = tails[position - 1]
+        if position == len(tails):
+            tails.append((index1, index2))
+        else:
+            tails[position] = (index1, index2)
+    result = []
+    if tails:
+        pair = tails[-1]
+        while pair is not None:
+            result.append(pair)
+            pair = links.get(pair[1])
+    result.reverse()
+    return result
+
+
+def _add_delta(result, item):
+    if not item or isinstance(item, tuple) and item[0] == item[1]:
+        return
+    if result and type(result[-1]) == type(item):
+        if isinstance(item, tuple):
+            if result[-1][1] == item[0]:
+                result[-1] = (result[-1][0], item[1])
+                return
+        else:
+            result[-1] += item
+            return
+    result.append(item)
 
-class _FindChangeDependencies(object):
 
-    def __init__(self, change_list):
-        self.change = change_list[0]
-        self.change_list = change_list
-        self.changed_resources = set(self.change.get_changed_resources())
+def _apply_delta(new, delta):
+    lines = new.splitlines(True)
+    result = []
+    for item in delta:
+        if isinstance(item, tuple):
+            result.extend(lines[item[0]:item[1]])
+        else:
+            result.append(item)
+    return ''.join(result)
+
+
+class _ResourceIndex(object):
+    """Maps resources to the changes that have changed them
+
+    Changes are indexed by the resources returned from their
+    `get_changed_resources()`.  `get_changes()` finds the changes
+    that have changed a resource, one of its parent folders or, for
+    folders, one of their children without comparing all pairs of
+    resources.
+
+    """
+
+    def __init__(self):
+        self.resources = {}
+        self.exact = {}
+        self.folders = {}
+        self.paths = {}
+        self.sorted_paths = []
+
+    def add(self, change_):
+        resources = [resource for resource in change_.get_changed_resources()
+                     if resource is not None]
+        self.resources[change_] = resources
+        for resource in resources:
+            self.exact.setdefault(resource, set()).add(change_)
+            if resource.is_folder():
+                self.folders.setdefault(resource.path, set()).add(change_)
+            if resource.path not in self.paths:
+                self.paths[resource.path] = set()
+                bisect.insort(self.sorted_paths, resource.path)
+            self.paths[resource.path].add(change_)
+
+    def remove(self, change_):
+        for resource in self.resources.pop(change_, ()):
+            self._discard(self.exact, resource, change_)
+            if resource.is_folder():
+                self._discard(self.folders, resource.path, change_)
+            if self._discard(self.paths, resource.path, change_):
+                del self.sorted_paths[bisect.bisect_left(self.sorted_paths,
+                                                         resource.path)]
+
+    def _discard(self, index, key, change_):
+        changes = index.get(key)
+        if changes is not None:
+            changes.discard(change_)
+            if not changes:
+                del index[key]
+                return True
+        return False
 
-    def __call__(self):
-        result = [self.change]
-        for change in self.change_list[1:]:
-            if self._depends_on(change, result):
-                result.append(change)
-                self.changed_resources.update(change.get_changed_resources())
+    def __contains__(self, change_):
+        return change_ in self.resources
+
+    def get_resources(self, change_):
+        return self.resources[change_]
+
+    def get_changes(self, resource):
+        """Return the changes that might conflict with changing `resource`"""
+        result = set(self.exact.get(resource, ()))
+        path = resource.path
+        while path:
+            if '/' in path:
+                path = path[:path.rindex('/')]
+            else:
+                path = ''
+            result.update(self.folders.get(path, ()))
+        if resource.is_folder():
+            if resource.path:
+                prefix = resource.path + '/'
+            else:
+                prefix = ''
+            start = bisect.bisect_left(self.sorted_paths, prefix)
+            for child in self.sorted_paths[start:]:
+                if not child.startswith(prefix):
+                    break
+                if child:
+                    result.update(self.paths[child])
         return result
 
-    def _depends_on(self, changes, result):
-        for resource in changes.get_changed_resources():
-            if resource is None:
-                continue
-            if resource in self.changed_resources:
-                return True
-            for changed in self.changed_resources:
-                if resource.is_folder() and resource.contains(changed):
-                    return True
-                if changed.is_folder() and changed.contains(resource):
-                    return True
-        return False
+
+def _find_dependencies(index, change_list):
+    """Return the changes of `change_list` that depend on its first item
+
+    A change depends on an earlier change if they change the same
+    resource or one changes a folder containing the resources the
+    other changes.  Changes that depend on a dependent change are
+    returned, too, in the order of `change_list`.
+
+    """
+    positions = dict((change_, position)
+                     for position, change_ in enumerate(change_list))
+    found = set([change_list[0]])
+    pending = [change_list[0]]
+    while pending:
+        current = pending.pop()
+        position = positions[current]
+        for resource in index.get_resources(current):
+            for change_ in index.get_changes(resource):
+                if change_ not in found and \
+                   positions.get(change_, -1) > position:
+                    found.add(change_)
+                    pending.append(change_)
+    return sorted(found, key=positions.get)
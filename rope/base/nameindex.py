@@ -0,0 +1,154 @@
+"""An index of the identifiers used in project files
+
+Most refactorings search all python files for the occurrences of a
+name, while only a few of them contain that name at all.
+`NameIndex` maps identifiers to the files that contain them, so
+that those searches can skip the rest of the files without reading
+them.
+
+"""
+import os
+import re
+
+from rope.base import datastore, resourceobserver
+
+
+class NameIndex(object):
+    """Maps identifiers to the files they appear in
+
+    Files are indexed the first time they are queried.  Files changed
+    by rope are reindexed when they are queried again; others only
+    when their modification time or size change.  The
+    index is updated using resource observers and it is saved in the
+    project's ``.ropeproject`` folder when ``save_nameindex`` project
+    config is set; only the entries of the files indexed again since
+    the last write are saved.
+
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self.files = None
+        self.names = None
+        self.store = None
+        self.checked = set()
+        observer = resourceobserver.ResourceObserver(
+            changed=self._changed, moved=self._moved, created=self._changed,
+            removed=self._moved, validate=self._validate)
+        self.project.add_observer(observer)
+        self.project.data_files.add_write_hook(self.write)
+
+    def get_candidates(self, name, resources, keep=()):
+        """Return the resources that might contain `name`
+
+        The result keeps the order of `resources`.  Resources that do
+        not appear in it surely do not contain `name`.  Resources in
+        `keep` are always returned.
+
+        """
+        return [resource for resource in resources
+                if resource in keep or self.might_contain(resource, name)]
+
+    def might_contain(self, resource, name):
+        """Return `False` if `resource` surely does not contain `name`"""
+        self._check_file(resource)
+        return resource.path in self._get_names().get(name, ())
+
+    def _check_file(self, resource):
+        path = resource.path
+        if path in self.checked:
+            return
+        self._get_names()
+        try:
+            stamp = self._get_stamp(resource)
+        except OSError:
+            self._remove_path(path)
+            return
+        entry = self.files.get(path)
+        if entry is None or entry[0] != stamp:
+            self._remove_path(path)
+            try:
+                words = set(_word_pattern.findall(resource.read_bytes()))
+            except IOError:
+                return
+            self._add_path(path, stamp, words)
+        self.checked.add(path)
+
+    def _get_stamp(self, resource):
+        stat = os.stat(resource.real_path)
+        return (stat.st_mtime, stat.st_size)
+
+    def _get_names(self):
+        if self.names is None:
+            if self.persist:
+                self.store = self.project.data_files.get_store(
+                    'nameindex', compress=self.compress)
+            else:
+                self.store = datastore.MemoryStore()
+            self.files = dict(self.store.items())
+            self.names = {}
+            for path, (stamp, words) in self.files.items():
+                for word in words:
+                    self.names.setdefault(word, set()).add(path)
+        return self.names
+
+    def _add_path(self, path, stamp, words):
+        self.files[path] = (stamp, words)
+        self.store[path] = (stamp, words)
+        for word in words:
+            self.names.setdefault(word, set()).add(path)
+
+    def _remove_path(self, path):
+        self.checked.discard(path)
+        if path not in self.files:
+            return
+        stamp, words = self.files.pop(path)
+        del self.store[path]
+        for word in words:
+            paths = self.names[word]
+            paths.discard(path)
+            if not paths:
+                del self.names[word]
+
+    def _get_paths(self, resource):
+        if self.names is None:
+            return []
+        if not resource.is_folder():
+            if resource.path in self.files:
+                return [resource.path]
+            return []
+        prefix = resource.path + '/'
+        return [path for path in self.files
+                if path == resource.path or path.startswith(prefix)]
+
+    def _changed(self, resource):
+        # the stamp may not change if the file is modified twice in
+        # the same second
+        for path in self._get_paths(resource):
+            self._remove_path(path)
+
+    def _moved(self, resource, new_resource=None):
+        for path in self._get_paths(resource):
+            self._remove_path(path)
+
+    def _validate(self, folder):
+        if folder.path == '':
+            self.checked.clear()
+        else:
+            for path in self._get_paths(folder):
+                self.checked.discard(path)
+
+    def write(self):
+        if self.store is not None:
+            self.store.write()
+
+    @property
+    def compress(self):
+        return self.project.prefs.get('compress_nameindex', False)
+
+    @property
+    def persist(self):
+        return self.project.prefs.get('save_nameindex', False)
+
+
+_word_pattern = re.compile(r'\w+')
@@ -1,7 +1,15 @@
+from rope.base import datastore
 from rope.base.oi import objectdb
 
 
 class MemoryDB(objectdb.FileDict):
+    """A `FileDict` that loads the information of each file on demand
+
+    At most ``objectdb_cache_size`` files are kept in memory; the
+    least recently used ones are dropped and, if modified, are saved
+    in the store first.
+
+    """
 
     def __init__(self, project, persist=None):
         self.project = project
@@ -12,37 +20,89 @@ class MemoryDB(objectdb.FileDict):
 
     def _load_files(self):
         self._files = {}
+        self._dirty = set()
+        self._used = {}
+        self._clock = 0
+        self._store = datastore.MemoryStore()
         if self.persist:
-            result = self.project.data_files.read_data(
+            self._store = self.project.data_files.get_store(
                 'objectdb', compress=self.compress, import_=True)
-            if result is not None:
-                self._files = result
 
     def keys(self):
-        return self._files.keys()
+        result = set(self._files)
+        result.update(self._store.keys())
+        return list(result)
 
     def __contains__(self, key):
-        return key in self._files
+        return key in self._files or key in self._store
 
     def __getitem__(self, key):
-        return FileInfo(self._files[key])
+        return FileInfo(self._get_scopes(key))
+
+    def _get_scopes(self, key):
+        if key not in self._files:
+            self._add(key, self._store[key])
+        self._use(key)
+        return self._files[key]
+
+    def _add(self, key, scopes):
+        self._files[key] = scopes
+        self._use(key)
+        if len(self._files) > self.cache_size:
+            self._shrink()
+
+    def _use(self, key):
+        self._clock += 1
+        self._used[key] = self._clock
+
+    def _shrink(self):
+        keys = sorted(self._files, key=self._used.get)
+        for key in keys[:len(keys) - self.cache_size * 3 // 4]:
+            scopes = self._files.pop(key)
+            del self._used[key]
+            if key in self._dirty:
+                self._dirty.remove(key)
+                self._store[key] = scopes
+        if self.persist:
+            self._store.write()
+
+    def modified(self, key):
+        if key in self._files:
+            self._dirty.add(key)
 
     def create(self, path):
-        self._files[path] = {}
+        self._add(path, {})
+        self.modified(path)
 
     def rename(self, file, newfile):
-        if file not in self._files:
+        if file not in self:
             return
-        self._files[newfile] = self._files[file]
+        scopes = self._get_scopes(file)
         del self[file]
+        self._add(newfile, scopes)
+        self.modified(newfile)
 
     def __delitem__(self, file):
-        del self._files[file]
+        if file not in self:
+            raise KeyError(file)
+        if file in self._files:
+            del self._files[file]
+            del self._used[file]
+        self._dirty.discard(file)
+        if file in self._store:
+            del self._store[file]
 
     def write(self):
+        """Save the modified files"""
         if self.persist:
-            self.project.data_files.write_data('objectdb', self._files,
-                                               self.compress)
+            for path in self._dirty:
+                self._store[path] = self._files[path]
+            self._dirty.clear()
+            self._store.write()
+
+    @property
+    def cache_size(self):
+        return self.project.prefs.get('objectdb_cache_size', 1000)
 
     @property
     def compress(self):
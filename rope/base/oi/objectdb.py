@@ -9,11 +9,10 @@ class ObjectDB(object):
         self.observers = []
         self.files = db.files
 
-    def validate_files(self):
-        for file in list(self.files):
-            if not self.validation.is_file_valid(file):
-                del self.files[file]
-                self._file_removed(file)
+    def remove_file(self, file):
+        if file in self.files:
+            del self.files[file]
+            self._file_removed(file)
 
     def validate_file(self, file):
         if file not in self.files:
@@ -21,6 +20,7 @@ class ObjectDB(object):
         for key in list(self.files[file]):
             if not self.validation.is_scope_valid(file, key):
                 del self.files[file][key]
+                self.files.modified(file)
 
     def file_moved(self, file, newfile):
         if file not in self.files:
@@ -53,12 +53,14 @@ class ObjectDB(object):
         old_returned = scope_info.get_returned(args)
         if self.validation.is_more_valid(returned, old_returned):
             scope_info.add_call(args, returned)
+            self.files.modified(path)
 
     def add_pername(self, path, key, name, value):
         scope_info = self._get_scope_info(path, key, readonly=False)
         old_value = scope_info.get_per_name(name)
         if self.validation.is_more_valid(value, old_value):
             scope_info.save_per_name(name, value)
+            self.files.modified(path)
 
     def add_file_list_observer(self, observer):
         self.observers.append(observer)
@@ -134,6 +136,9 @@ class FileDict(UserDict.DictMixin):
     def rename(self, key, new_key):
         pass
 
+    def modified(self, key):
+        """Tell that the information of `key` file has changed"""
+
 
 class ScopeInfo(object):
 
@@ -1,6 +1,7 @@
+import os
 import warnings
 
-from rope.base import exceptions, resourceobserver
+from rope.base import exceptions, resourceobserver, taskhandle, datastore
 from rope.base.oi import objectdb, memorydb, transform
 
 
@@ -18,8 +19,7 @@ class ObjectInfoManager(object):
         self.to_pyobject = transform.TextualToPyObject(project)
         self.doi_to_pyobject = transform.DOITextualToPyObject(project)
         self._init_objectdb()
-        if project.prefs.get('validate_objectdb', False):
-            self._init_validation()
+        self._init_validation()
 
     def _init_objectdb(self):
         dbtype = self.project.get_prefs().get('objectdb_type', None)
@@ -35,36 +35,89 @@ class ObjectInfoManager(object):
         self.validation = TextualValidation(self.to_pyobject)
         db = memorydb.MemoryDB(self.project, persist=persist)
         self.objectdb = objectdb.ObjectDB(db, self.validation)
+        self.validated = datastore.MemoryStore()
+        if db.persist:
+            self.validated = self.project.data_files.get_store('validated')
+        self.project.data_files.add_write_hook(self.validated.write)
 
     def _init_validation(self):
-        self.objectdb.validate_files()
+        """Validate the information of each file when it is first used
+
+        The modification time and size of files are recorded when
+        they are validated; the information of a file is validated
+        again only when these change.
+
+        """
+        self.checked = set()
+        self.lazy_validation = self.project.prefs.get('validate_objectdb',
+                                                      False)
         observer = resourceobserver.ResourceObserver(
             changed=self._resource_changed, moved=self._resource_moved,
-            removed=self._resource_moved)
-        files = []
-        for path in self.objectdb.get_files():
-            resource = self.to_pyobject.path_to_resource(path)
-            if resource is not None and resource.project == self.project:
-                files.append(resource)
-        self.observer = resourceobserver.FilteredResourceObserver(observer,
-                                                                  files)
-        self.objectdb.add_file_list_observer(_FileListObserver(self))
-        self.project.add_observer(self.observer)
+            removed=self._resource_changed)
+        self.project.add_observer(observer)
+
+    def validate(self, task_handle=taskhandle.NullTaskHandle()):
+        """Validate the information of all files
+
+        Files whose information was validated before and have not
+        changed since are skipped.  The files that no longer exist are
+        removed.  This can be stopped using `task_handle`.
+
+        """
+        files = self.objectdb.get_files()
+        job_set = task_handle.create_jobset('Validating object information',
+                                            len(files))
+        for path in files:
+            job_set.started_job(path)
+            self.checked.discard(path)
+            self._validate_file(path)
+            job_set.finished_job()
+
+    def _validate_file(self, path):
+        if path in self.checked:
+            return
+        self.checked.add(path)
+        if path not in self.objectdb.files:
+            return
+        resource = self.to_pyobject.path_to_resource(path)
+        if resource is None or not resource.exists():
+            self.objectdb.remove_file(path)
+            if path in self.validated:
+                del self.validated[path]
+            return
+        stat = os.stat(resource.real_path)
+        stamp = (stat.st_mtime, stat.st_size)
+        if self.validated.get(path) != stamp:
+            try:
+                self.objectdb.validate_file(path)
+            except exceptions.ModuleSyntaxError:
+                pass
+            self.validated[path] = stamp
 
     def _resource_changed(self, resource):
-        try:
-            self.objectdb.validate_file(
-                self.to_textual.resource_to_path(resource))
-        except exceptions.ModuleSyntaxError:
-            pass
-
-    def _resource_moved(self, resource, new_resource=None):
-        self.observer.remove_resource(resource)
-        if new_resource is not None:
-            old = self.to_textual.resource_to_path(resource)
-            new = self.to_textual.resource_to_path(new_resource)
-            self.objectdb.file_moved(old, new)
-            self.observer.add_resource(new_resource)
+        path = self.to_textual.resource_to_path(resource)
+        self.checked.discard(path)
+        # the stamp may not change if the file is modified twice in
+        # the same second
+        if path in self.validated:
+            del self.validated[path]
+        if self.lazy_validation and not resource.is_folder():
+            self._validate_file(path)
+
+    def _resource_moved(self, resource, new_resource):
+        old = self.to_textual.resource_to_path(resource)
+        new = self.to_textual.resource_to_path(new_resource)
+        if resource.is_folder():
+            moved = [(path, new + path[len(old):])
+                     for path in self.objectdb.get_files()
+                     if path.startswith(old + '/')]
+        else:
+            moved = [(old, new)]
+        for old_path, new_path in moved:
+            self.checked.discard(old_path)
+            if old_path in self.validated:
+                del self.validated[old_path]
+            self.objectdb.file_moved(old_path, new_path)
 
     def get_returned(self, pyobject, args):
         result = self.get_exact_returned(pyobject, args)
@@ -81,7 +134,7 @@ class ObjectInfoManager(object):
             if result is None:
                 result = returned
         if result is not None:
-            return self.to_pyobject(result)
+            return self._to_pyobject(pyobject, result)
 
     def get_exact_returned(self, pyobject, args):
         path, key = self._get_scope(pyobject)
@@ -89,7 +142,7 @@ class ObjectInfoManager(object):
             returned = self.objectdb.get_returned(
                 path, key, self._args_to_textual(pyobject, args))
             if returned is not None:
-                return self.to_pyobject(returned)
+                return self._to_pyobject(pyobject, returned)
 
     def _args_to_textual(self, pyfunction, args):
         parameters = list(pyfunction.get_param_names(special_args=False))
@@ -116,7 +169,7 @@ class ObjectInfoManager(object):
             if unknowns == 0:
                 break
         if unknowns < arg_count:
-            return [self.to_pyobject(parameter)
+            return [self._to_pyobject(pyobject, parameter)
                     for parameter in parameters]
 
     def get_passed_objects(self, pyfunction, parameter_index):
@@ -127,7 +180,8 @@ class ObjectInfoManager(object):
         for call_info in self.objectdb.get_callinfos(path, key):
             args = call_info.get_parameters()
             if len(args) > parameter_index:
-                parameter = self.to_pyobject(args[parameter_index])
+                parameter = self._to_pyobject(pyfunction,
+                                              args[parameter_index])
                 if parameter is not None:
                     result.append(parameter)
         return result
@@ -161,7 +215,7 @@ class ObjectInfoManager(object):
         if path is not None:
             result = self.objectdb.get_pername(path, key, name)
             if result is not None:
-                return self.to_pyobject(result)
+                return self._to_pyobject(scope.pyobject, result)
 
     def _save_data(self, function, args, returned=('unknown',)):
         self.objectdb.add_callinfo(function[1], function[2], args, returned)
@@ -177,9 +231,25 @@ class ObjectInfoManager(object):
                 key = textual[2]
             else:
                 key = ''
+            if self.lazy_validation:
+                self._validate_file(path)
             return path, key
         return None, None
 
+    def _to_pyobject(self, pyobject, textual):
+        """Transform `textual` on behalf of `pyobject`
+
+        The modules `textual` refers to are recorded as dependencies
+        of the module of `pyobject`.
+
+        """
+        resource = pyobject.get_module().get_resource()
+        module_cache = self.project.pycore.module_cache
+        for path in _get_textual_paths(textual):
+            module_cache.add_dependency(
+                resource, self.to_pyobject.path_to_resource(path))
+        return self.to_pyobject(textual)
+
     def sync(self):
         self.objectdb.sync()
 
@@ -187,6 +257,16 @@ class ObjectInfoManager(object):
         return str(self.objectdb)
 
 
+def _get_textual_paths(textual):
+    result = []
+    if textual and textual[0] == 'defined':
+        result.append(textual[1])
+    for item in textual or ():
+        if isinstance(item, tuple):
+            result.extend(_get_textual_paths(item))
+    return result
+
+
 class TextualValidation(object):
 
     def __init__(self, to_pyobject):
@@ -203,30 +283,9 @@ class TextualValidation(object):
             return True
         return new[0] not in ('unknown', 'none')
 
-    def is_file_valid(self, path):
-        return self.to_pyobject.path_to_resource(path) is not None
-
     def is_scope_valid(self, path, key):
         if key == '':
             textual = ('defined', path)
         else:
             textual = ('defined', path, key)
         return self.to_pyobject(textual) is not None
-
-
-class _FileListObserver(object):
-
-    def __init__(self, object_info):
-        self.object_info = object_info
-        self.observer = self.object_info.observer
-        self.to_pyobject = self.object_info.to_pyobject
-
-    def removed(self, path):
-        resource = self.to_pyobject.path_to_resource(path)
-        if resource is not None:
-            self.observer.remove_resource(resource)
-
-    def added(self, path):
-        resource = self.to_pyobject.path_to_resource(path)
-        if resource is not None:
-            self.observer.add_resource(resource)
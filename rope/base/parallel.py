@@ -0,0 +1,91 @@
+"""Running jobs on project files in worker processes
+
+Searching for occurrences of a name handles each file independently
+of the others.  `map_resources()` spreads such jobs over a pool of
+worker processes.  Each worker opens its own view of the project
+(it never syncs or closes it, so it writes nothing) and calls a
+*worker callable* with each of the resources it is given.  Resources
+outside the project, like the modules of the standard library, are
+looked up using `rope.base.project.get_no_project()`.
+
+Worker callables should be instances of module level classes so
+that they can be pickled; they are sent to each process once and
+can cache things like `rope.refactor.occurrences.Finder`\s on
+themselves.  Their return values should be picklable, too.
+
+Worker processes read the object information saved on disk; data
+that the parent has not saved yet is not visible to them.  If
+`multiprocessing` module is not available, the jobs are performed
+in the current process.
+
+"""
+import os
+
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+
+def map_resources(project, worker, resources, job_set, processes):
+    """Generate ``(resource, worker(project, resource))`` pairs
+
+    `processes` is the number of worker processes.  The results are
+    generated in the order of `resources`.  `job_set` is informed
+    about the progress and if its task handle is stopped the worker
+    processes are terminated and
+    `rope.base.exceptions.InterruptedTaskError` is raised.
+
+    """
+    if multiprocessing is None:
+        for resource in resources:
+            job_set.started_job(resource.path)
+            result = worker(project, resource)
+            job_set.finished_job()
+            yield resource, result
+        return
+    prefs = dict(project.prefs.prefs)
+    prefs['ignored_resources'] = list(project.ignored.patterns)
+    pool = multiprocessing.Pool(processes, _init_process,
+                                (project.address, project._ropefolder_name,
+                                 prefs, worker))
+    try:
+        results = pool.imap(_run, [resource.path for resource in resources])
+        for resource in resources:
+            job_set.started_job(resource.path)
+            result = _get_next(results, job_set)
+            job_set.finished_job()
+            yield resource, result
+        pool.close()
+    finally:
+        pool.terminate()
+
+
+def _get_next(results, job_set):
+    # only the iterator returned for ``chunksize == 1`` accepts a timeout
+    while True:
+        try:
+            return results.next(0.1)
+        except multiprocessing.TimeoutError:
+            job_set.check_status()
+
+
+_project = None
+_worker = None
+
+
+def _init_process(root, ropefolder, prefs, worker):
+    global _project, _worker
+    import rope.base.project
+    _project = rope.base.project.Project(root, ropefolder=ropefolder,
+                                         **prefs)
+    _worker = worker
+
+
+def _run(path):
+    if os.path.isabs(path):
+        import rope.base.project
+        resource = rope.base.project.get_no_project().get_resource(path)
+    else:
+        resource = _project.get_resource(path)
+    return _worker(_project, resource)
@@ -1,11 +1,21 @@
 import cPickle as pickle
 import os
 import shutil
+import stat
 import sys
 import warnings
 
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
 import rope.base.fscommands
-from rope.base import exceptions, taskhandle, prefs, history, pycore, utils
+from rope.base import (exceptions, taskhandle, prefs, history, pycore,
+                       utils, datastore, resourceobserver)
 from rope.base.resourceobserver import *
 from rope.base.resources import File, Folder, _ResourceMatcher
 
@@ -17,6 +27,9 @@ class _Project(object):
         self.fscommands = fscommands
         self.prefs = prefs.Prefs()
         self.data_files = _DataFiles(self)
+        self._events = None
+        self._changed = set()
+        self._batch_depth = 0
 
     def get_resource(self, resource_name):
         """Get a resource in a project.
@@ -48,8 +61,49 @@ class _Project(object):
         folder if some observers are interested in them.
 
         """
+        self._report_event('validate', folder)
+
+    def batch_events(self):
+        """Collect resource events until `flush_events()` is called
+
+        The events are then reported to each observer at once;
+        observers that implement `resource_batch()` receive them in a
+        single call (see `rope.base.resourceobserver.ResourceObserver`).
+        Repeated changes to a resource that are not separated by other
+        events are reported once.  Batches can be nested; only the
+        outermost `flush_events()` reports the events.  Changes
+        performed by `do()` are batched.
+
+        """
+        self._batch_depth += 1
+        if self._events is None:
+            self._events = []
+
+    def flush_events(self):
+        """Report the events collected since `batch_events()`"""
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            events = self._events
+            self._events = None
+            self._changed.clear()
+            if events:
+                self._report_events(events)
+
+    def _report_event(self, *event):
+        if self._events is None:
+            self._report_events([event])
+            return
+        if event[0] == 'changed':
+            if event[1] in self._changed:
+                return
+            self._changed.add(event[1])
+        else:
+            self._changed.clear()
+        self._events.append(event)
+
+    def _report_events(self, events):
         for observer in list(self.observers):
-            observer.validate(folder)
+            resourceobserver.report_events(observer, events)
 
     def add_observer(self, observer):
         """Register a `ResourceObserver`
@@ -148,6 +202,9 @@ class Project(_Project):
     def get_files(self):
         return self.file_list.get_files()
 
+    def get_python_files(self):
+        return list(self.file_list.get_python_files())
+
     def _get_resource_path(self, name):
         return os.path.join(self._address, *name.split('/'))
 
@@ -204,6 +261,7 @@ class Project(_Project):
     def close(self):
         """Closes project open resources"""
         self.data_files.write()
+        self.data_files.close()
 
     def set(self, key, value):
         """Set the `key` preference to `value`"""
@@ -244,6 +302,9 @@ class NoProject(_Project):
     def get_files(self):
         return []
 
+    def get_python_files(self):
+        return []
+
     _no_project = None
 
 
@@ -254,34 +315,159 @@ def get_no_project():
 
 
 class _FileListCacher(object):
+    """Keeps the list of project files
+
+    The list is built the first time it is requested and is then
+    updated using resource observers; created, removed and moved
+    resources change only their own entries and only changed or
+    validated folders are walked again.  Python files are kept in a
+    second set which is updated along with the first.
+
+    """
 
     def __init__(self, project):
         self.project = project
         self.files = None
+        self.python_files = None
+        self._shared = False
         rawobserver = ResourceObserver(
-            self._changed, self._invalid, self._invalid,
-            self._invalid, self._invalid)
+            changed=self._changed, moved=self._moved, created=self._created,
+            removed=self._removed, validate=self._validate)
         self.project.add_observer(rawobserver)
 
     def get_files(self):
+        # the returned set is copied before it is changed again
+        self._shared = True
+        return self._get_files()
+
+    def get_python_files(self):
+        files = self._get_files()
+        if self.python_files is None:
+            is_python_file = self.project.pycore.is_python_file
+            self.python_files = set(resource for resource in files
+                                    if is_python_file(resource))
+        return self.python_files
+
+    def _get_files(self):
         if self.files is None:
             self.files = set()
+            self.python_files = None
             self._add_files(self.project.root)
         return self.files
 
     def _add_files(self, folder):
-        for child in folder.get_children():
-            if child.is_folder():
-                self._add_files(child)
-            elif not self.project.is_ignored(child):
-                self.files.add(child)
+        """Add the files inside `folder` to `self.files`
+
+        Each entry is checked with a single system call and ignored
+        folders are not visited at all.
+
+        """
+        ignored = self.project.ignored
+        folders = [folder.path]
+        while folders:
+            path = folders.pop()
+            try:
+                entries = _list_folder(self.project._get_resource_path(path))
+            except OSError:
+                continue
+            for name, kind in entries:
+                if path:
+                    child = path + '/' + name
+                else:
+                    child = name
+                if kind is None or ignored.does_match_path(child):
+                    continue
+                if kind == 'folder':
+                    folders.append(child)
+                else:
+                    self._add_file(File(self.project, child))
+
+    def _add_file(self, resource):
+        self.files.add(resource)
+        if self.python_files is not None and \
+           self.project.pycore.is_python_file(resource):
+            self.python_files.add(resource)
+
+    def _remove_file(self, resource):
+        self.files.discard(resource)
+        if self.python_files is not None:
+            self.python_files.discard(resource)
+
+    def _prepare_change(self):
+        if self.files is None:
+            return False
+        if self._shared:
+            self.files = set(self.files)
+            self._shared = False
+        return True
+
+    def _created(self, resource):
+        if not self._prepare_change() or self.project.is_ignored(resource):
+            return
+        if resource.is_folder():
+            self._add_files(resource)
+        else:
+            self._add_file(resource)
+
+    def _removed(self, resource):
+        if not self._prepare_change():
+            return
+        if resource.is_folder():
+            prefix = resource.path + '/'
+            for file in [file for file in self.files
+                         if file.path.startswith(prefix)]:
+                self._remove_file(file)
+        else:
+            self._remove_file(resource)
+
+    def _moved(self, resource, new_resource):
+        self._removed(resource)
+        self._created(new_resource)
 
     def _changed(self, resource):
         if resource.is_folder():
+            self._validate(resource)
+
+    def _validate(self, folder):
+        if folder.path == '':
             self.files = None
+            self.python_files = None
+        elif folder.exists():
+            self._moved(folder, folder)
+        else:
+            self._removed(folder)
 
-    def _invalid(self, resource, new_resource=None):
-        self.files = None
+
+def _list_folder(path):
+    """Return ``(name, kind)`` tuples for the entries of `path` folder
+
+    `kind` is either ``'file'``, ``'folder'`` or ``None`` for links
+    and other entries.
+
+    """
+    result = []
+    if scandir is not None:
+        for entry in scandir(path):
+            kind = None
+            if not entry.is_symlink():
+                if entry.is_dir():
+                    kind = 'folder'
+                elif entry.is_file():
+                    kind = 'file'
+            result.append((entry.name, kind))
+        return result
+    for name in os.listdir(path):
+        try:
+            mode = os.lstat(os.path.join(path, name)).st_mode
+        except OSError:
+            continue
+        kind = None
+        if stat.S_ISDIR(mode):
+            kind = 'folder'
+        elif stat.S_ISREG(mode):
+            kind = 'file'
+        result.append((name, kind))
+    return result
 
 
 class _DataFiles(object):
@@ -289,6 +475,7 @@ class _DataFiles(object):
     def __init__(self, project):
         self.project = project
         self.hooks = []
+        self.stores = []
 
     def read_data(self, name, compress=False, import_=False):
         if self.project.ropefolder is None:
@@ -325,6 +512,39 @@ class _DataFiles(object):
             finally:
                 output.close()
 
+    def get_store(self, name, compress=False, import_=False, convert=None):
+        """Return a `rope.base.datastore.Store` for `name` data
+
+        The data saved with `write_data()` in the old single pickle
+        format is moved to the new store the first time it is opened.
+        If `convert` is not `None`, it is called with the old data and
+        should return a dictionary.
+
+        """
+        if self.project.ropefolder is None or datastore.sqlite3 is None:
+            store = datastore.PickleStore(self, name, compress, import_)
+        else:
+            file = self._get_file(name + '.db', False)
+            exists = file.exists()
+            store = datastore.SQLiteStore(file.real_path, compress)
+            if not exists:
+                self._import_pickled_data(store, name, compress, import_,
+                                          convert)
+        self.stores.append(store)
+        return store
+
+    def _import_pickled_data(self, store, name, compress, import_, convert):
+        old = self.read_data(name, compress, import_)
+        if old is None:
+            return
+        if convert is not None:
+            old = convert(old)
+        for key, value in old.items():
+            store[key] = value
+        store.write()
+        os.remove(self._get_file(name, compress and
+                                 self._can_compress()).real_path)
+
     def add_write_hook(self, hook):
         self.hooks.append(hook)
 
@@ -332,6 +552,10 @@ class _DataFiles(object):
         for hook in self.hooks:
             hook()
 
+    def close(self):
+        for store in self.stores:
+            store.close()
+
     def _can_compress(self):
         try:
             import gzip
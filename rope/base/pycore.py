@@ -1,12 +1,13 @@
 import bisect
-import difflib
 import sys
 import warnings
 
+import rope.base.change
 import rope.base.oi.doa
 import rope.base.oi.objectinfo
 import rope.base.oi.soa
-from rope.base import ast, exceptions, taskhandle, utils, stdmods
+from rope.base import (ast, exceptions, taskhandle, utils, stdmods,
+                       summaries, nameindex)
 from rope.base.exceptions import ModuleNotFoundError
 from rope.base.pyobjectsdef import PyModule, PyPackage, PyClass
 import rope.base.resources
@@ -22,6 +23,8 @@ class PyCore(object):
         self.cache_observers = []
         self.module_cache = _ModuleCache(self)
         self.extension_cache = _ExtensionCache(self)
+        self.summary_cache = summaries.SummaryCache(project)
+        self.name_index = nameindex.NameIndex(project)
         self.object_info = rope.base.oi.objectinfo.ObjectInfoManager(project)
         self._init_python_files()
         self._init_automatic_soa()
@@ -193,10 +196,29 @@ class PyCore(object):
     def resource_to_pyobject(self, resource, force_errors=False):
         return self.module_cache.get_pymodule(resource, force_errors)
 
+    def get_summary(self, resource):
+        """Return a `rope.base.summaries.ModuleSummary` for `resource`
+
+        Summaries are cached across sessions and, unlike
+        `resource_to_pyobject()`, they are computed without building
+        a `PyModule`.
+
+        """
+        return self.summary_cache.get_summary(resource)
+
+    def get_dependents(self, resource):
+        """Return the modules that depend on `resource` module
+
+        The result is the set of resources whose cached modules use
+        `resource`, directly or indirectly; these are the modules
+        whose concluded data is forgotten when `resource` changes.
+
+        """
+        return self.module_cache.get_dependents(resource)
+
     def get_python_files(self):
         """Returns all python files available in the project"""
-        return [resource for resource in self.project.get_files()
-                if self.is_python_file(resource)]
+        return self.project.get_python_files()
 
     def _is_package(self, folder):
         if folder.has_child('__init__.py') and \
@@ -300,12 +322,14 @@ class _ModuleCache(object):
     def __init__(self, pycore):
         self.pycore = pycore
         self.module_map = {}
+        self.dependents = {}
+        self.dependencies = {}
         self.pycore.cache_observers.append(self._invalidate_resource)
         self.observer = self.pycore.observer
 
     def _invalidate_resource(self, resource):
         if resource in self.module_map:
-            self.forget_all_data()
+            self.forget_dependents_data(resource)
             self.observer.remove_resource(resource)
             del self.module_map[resource]
 
@@ -324,9 +348,51 @@ class _ModuleCache(object):
         self.observer.add_resource(resource)
         return result
 
+    def add_dependency(self, resource, dependency):
+        """Record that `resource` module uses `dependency` module
+
+        Modules record their dependencies while computing their
+        concluded data, so the dependencies of a module are
+        forgotten together with its concluded data.
+
+        """
+        if resource is None or dependency is None or \
+           resource == dependency:
+            return
+        self.dependents.setdefault(dependency, set()).add(resource)
+        self.dependencies.setdefault(resource, set()).add(dependency)
+
+    def get_dependents(self, resource):
+        result = set()
+        pending = [resource]
+        while pending:
+            for dependent in self.dependents.get(pending.pop(), ()):
+                if dependent not in result and dependent != resource:
+                    result.add(dependent)
+                    pending.append(dependent)
+        return result
+
+    def forget_dependents_data(self, resource):
+        """Forget the concluded data of `resource` and its dependents"""
+        affected = self.get_dependents(resource)
+        affected.add(resource)
+        for dependent in affected:
+            if dependent in self.module_map:
+                self.module_map[dependent]._forget_concluded_data()
+            self._remove_dependencies(dependent)
+
+    def _remove_dependencies(self, resource):
+        for dependency in self.dependencies.pop(resource, ()):
+            dependents = self.dependents[dependency]
+            dependents.discard(resource)
+            if not dependents:
+                del self.dependents[dependency]
+
     def forget_all_data(self):
         for pymodule in self.module_map.values():
             pymodule._forget_concluded_data()
+        self.dependents.clear()
+        self.dependencies.clear()
 
     def __str__(self):
         return 'PyCore caches %d PyModules\n' % len(self.module_map)
@@ -368,6 +434,16 @@ def perform_soa_on_changed_scopes(project, resource, old_contents):
 
 
 class _TextChangeDetector(object):
+    """Finds the lines of `old` that are not in `new`
+
+    The lines are compared using `rope.base.change._get_opcodes()`.
+    If more than `max_lines` lines remain in either of them after
+    skipping common leading and trailing lines, all of the remaining
+    lines of `old` are considered changed.
+
+    """
+
+    max_lines = 2000
 
     def __init__(self, old, new):
         self.old = old
@@ -375,16 +451,14 @@ class _TextChangeDetector(object):
         self._set_diffs()
 
     def _set_diffs(self):
-        differ = difflib.Differ()
+        opcodes = rope.base.change._get_opcodes(self.old.splitlines(True),
+                                                self.new.splitlines(True),
+                                                self.max_lines)
+        # line numbers start from 1
         self.lines = []
-        lineno = 0
-        for line in differ.compare(self.old.splitlines(True),
-                                   self.new.splitlines(True)):
-            if line.startswith(' '):
-                lineno += 1
-            elif line.startswith('-'):
-                lineno += 1
-                self.lines.append(lineno)
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag in ('replace', 'delete'):
+                self.lines.extend(range(i1 + 1, i2 + 1))
 
     def is_changed(self, start, end):
         """Tell whether any of start till end lines have changed
@@ -124,6 +124,10 @@ class ImportedModule(PyName):
                     self.pymodule.set(pymodule)
                 except exceptions.ModuleNotFoundError:
                     pass
+            if self.pymodule.get() is not None:
+                pycore.module_cache.add_dependency(
+                    self.importing_module.get_resource(),
+                    self.pymodule.get().get_resource())
         return self.pymodule.get()
 
     def get_object(self):
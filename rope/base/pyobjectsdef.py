@@ -211,13 +211,25 @@ class PyPackage(pyobjects.PyPackage):
 
     def __init__(self, pycore, resource=None, force_errors=False):
         self.resource = resource
+        self._init_module = None
         init_dot_py = self._get_init_dot_py()
         if init_dot_py is not None:
-            ast_node = pycore.resource_to_pyobject(
-                init_dot_py, force_errors=force_errors).get_ast()
-        else:
-            ast_node = ast.parse('\n')
-        super(PyPackage, self).__init__(pycore, ast_node, resource)
+            self._init_module = pycore.resource_to_pyobject(
+                init_dot_py, force_errors=force_errors)
+        super(PyPackage, self).__init__(pycore, None, resource)
+
+    def _get_ast_node(self):
+        if self._init_module is not None:
+            return self._init_module.get_ast()
+        if self._ast_node is None:
+            self._ast_node = ast.parse('\n')
+        return self._ast_node
+
+    def _set_ast_node(self, ast_node):
+        self._ast_node = ast_node
+
+    _ast_node = None
+    ast_node = property(_get_ast_node, _set_ast_node)
 
     def _create_structural_attributes(self):
         result = {}
@@ -236,6 +248,8 @@ class PyPackage(pyobjects.PyPackage):
         init_dot_py = self._get_init_dot_py()
         if init_dot_py:
             init_object = self.pycore.resource_to_pyobject(init_dot_py)
+            self.pycore.module_cache.add_dependency(self.resource,
+                                                    init_dot_py)
             result.update(init_object.get_attributes())
         return result
 
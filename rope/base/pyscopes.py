@@ -1,3 +1,5 @@
+import bisect
+
 import rope.base.builtins
 import rope.base.codeanalyze
 import rope.base.pynames
@@ -216,6 +218,7 @@ class _HoldingScopeFinder(object):
 
     def __init__(self, pymodule):
         self.pymodule = pymodule
+        self.subscopes = {}
 
     def get_indents(self, lineno):
         return rope.base.codeanalyze.count_line_indents(
@@ -236,16 +239,39 @@ class _HoldingScopeFinder(object):
             if current_scope.get_start() == lineno and \
                current_scope.get_kind() != 'Module':
                 return current_scope
-            new_scope = None
-            for scope in current_scope.get_scopes():
-                if scope.get_start() <= lineno:
-                    if lineno <= scope.get_end():
-                        new_scope = scope
-                        break
-                else:
-                    break
+            new_scope = self._find_subscope(current_scope, lineno)
         return current_scope
 
+    def _find_subscope(self, scope, lineno):
+        """Return the first subscope of `scope` that holds `lineno`
+
+        For each scope, the maximum start and end lines of its
+        subscopes up to each subscope are kept; the ends are computed
+        only when needed.  These lists are sorted, so the subscopes
+        that start before `lineno` and the first one among them that
+        ends after it are found using bisection.
+
+        """
+        if scope not in self.subscopes:
+            scopes = scope.get_scopes()
+            starts = []
+            for subscope in scopes:
+                start = subscope.get_start()
+                if starts:
+                    start = max(start, starts[-1])
+                starts.append(start)
+            self.subscopes[scope] = (scopes, starts, [])
+        scopes, starts, ends = self.subscopes[scope]
+        count = bisect.bisect_right(starts, lineno)
+        while len(ends) < count:
+            end = scopes[len(ends)].get_end()
+            if ends:
+                end = max(end, ends[-1])
+            ends.append(end)
+        index = bisect.bisect_left(ends, lineno, 0, count)
+        if index < count:
+            return scopes[index]
+
     def _is_empty_line(self, lineno):
         line = self.lines.get_line(lineno)
         return line.strip() == '' or line.lstrip().startswith('#')
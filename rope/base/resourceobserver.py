@@ -14,15 +14,23 @@ class ResourceObserver(object):
     to a list of resources.  And you want changes to be reported on
     individual resources.
 
+    If `batch` is not `None`, it is called with the events of each
+    batch of changes (see `Project.batch_events()`) instead of the
+    other callbacks.  Events are tuples like ``('changed', resource)``
+    or ``('moved', resource, new_resource)``; the first item is one
+    of ``'changed'``, ``'moved'``, ``'created'``, ``'removed'`` or
+    ``'validate'``.
+
     """
 
     def __init__(self, changed=None, moved=None, created=None,
-                 removed=None, validate=None):
+                 removed=None, validate=None, batch=None):
         self.changed = changed
         self.moved = moved
         self.created = created
         self.removed = removed
         self._validate = validate
+        self.batch = batch
 
     def resource_changed(self, resource):
         """It is called when the resource changes"""
@@ -55,6 +63,36 @@ class ResourceObserver(object):
         if self._validate is not None:
             self._validate(resource)
 
+    def resource_batch(self, events):
+        """It is called with the events of a batch of changes"""
+        if self.batch is not None:
+            self.batch(events)
+        else:
+            _report_one_by_one(self, events)
+
+
+def report_events(observer, events):
+    """Report a list of events to `observer`
+
+    Observers that have a `resource_batch()` method receive them all
+    at once.
+
+    """
+    if hasattr(observer, 'resource_batch'):
+        observer.resource_batch(events)
+    else:
+        _report_one_by_one(observer, events)
+
+
+def _report_one_by_one(observer, events):
+    for event in events:
+        getattr(observer, _methods[event[0]])(*event[1:])
+
+
+_methods = {'changed': 'resource_changed', 'moved': 'resource_moved',
+            'created': 'resource_created', 'removed': 'resource_removed',
+            'validate': 'validate'}
+
 
 class FilteredResourceObserver(object):
     """A useful decorator for `ResourceObserver`
@@ -78,6 +116,10 @@ class FilteredResourceObserver(object):
     resources that change over time, `add_resource` and
     `remove_resource` might be useful.
 
+    When a batch of events is reported, the events it causes are
+    passed to `resource_observer` as a batch, too; consecutive changes
+    are merged so that each resource is checked once.
+
     """
 
     def __init__(self, resource_observer, initial_resources=None,
@@ -161,22 +203,63 @@ class FilteredResourceObserver(object):
         self._update_changes_caused_by_moved(changes, resource)
         self._perform_changes(changes)
 
+    def resource_batch(self, events):
+        result = []
+        changes = _Changes()
+        for event in events:
+            if event[0] == 'changed':
+                self._update_changes_caused_by_changed(changes, event[1])
+                continue
+            result.extend(self._get_events(changes))
+            changes = _Changes()
+            if event[0] == 'moved':
+                self._update_changes_caused_by_moved(changes, *event[1:])
+            elif event[0] == 'removed':
+                self._update_changes_caused_by_moved(changes, event[1])
+            elif event[0] == 'created':
+                self._update_changes_caused_by_created(changes, event[1])
+            else:
+                self._update_changes_caused_by_validation(changes, event[1])
+            result.extend(self._get_events(changes))
+            changes = _Changes()
+        result.extend(self._get_events(changes))
+        if result:
+            report_events(self.observer, result)
+
     def _perform_changes(self, changes):
+        events = self._get_events(changes)
+        if events:
+            report_events(self.observer, events)
+
+    def _get_events(self, changes):
+        result = []
         for resource in changes.changes:
-            self.observer.resource_changed(resource)
-            self.resources[resource] = self.timekeeper.get_indicator(resource)
+            result.append(('changed', resource))
+            self.resources[resource] = self._get_indicator(resource)
         for resource, new_resource in changes.moves.items():
             self.resources[resource] = None
             if new_resource is not None:
-                self.observer.resource_moved(resource, new_resource)
+                result.append(('moved', resource, new_resource))
             else:
-                self.observer.resource_removed(resource)
+                result.append(('removed', resource))
         for resource in changes.creations:
-            self.observer.resource_created(resource)
-            self.resources[resource] = self.timekeeper.get_indicator(resource)
+            result.append(('created', resource))
+            self.resources[resource] = self._get_indicator(resource)
+        return result
+
+    def _get_indicator(self, resource):
+        # in batches, resources might be removed after they change
+        try:
+            return self.timekeeper.get_indicator(resource)
+        except OSError:
+            return None
 
     def validate(self, resource):
         changes = _Changes()
+        self._update_changes_caused_by_validation(changes, resource)
+        self._perform_changes(changes)
+
+    def _update_changes_caused_by_validation(self, changes, resource):
         for file in self._search_resource_moves(resource):
             if file in self.resources:
                 self._update_changes_caused_by_moved(changes, file)
@@ -186,7 +269,6 @@ class FilteredResourceObserver(object):
         for file in self._search_resource_creations(resource):
             if file in self.resources:
                 changes.add_created(file)
-        self._perform_changes(changes)
 
     def _search_resource_creations(self, resource):
         creations = set()
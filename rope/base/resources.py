@@ -121,7 +121,7 @@ class Folder(Resource):
             except exceptions.ResourceNotFoundError:
                 continue
             if not self.project.is_ignored(child):
-                result.append(self.get_child(name))
+                result.append(child)
         return result
 
     def create_file(self, file_name):
@@ -193,15 +193,21 @@ class _ResourceMatcher(object):
         self.compiled_patterns.append(re.compile(re_pattern))
 
     def does_match(self, resource):
-        for pattern in self.compiled_patterns:
-            if pattern.match(resource.path):
-                return True
+        if self.does_match_path(resource.path):
+            return True
         path = os.path.join(resource.project.address,
                             *resource.path.split('/'))
         if os.path.islink(path):
             return True
         return False
 
+    def does_match_path(self, path):
+        """Like `does_match()` but links are not matched"""
+        for pattern in self.compiled_patterns:
+            if pattern.match(path):
+                return True
+        return False
+
     @property
     def compiled_patterns(self):
         if self._compiled_patterns is None:
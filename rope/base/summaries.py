@@ -0,0 +1,252 @@
+"""Structural summaries of python modules
+
+A `ModuleSummary` holds what rope can learn about a module without
+building a `PyModule`: its global names, the line ranges of its
+classes and functions and the modules it imports.  `SummaryCache`
+keeps these summaries, keyed by the modification time and the
+content hash of each file, and saves them in the project's
+``.ropeproject`` folder so that they survive across sessions.
+
+"""
+import hashlib
+import os
+
+from rope.base import ast, datastore, resourceobserver
+
+
+class ModuleSummary(object):
+    """The structure of a python module
+
+    `names` maps global names to one of 'class', 'function',
+    'assigned' or 'imported'.  `scopes` is a list of ``(kind, name,
+    start, end)`` tuples for classes and functions in the order they
+    are defined; nested scopes use dotted names like
+    ``'Class.method'``.  `imports` is a list of ``(modname, level)``
+    tuples.  If the module has syntax errors, `syntax_error` is a
+    ``(lineno, message)`` tuple and the other fields are empty.
+
+    """
+
+    def __init__(self, names=None, scopes=None, imports=None,
+                 syntax_error=None):
+        self.names = names or {}
+        self.scopes = scopes or []
+        self.imports = imports or []
+        self.syntax_error = syntax_error
+
+    def get_names(self, kinds=None):
+        """Return the global names whose kind is in `kinds`"""
+        return [name for name, kind in self.names.items()
+                if kinds is None or kind in kinds]
+
+    def __getstate__(self):
+        return (self.names, self.scopes, self.imports, self.syntax_error)
+
+    def __setstate__(self, data):
+        self.names, self.scopes, self.imports, self.syntax_error = data
+
+
+def summarize(source, filename='<string>'):
+    """Return a `ModuleSummary` for `source`"""
+    try:
+        node = ast.parse(source, filename=filename)
+    except SyntaxError, e:
+        return ModuleSummary(syntax_error=(e.lineno, e.msg))
+    return summarize_ast(node)
+
+
+def summarize_ast(node):
+    """Return a `ModuleSummary` for a module `ast` node"""
+    visitor = _SummaryVisitor()
+    visitor.visit(node.body)
+    return ModuleSummary(visitor.names, visitor.scopes, visitor.imports)
+
+
+def get_digest(source_bytes):
+    return hashlib.md5(source_bytes).hexdigest()
+
+
+class _SummaryVisitor(object):
+    """Visits statements; names and scopes cannot appear in expressions"""
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.names = {}
+        self.scopes = []
+        self.imports = []
+
+    def visit(self, statements):
+        for node in statements:
+            method = getattr(self, '_' + node.__class__.__name__, None)
+            if method is not None:
+                method(node)
+            else:
+                self._visit_blocks(node)
+
+    def _visit_blocks(self, node):
+        for field in _BLOCKS:
+            children = getattr(node, field, None)
+            if isinstance(children, list):
+                self.visit(children)
+
+    def _defined(self, node, kind):
+        name = self.prefix + node.name
+        self.names[node.name] = kind
+        self.scopes.append((kind, name, node.lineno, _get_last_line(node)))
+        visitor = _SummaryVisitor(name + '.')
+        visitor.visit(node.body)
+        self.scopes.extend(visitor.scopes)
+        self.imports.extend(visitor.imports)
+
+    def _ClassDef(self, node):
+        self._defined(node, 'class')
+
+    def _FunctionDef(self, node):
+        self._defined(node, 'function')
+
+    def _assigned(self, target):
+        for name in _get_assigned_names(target):
+            self.names.setdefault(name, 'assigned')
+
+    def _Assign(self, node):
+        for target in node.targets:
+            self._assigned(target)
+
+    def _For(self, node):
+        self._assigned(node.target)
+        self._visit_blocks(node)
+
+    def _With(self, node):
+        if node.optional_vars:
+            self._assigned(node.optional_vars)
+        self._visit_blocks(node)
+
+    def _ExceptHandler(self, node):
+        if node.name is not None:
+            self._assigned(node.name)
+        self._visit_blocks(node)
+
+    _excepthandler = _ExceptHandler
+
+    def _Import(self, node):
+        for alias in node.names:
+            self.imports.append((alias.name, 0))
+            if alias.asname is not None:
+                self.names[alias.asname] = 'imported'
+            else:
+                self.names[alias.name.split('.')[0]] = 'imported'
+
+    def _ImportFrom(self, node):
+        self.imports.append((node.module or '', node.level or 0))
+        for alias in node.names:
+            if alias.name != '*':
+                self.names[alias.asname or alias.name] = 'imported'
+
+
+_BLOCKS = ('body', 'handlers', 'orelse', 'finalbody')
+
+
+def _get_assigned_names(target):
+    if isinstance(target, ast.Name):
+        return [target.id]
+    if isinstance(target, (ast.Tuple, ast.List)):
+        result = []
+        for child in target.elts:
+            result.extend(_get_assigned_names(child))
+        return result
+    return []
+
+
+def _get_last_line(node):
+    for field in reversed(_BLOCKS):
+        children = getattr(node, field, None)
+        if isinstance(children, list) and children:
+            return _get_last_line(children[-1])
+    result = getattr(node, 'lineno', 0)
+    for child in ast.get_child_nodes(node):
+        result = max(result, _get_last_line(child))
+    return result
+
+
+class SummaryCache(object):
+    """Keeps `ModuleSummary`\s of project files
+
+    Summaries are looked up by file modification time and size first
+    and by the hash of file contents if those have changed; only
+    files whose contents have changed are parsed again.
+
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self.summaries = None
+        observer = resourceobserver.ResourceObserver(
+            moved=self._removed, removed=self._removed)
+        self.project.add_observer(observer)
+        self.project.data_files.add_write_hook(self.write)
+
+    def get_summary(self, resource):
+        """Return the `ModuleSummary` of `resource` module"""
+        stamp = self._get_stamp(resource)
+        entry = self._get_summaries().get(resource.path)
+        if entry is not None and entry[0] == stamp:
+            return entry[2]
+        return self.update(resource, resource.read_bytes(), stamp=stamp)
+
+    def lookup(self, resource, source_bytes):
+        """Return the cached summary of `resource` for `source_bytes`
+
+        Returns `None` if no summary of these contents is cached.
+
+        """
+        entry = self._get_summaries().get(resource.path)
+        if entry is not None and entry[1] == get_digest(source_bytes):
+            return entry[2]
+
+    def update(self, resource, source_bytes, stamp=None):
+        """Update and return the summary of `resource`"""
+        digest = get_digest(source_bytes)
+        if stamp is None:
+            stamp = self._get_stamp(resource)
+        entry = self._get_summaries().get(resource.path)
+        if entry is not None and entry[1] == digest:
+            if entry[0] == stamp:
+                return entry[2]
+            summary = entry[2]
+        else:
+            summary = summarize(source_bytes, resource.path)
+        self._get_summaries()[resource.path] = (stamp, digest, summary)
+        return summary
+
+    def _get_stamp(self, resource):
+        path = resource.real_path
+        return (os.path.getmtime(path), os.path.getsize(path))
+
+    def _get_summaries(self):
+        if self.summaries is None:
+            if self.persist:
+                self.summaries = self.project.data_files.get_store(
+                    'summaries', compress=self.compress)
+            else:
+                self.summaries = datastore.MemoryStore()
+        return self.summaries
+
+    def _removed(self, resource, new_resource=None):
+        if self.summaries is None:
+            return
+        for path in self.summaries.keys():
+            if path == resource.path or \
+               path.startswith(resource.path + '/'):
+                del self.summaries[path]
+
+    def write(self):
+        if self.summaries is not None:
+            self.summaries.write()
+
+    @property
+    def compress(self):
+        return self.project.prefs.get('compress_summaries', False)
+
+    @property
+    def persist(self):
+        return self.project.prefs.get('save_summaries', False)
@@ -0,0 +1,339 @@
+"""Watching project files for changes made outside rope
+
+Rope learns about the changes made by other programs only when
+`Project.validate()` is called and validating the project root checks
+every resource rope is interested in.  A `Watcher` finds out which
+files have changed and validates only those, so observers are
+informed about each change by `FilteredResourceObserver`\s as usual.
+
+On Linux the kernel reports changes using inotify, which is used
+through ``ctypes``.  Elsewhere, or when inotify cannot be used, the
+project is polled by comparing the modification time and size of its
+files.  Watchers do not use threads; `Watcher.check()` should be
+called every now and then, in the thread that uses the project.  For
+example::
+
+  watcher = Watcher(project)
+  ...
+  # when the editor is idle
+  watcher.check()
+  ...
+  watcher.close()
+
+"""
+import errno
+import os
+import stat
+import struct
+import sys
+import time
+
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
+
+
+class Watcher(object):
+    """Validates project resources changed by other programs
+
+    Changes are collected when `check()` is called.  Each changed path
+    is validated once no new events have been seen for it for `delay`
+    seconds, so a burst of writes to a file is reported once; the
+    paths that are not ready yet are validated in later calls.  If
+    `polling` is `True` or inotify is not available, the project is
+    polled at most once every `interval` seconds.
+
+    """
+
+    def __init__(self, project, delay=0.2, polling=False, interval=1.0):
+        self.project = project
+        self.delay = delay
+        self.pending = {}
+        self.backend = None
+        if not polling:
+            self.backend = _create_inotify(project)
+        if self.backend is None:
+            self.backend = _Poller(project, interval)
+
+    def check(self):
+        """Validate the resources changed since the last call
+
+        Returns the number of resources that were validated.
+
+        """
+        now = time.time()
+        for path, is_folder in self.backend.read():
+            if path == '':
+                # events were lost; everything should be validated
+                self.pending.clear()
+            elif '' in self.pending:
+                continue
+            self.pending[path] = (is_folder, now)
+        ready = []
+        for path, (is_folder, seen) in self.pending.items():
+            if now - seen >= self.delay:
+                ready.append((path, is_folder))
+        for path, is_folder in ready:
+            del self.pending[path]
+        resources = self._get_resources(ready)
+        for resource in resources:
+            self.project.validate(resource)
+        return len(resources)
+
+    def _get_resources(self, changes):
+        result = []
+        folders = []
+        for path, is_folder in sorted(changes):
+            if any(path.startswith(folder) for folder in folders):
+                continue
+            if is_folder:
+                result.append(self.project.get_folder(path))
+                folders.append(path + '/')
+            else:
+                result.append(self.project.get_file(path))
+            if path == '':
+                break
+        return result
+
+    def fileno(self):
+        """Return a file descriptor that is readable when files change
+
+        Returns `None` when polling.
+
+        """
+        return self.backend.fileno()
+
+    def close(self):
+        """Stop watching project files"""
+        self.backend.close()
+
+    @property
+    def polling(self):
+        return isinstance(self.backend, _Poller)
+
+
+class _Poller(object):
+    """Finds changed files by comparing file stats"""
+
+    def __init__(self, project, interval):
+        self.project = project
+        self.interval = interval
+        self.stamps = self._scan()
+        self.last = time.time()
+
+    def read(self):
+        now = time.time()
+        if now - self.last < self.interval:
+            return []
+        self.last = now
+        old = self.stamps
+        self.stamps = new = self._scan()
+        result = []
+        for path, (is_folder, stamp) in old.items():
+            if path not in new or new[path][0] != is_folder:
+                result.append((path, is_folder))
+            elif not is_folder and new[path][1] != stamp:
+                result.append((path, is_folder))
+        for path, (is_folder, stamp) in new.items():
+            if path not in old:
+                result.append((path, is_folder))
+        return result
+
+    def _scan(self):
+        result = {}
+        ignored = self.project.ignored
+        folders = ['']
+        while folders:
+            folder = folders.pop()
+            try:
+                names = os.listdir(self.project._get_resource_path(folder))
+            except OSError:
+                continue
+            for name in names:
+                if folder:
+                    path = folder + '/' + name
+                else:
+                    path = name
+                if ignored.does_match_path(path):
+                    continue
+                try:
+                    info = os.lstat(self.project._get_resource_path(path))
+                except OSError:
+                    continue
+                if stat.S_ISDIR(info.st_mode):
+                    result[path] = (True, None)
+                    folders.append(path)
+                elif stat.S_ISREG(info.st_mode):
+                    result[path] = (False, (info.st_mtime, info.st_size))
+        return result
+
+    def fileno(self):
+        return None
+
+    def close(self):
+        self.stamps = {}
+
+
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ONLYDIR = 0x1000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0x80000
+
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO |
+               _IN_CREATE | _IN_DELETE | _IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _create_inotify(project):
+    if ctypes is None or not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    try:
+        return _Inotify(project, libc)
+    except OSError:
+        return None
+
+
+class _Inotify(object):
+    """Reads inotify events of the folders of a project
+
+    Each folder is watched separately; watches are added for created
+    folders and removed for folders that are moved or removed.
+
+    """
+
+    def __init__(self, project, libc):
+        self.project = project
+        self.libc = libc
+        self.paths = {}
+        self.watches = {}
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise _get_error()
+        try:
+            self._add_watches('')
+        except OSError:
+            self.close()
+            raise
+
+    def read(self):
+        result = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError, e:
+                if e.errno == errno.EINTR:
+                    continue
+                if e.errno != errno.EAGAIN:
+                    raise
+                break
+            if not data:
+                break
+            self._parse_events(data, result)
+        return result
+
+    def _parse_events(self, data, result):
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip('\0')
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                result.append(('', True))
+                continue
+            if mask & _IN_IGNORED:
+                self._forget(wd)
+                continue
+            folder = self.paths.get(wd)
+            if folder is None or not name:
+                continue
+            if folder:
+                path = folder + '/' + name
+            else:
+                path = name
+            if self.project.ignored.does_match_path(path):
+                continue
+            is_folder = bool(mask & _IN_ISDIR)
+            if is_folder and mask & (_IN_MOVED_FROM | _IN_DELETE):
+                self._remove_watches(path)
+            if is_folder and mask & (_IN_MOVED_TO | _IN_CREATE):
+                try:
+                    self._add_watches(path)
+                except OSError:
+                    result.append(('', True))
+            result.append((path, is_folder))
+
+    def _add_watches(self, path):
+        folders = [path]
+        ignored = self.project.ignored
+        while folders:
+            folder = folders.pop()
+            real_path = self.project._get_resource_path(folder)
+            wd = self.libc.inotify_add_watch(self.fd, real_path, _WATCH_MASK)
+            if wd < 0:
+                error = _get_error()
+                if error.errno in (errno.ENOENT, errno.ENOTDIR):
+                    continue
+                raise error
+            self._forget(wd)
+            self.paths[wd] = folder
+            self.watches[folder] = wd
+            try:
+                names = os.listdir(real_path)
+            except OSError:
+                continue
+            for name in names:
+                if folder:
+                    child = folder + '/' + name
+                else:
+                    child = name
+                if ignored.does_match_path(child):
+                    continue
+                child_path = self.project._get_resource_path(child)
+                if os.path.isdir(child_path) and \
+                   not os.path.islink(child_path):
+                    folders.append(child)
+
+    def _remove_watches(self, path):
+        prefix = path + '/'
+        for folder in list(self.watches):
+            if folder == path or folder.startswith(prefix):
+                wd = self.watches.pop(folder)
+                del self.paths[wd]
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    def _forget(self, wd):
+        folder = self.paths.pop(wd, None)
+        if folder is not None and self.watches.get(folder) == wd:
+            del self.watches[folder]
+
+    def fileno(self):
+        return self.fd
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+            self.paths.clear()
+            self.watches.clear()
+
+
+def _get_error():
+    number = ctypes.get_errno()
+    return OSError(number, os.strerror(number))
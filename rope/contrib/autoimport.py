@@ -1,7 +1,9 @@
+import bisect
+import os
 import re
 
 from rope.base import (exceptions, pynames, resourceobserver,
-                       taskhandle, pyobjects, builtins, resources)
+                       taskhandle, pyobjects, builtins, resources, parallel)
 from rope.refactor import importutils
 
 
@@ -17,104 +19,179 @@ class AutoImport(object):
         """Construct an AutoImport object
 
         If `observe` is `True`, listen for project changes and update
-        the cache.
+        the cache.  The modules changed or removed since the cache
+        was saved are updated, too (see `refresh()`).
 
         If `underlined` is `True`, underlined names are cached, too.
         """
         self.project = project
         self.underlined = underlined
-        self.names = project.data_files.read_data('globalnames')
-        if self.names is None:
-            self.names = {}
+        self.store = project.data_files.get_store('globalnames')
+        self.names = {}
+        self.modules = {}
+        self._sorted = []
+        self._pending = []
+        self._stale = set()
+        self.stamps = {}
+        for modname, value in self.store.items():
+            if isinstance(value, tuple):
+                value, path, stamp = value
+                self.stamps[modname] = (path, stamp)
+            self._set_names(modname, value)
         project.data_files.add_write_hook(self._write)
         # XXX: using a filtered observer
         observer = resourceobserver.ResourceObserver(
-            changed=self._changed, moved=self._moved, removed=self._removed)
+            changed=self._changed, moved=self._moved, removed=self._removed,
+            batch=self._batch)
         if observe:
+            self.refresh()
             project.add_observer(observer)
 
-    def import_assist(self, starting):
-        """Return a list of ``(name, module)`` tuples
+    def refresh(self, task_handle=taskhandle.NullTaskHandle(),
+                processes=None):
+        """Update the modules that have changed outside rope
+
+        The modification time and size of the files of modules are
+        saved with their names.  The modules whose files have changed
+        since then are read again and those whose files no longer
+        exist are removed from the cache.  `processes` is like the
+        one in `generate_cache()`.
+
+        """
+        changed = []
+        for modname, (path, stamp) in self.stamps.items():
+            resource = self._path_to_resource(path)
+            new_stamp = None
+            if resource is not None:
+                new_stamp = _get_stamp(resource)
+            if new_stamp is None:
+                self._remove_module(modname)
+            elif new_stamp != stamp:
+                changed.append(resource)
+        job_set = task_handle.create_jobset('Refreshing autoimport cache',
+                                            len(changed))
+        self._update_resources(changed, None, job_set, processes)
+
+    def import_assist(self, starting, limit=None):
+        """Generate ``(name, module)`` tuples
 
         This function tries to find modules that have a global name
-        that starts with `starting`.
+        that starts with `starting`.  Names are generated in sorted
+        order and for each name, its modules are sorted, too.  If
+        `limit` is not `None`, at most `limit` tuples are generated.
         """
-        # XXX: breaking if gave up! use generators
-        result = []
-        for module in self.names:
-            for global_name in self.names[module]:
-                if global_name.startswith(starting):
-                    result.append((global_name, module))
-        return result
+        names = self._get_sorted_names()
+        count = 0
+        index = bisect.bisect_left(names, starting)
+        while index < len(names) and names[index].startswith(starting):
+            name = names[index]
+            index += 1
+            if name in self._stale:
+                continue
+            for module in sorted(self.modules.get(name, ())):
+                if limit is not None and count >= limit:
+                    return
+                count += 1
+                yield name, module
 
     def get_modules(self, name):
         """Return the list of modules that have global `name`"""
-        result = []
-        for module in self.names:
-            if name in self.names[module]:
-                result.append(module)
-        return result
+        return sorted(self.modules.get(name, ()))
 
     def get_all_names(self):
         """Return the list of all cached global names"""
-        result = set()
-        for module in self.names:
-            result.update(set(self.names[module]))
-        return result
+        return set(self.modules)
 
     def get_name_locations(self, name):
         """Return a list of ``(resource, lineno)`` tuples"""
         result = []
         pycore = self.project.pycore
-        for module in self.names:
-            if name in self.names[module]:
-                try:
-                    pymodule = pycore.get_module(module)
-                    if name in pymodule:
-                        pyname = pymodule[name]
-                        module, lineno = pyname.get_definition_location()
-                        if module is not None:
-                            resource = module.get_module().get_resource()
-                            if resource is not None and lineno is not None:
-                                result.append((resource, lineno))
-                except exceptions.ModuleNotFoundError:
-                    pass
+        for module in self.get_modules(name):
+            try:
+                pymodule = pycore.get_module(module)
+                if name in pymodule:
+                    pyname = pymodule[name]
+                    module, lineno = pyname.get_definition_location()
+                    if module is not None:
+                        resource = module.get_module().get_resource()
+                        if resource is not None and lineno is not None:
+                            result.append((resource, lineno))
+            except exceptions.ModuleNotFoundError:
+                pass
         return result
 
     def generate_cache(self, resources=None, underlined=None,
-                       task_handle=taskhandle.NullTaskHandle()):
+                       task_handle=taskhandle.NullTaskHandle(),
+                       processes=None):
         """Generate global name cache for project files
 
         If `resources` is a list of `rope.base.resource.File`\s, only
         those files are searched; otherwise all python modules in the
-        project are cached.
+        project are cached.  If `processes` is not `None`, modules are
+        read in this many worker processes (see `rope.base.parallel`).
 
         """
         if resources is None:
             resources = self.project.pycore.get_python_files()
         job_set = task_handle.create_jobset(
             'Generatig autoimport cache', len(resources))
-        for file in resources:
-            job_set.started_job('Working on <%s>' % file.path)
-            self.update_resource(file, underlined)
-            job_set.finished_job()
+        self._update_resources(resources, underlined, job_set, processes)
 
     def generate_modules_cache(self, modules, underlined=None,
-                               task_handle=taskhandle.NullTaskHandle()):
-        """Generate global name cache for modules listed in `modules`"""
-        job_set = task_handle.create_jobset(
-            'Generatig autoimport cache for modules', len(modules))
+                               task_handle=taskhandle.NullTaskHandle(),
+                               processes=None):
+        """Generate global name cache for modules listed in `modules`
+
+        Modules whose names end with ``.*`` are expanded to all of
+        their submodules.  `processes` is like the one in
+        `generate_cache()`; extension modules are always handled in
+        the current process.
+
+        """
+        pycore = self.project.pycore
+        resources = []
+        extension_modules = []
         for modname in modules:
-            job_set.started_job('Working on <%s>' % modname)
             if modname.endswith('.*'):
-                mod = self.project.pycore.find_module(modname[:-2])
+                mod = pycore.find_module(modname[:-2])
                 if mod:
-                    for sub in submodules(mod):
-                        self.update_resource(sub, underlined)
+                    resources.extend(submodules(mod))
             else:
-                self.update_module(modname, underlined)
+                resource = pycore.find_module(modname)
+                if resource is not None:
+                    resources.append(resource)
+                else:
+                    extension_modules.append(modname)
+        job_set = task_handle.create_jobset(
+            'Generatig autoimport cache for modules',
+            len(resources) + len(extension_modules))
+        self._update_resources(resources, underlined, job_set, processes)
+        for modname in extension_modules:
+            job_set.started_job('Working on <%s>' % modname)
+            self.update_module(modname, underlined)
             job_set.finished_job()
 
+    def _update_resources(self, resources, underlined, job_set, processes):
+        if underlined is None:
+            underlined = self.underlined
+        worker = _GlobalNames(underlined)
+        if processes is None:
+            results = self._get_global_names(worker, resources, job_set)
+        else:
+            results = parallel.map_resources(self.project, worker,
+                                             resources, job_set, processes)
+        for resource, globals in results:
+            if globals is not None:
+                self._save_names(self._module_name(resource), globals,
+                                 resource)
+
+    def _get_global_names(self, worker, resources, job_set):
+        for resource in resources:
+            job_set.started_job('Working on <%s>' % resource.path)
+            globals = worker(self.project, resource)
+            job_set.finished_job()
+            yield resource, globals
+
     def clear_cache(self):
         """Clear all entries in global-name cache
 
@@ -123,6 +200,12 @@ class AutoImport(object):
 
         """
         self.names.clear()
+        self.stamps.clear()
+        self.modules.clear()
+        self._sorted = []
+        del self._pending[:]
+        self._stale.clear()
+        self.store.clear()
 
     def find_insertion_line(self, code):
         """Guess at what line the new import should be inserted"""
@@ -145,12 +228,8 @@ class AutoImport(object):
 
     def update_resource(self, resource, underlined=None):
         """Update the cache for global names in `resource`"""
-        try:
-            pymodule = self.project.pycore.resource_to_pyobject(resource)
-            modname = self._module_name(resource)
-            self._add_names(pymodule, modname, underlined)
-        except exceptions.ModuleSyntaxError:
-            pass
+        self._update_resources([resource], underlined,
+                               taskhandle.NullJobSet(), None)
 
     def update_module(self, modname, underlined=None):
         """Update the cache for global names in `modname` module
@@ -181,10 +260,81 @@ class AutoImport(object):
                 globals.append(name)
             if isinstance(pymodule, builtins.BuiltinModule):
                 globals.append(name)
-        self.names[modname] = globals
+        self._save_names(modname, globals)
+
+    def _save_names(self, modname, globals, resource=None):
+        self._set_names(modname, globals)
+        stamp = None
+        if resource is not None:
+            stamp = _get_stamp(resource)
+        if stamp is not None:
+            path = resource.path
+            self.stamps[modname] = (path, stamp)
+            self.store[modname] = (globals, path, stamp)
+        else:
+            self.stamps.pop(modname, None)
+            self.store[modname] = globals
+
+    def _path_to_resource(self, path):
+        try:
+            if os.path.isabs(path):
+                import rope.base.project
+                project = rope.base.project.get_no_project()
+                return project.get_resource(path)
+            return self.project.get_resource(path)
+        except exceptions.ResourceNotFoundError:
+            return None
 
     def _write(self):
-        self.project.data_files.write_data('globalnames', self.names)
+        self.store.write()
+
+    def _set_names(self, modname, globals):
+        self._remove_names(modname)
+        self.names[modname] = globals
+        for name in globals:
+            modules = self.modules.get(name)
+            if modules is None:
+                modules = self.modules[name] = set()
+                if name in self._stale:
+                    self._stale.remove(name)
+                else:
+                    self._pending.append(name)
+            modules.add(modname)
+
+    def _remove_names(self, modname):
+        for name in self.names.pop(modname, ()):
+            modules = self.modules.get(name)
+            if modules is None:
+                continue
+            modules.discard(modname)
+            if not modules:
+                del self.modules[name]
+                self._stale.add(name)
+
+    def _get_sorted_names(self):
+        """Return the sorted list of names
+
+        New names are added to the end of the list and it is sorted
+        again when it is needed; it is nearly sorted and so sorting
+        it is fast.  Removed names are left in the list unless there
+        are many of them.
+
+        """
+        if len(self._stale) > len(self._sorted) // 4:
+            self._sorted = sorted(self.modules)
+            del self._pending[:]
+            self._stale.clear()
+        if self._pending:
+            self._sorted.extend(self._pending)
+            self._sorted.sort()
+            del self._pending[:]
+        return self._sorted
+
+    def _remove_module(self, modname):
+        if modname in self.names:
+            self._remove_names(modname)
+            self.stamps.pop(modname, None)
+            del self.store[modname]
 
     def _changed(self, resource):
         if not resource.is_folder():
@@ -192,16 +342,75 @@ class AutoImport(object):
 
     def _moved(self, resource, newresource):
         if not resource.is_folder():
-            modname = self._module_name(resource)
-            if modname in self.names:
-                del self.names[modname]
+            self._remove_module(self._module_name(resource))
             self.update_resource(newresource)
 
     def _removed(self, resource):
         if not resource.is_folder():
-            modname = self._module_name(resource)
-            if modname in self.names:
-                del self.names[modname]
+            self._remove_module(self._module_name(resource))
+
+    def _batch(self, events):
+        # changed modules are updated together after the other events
+        changed = []
+        for event in events:
+            resource = event[1]
+            if resource.is_folder():
+                continue
+            if event[0] == 'changed':
+                changed.append(resource)
+            elif event[0] in ('moved', 'removed'):
+                self._remove_module(self._module_name(resource))
+                if event[0] == 'moved':
+                    changed.append(event[2])
+        resources = []
+        seen = set()
+        for resource in changed:
+            if resource not in seen and resource.exists():
+                resources.append(resource)
+                seen.add(resource)
+        self._update_resources(resources, None, taskhandle.NullJobSet(),
+                               None)
+
+
+def _get_stamp(resource):
+    """Return the modification time and size of a module's file"""
+    try:
+        if resource.is_folder():
+            resource = resource.get_child('__init__.py')
+        stat = os.stat(resource.real_path)
+        return (stat.st_mtime, stat.st_size)
+    except (OSError, exceptions.ResourceNotFoundError):
+        return None
+
+
+class _GlobalNames(object):
+    """Returns the global names of a module using its summary
+
+    Module summaries can be computed without building `PyModule`\s;
+    they are cached on disk, too.  `None` is returned for modules
+    with syntax errors.
+
+    """
+
+    def __init__(self, underlined):
+        self.underlined = underlined
+
+    def __call__(self, project, resource):
+        if resource.is_folder():
+            if not resource.has_child('__init__.py'):
+                return []
+            resource = resource.get_child('__init__.py')
+        try:
+            summary = project.pycore.get_summary(resource)
+        except (IOError, OSError):
+            return None
+        if summary.syntax_error is not None:
+            return None
+        return [name for name in summary.get_names(_KINDS)
+                if self.underlined or not name.startswith('_')]
+
+
+_KINDS = ('class', 'function', 'assigned')
 
 
 def submodules(mod):
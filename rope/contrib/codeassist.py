@@ -4,8 +4,8 @@ import warnings
 
 import rope.base.codeanalyze
 import rope.base.evaluate
-from rope.base import pyobjects, pyobjectsdef, pynames, builtins, exceptions, worder
-from rope.base.codeanalyze import SourceLinesAdapter
+from rope.base import (pyobjects, pyobjectsdef, pynames, builtins,
+                       exceptions, worder, resourceobserver)
 from rope.contrib import fixsyntax
 from rope.refactor import functionutils
 
@@ -55,6 +55,10 @@ def get_doc(project, source_code, offset, resource=None, maxfixes=1):
     """Get the pydoc"""
     fixer = fixsyntax.FixSyntax(project.pycore, source_code,
                                 resource, maxfixes)
+    return _get_doc(fixer, offset)
+
+
+def _get_doc(fixer, offset):
     pymodule = fixer.get_pymodule()
     pyname = fixer.pyname_at(offset)
     if pyname is None:
@@ -90,6 +94,10 @@ def get_calltip(project, source_code, offset, resource=None,
     """
     fixer = fixsyntax.FixSyntax(project.pycore, source_code,
                                 resource, maxfixes)
+    return _get_calltip(fixer, offset, ignore_unknown, remove_self)
+
+
+def _get_calltip(fixer, offset, ignore_unknown, remove_self):
     pymodule = fixer.get_pymodule()
     pyname = fixer.pyname_at(offset)
     if pyname is None:
@@ -110,6 +118,10 @@ def get_definition_location(project, source_code, offset,
     """
     fixer = fixsyntax.FixSyntax(project.pycore, source_code,
                                 resource, maxfixes)
+    return _get_definition_location(fixer, offset)
+
+
+def _get_definition_location(fixer, offset):
     pymodule = fixer.get_pymodule()
     pyname = fixer.pyname_at(offset)
     if pyname is not None:
@@ -119,6 +131,106 @@ def get_definition_location(project, source_code, offset,
     return (None, None)
 
 
+class BufferSession(object):
+    """Code assist for a buffer that is being edited
+
+    The functions of this module parse the code they are given on
+    every call.  A `BufferSession` keeps the `PyModule` of the code it
+    parsed last, together with its scopes and the objects inferred
+    from it, and uses it again as long as the buffer has changed only
+    in the line code assist is asked for; that is what happens while
+    typing.  Edits that add or remove lines or change other lines and
+    changes to project resources make it parse the code again.
+
+    The changes to the buffer should be reported using `edit()` or
+    `set_code()`.  `close()` should be called when the buffer is
+    closed.
+
+    """
+
+    def __init__(self, project, source_code, resource=None, maxfixes=1):
+        self.project = project
+        self.code = source_code
+        self.resource = resource
+        self.maxfixes = maxfixes
+        self.pymodule = None
+        self.edited_lines = set()
+        self.observer = resourceobserver.ResourceObserver(
+            batch=self._resources_changed)
+        project.add_observer(self.observer)
+
+    def edit(self, start, end, text):
+        """Replace ``code[start:end]`` with `text`"""
+        removed = self.code[start:end]
+        self.code = self.code[:start] + text + self.code[end:]
+        if '\n' in removed or '\n' in text:
+            self.pymodule = None
+        elif self.pymodule is not None:
+            self.edited_lines.add(self.code.count('\n', 0, start) + 1)
+
+    def set_code(self, source_code):
+        """Set the contents of the buffer"""
+        old = self.code
+        start = _common_prefix(old, source_code)
+        end = _common_prefix(old[start:][::-1], source_code[start:][::-1])
+        self.edit(start, len(old) - end,
+                  source_code[start:len(source_code) - end])
+
+    def code_assist(self, offset, later_locals=True):
+        """Return code completions; see `code_assist()` function"""
+        assist = _PythonCodeAssist(
+            self.project, self.code, offset, resource=self.resource,
+            maxfixes=self.maxfixes, later_locals=later_locals,
+            fixer=self._get_fixer(offset))
+        return assist()
+
+    def get_doc(self, offset):
+        """Return the pydoc; see `get_doc()` function"""
+        return _get_doc(self._get_fixer(offset), offset)
+
+    def get_calltip(self, offset, ignore_unknown=False, remove_self=False):
+        """Return the calltip; see `get_calltip()` function"""
+        return _get_calltip(self._get_fixer(offset), offset,
+                            ignore_unknown, remove_self)
+
+    def get_definition_location(self, offset):
+        """Return the definition location; see `get_definition_location()`"""
+        return _get_definition_location(self._get_fixer(offset), offset)
+
+    def close(self):
+        """Stop observing project resources"""
+        self.project.remove_observer(self.observer)
+        self.pymodule = None
+
+    def _get_fixer(self, offset):
+        lineno = self.code.count('\n', 0, offset) + 1
+        if self.edited_lines - set([lineno]):
+            self.pymodule = None
+        fixer = fixsyntax.FixSyntax(self.project.pycore, self.code,
+                                    self.resource, self.maxfixes,
+                                    pymodule=self.pymodule)
+        if self.pymodule is None:
+            self.pymodule = fixer.get_pymodule()
+            self.edited_lines = set()
+        return fixer
+
+    def _resources_changed(self, events):
+        self.pymodule = None
+
+
+def _common_prefix(text1, text2):
+    """Return the length of the common prefix of two strings"""
+    low = 0
+    high = min(len(text1), len(text2))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if text1[low:middle] == text2[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
 def find_occurrences(*args, **kwds):
     import rope.contrib.findit
     warnings.warn('Use `rope.contrib.findit.find_occurrences()` instead',
@@ -292,13 +404,14 @@ def default_templates():
 class _PythonCodeAssist(object):
 
     def __init__(self, project, source_code, offset, resource=None,
-                 maxfixes=1, later_locals=True):
+                 maxfixes=1, later_locals=True, fixer=None):
         self.project = project
         self.pycore = self.project.pycore
         self.code = source_code
         self.resource = resource
         self.maxfixes = maxfixes
         self.later_locals = later_locals
+        self.fixer = fixer
         self.word_finder = worder.Worder(source_code, True)
         self.expression, self.starting, self.offset = \
             self.word_finder.get_splitted_primary_before(offset)
@@ -388,8 +501,10 @@ class _PythonCodeAssist(object):
 
     def _code_completions(self):
         lineno = self.code.count('\n', 0, self.offset) + 1
-        fixer = fixsyntax.FixSyntax(self.pycore, self.code,
-                                    self.resource, self.maxfixes)
+        fixer = self.fixer
+        if fixer is None:
+            fixer = fixsyntax.FixSyntax(self.pycore, self.code,
+                                        self.resource, self.maxfixes)
         pymodule = fixer.get_pymodule()
         module_scope = pymodule.get_scope()
         code = pymodule.source_code
@@ -412,9 +527,7 @@ class _PythonCodeAssist(object):
         offset = self.offset
         if offset == 0:
             return {}
-        word_finder = worder.Worder(self.code, True)
-        lines = SourceLinesAdapter(self.code)
-        lineno = lines.get_line_number(offset)
+        word_finder = self.word_finder
         if word_finder.is_on_function_call_keyword(offset - 1):
             name_finder = rope.base.evaluate.ScopeNameFinder(pymodule)
             function_parens = word_finder.\
@@ -1,36 +1,85 @@
 import rope.base.codeanalyze
 import rope.base.evaluate
 import rope.base.pyobjects
-from rope.base import taskhandle, exceptions, worder
+from rope.base import taskhandle, exceptions, worder, parallel
 from rope.contrib import fixsyntax
 from rope.refactor import occurrences
 
 
 def find_occurrences(project, resource, offset, unsure=False, resources=None,
-                     in_hierarchy=False, task_handle=taskhandle.NullTaskHandle()):
+                     in_hierarchy=False, task_handle=taskhandle.NullTaskHandle(),
+                     processes=None):
     """Return a list of `Location`\s
 
     If `unsure` is `True`, possible matches are returned, too.  You
     can use `Location.unsure` to see which are unsure occurrences.
     `resources` can be a list of `rope.base.resource.File`\s that
     should be searched for occurrences; if `None` all python files
-    in the project are searched.
+    in the project are searched.  If `processes` is not `None`,
+    files are searched in this many worker processes (see
+    `rope.base.parallel`).
 
     """
     name = worder.get_name_at(resource, offset)
+    if resources is None:
+        resources = project.pycore.get_python_files()
+    resources = project.pycore.name_index.get_candidates(name, resources)
+    job_set = task_handle.create_jobset('Finding Occurrences',
+                                        count=len(resources))
+    if processes is not None:
+        worker = _OccurrencesWorker(resource.path, offset,
+                                    unsure, in_hierarchy)
+        result = []
+        for file_, locations in parallel.map_resources(
+                project, worker, resources, job_set, processes):
+            for location in locations:
+                location.resource = file_
+                result.append(location)
+        return result
+    finder = _create_occurrences_finder(project, resource, offset,
+                                        unsure, in_hierarchy)
+    return _find_locations(finder, resources, job_set)
+
+
+def _create_occurrences_finder(project, resource, offset,
+                               unsure, in_hierarchy):
+    name = worder.get_name_at(resource, offset)
     this_pymodule = project.pycore.resource_to_pyobject(resource)
     primary, pyname = rope.base.evaluate.eval_location2(
         this_pymodule, offset)
     def is_match(occurrence):
         return unsure
-    finder = occurrences.create_finder(
+    return occurrences.create_finder(
         project.pycore, name, pyname, unsure=is_match,
         in_hierarchy=in_hierarchy, instance=primary)
-    if resources is None:
-        resources = project.pycore.get_python_files()
-    job_set = task_handle.create_jobset('Finding Occurrences',
-                                        count=len(resources))
-    return _find_locations(finder, resources, job_set)
+
+
+class _OccurrencesWorker(object):
+    """Finds occurrences in the worker processes of `find_occurrences()`
+
+    The returned `Location`\s have no `resource`; it is set in the
+    main process.
+
+    """
+
+    def __init__(self, path, offset, unsure, in_hierarchy):
+        self.path = path
+        self.offset = offset
+        self.unsure = unsure
+        self.in_hierarchy = in_hierarchy
+        self.finder = None
+
+    def __call__(self, project, resource):
+        if self.finder is None:
+            self.finder = _create_occurrences_finder(
+                project, project.get_resource(self.path), self.offset,
+                self.unsure, self.in_hierarchy)
+        result = []
+        for occurrence in self.finder.find_occurrences(resource):
+            location = Location(occurrence)
+            location.resource = None
+            result.append(location)
+        return result
 
 
 def find_implementations(project, resource, offset, resources=None,
@@ -61,6 +110,7 @@ def find_implementations(project, resource, offset, resources=None,
     finder = occurrences.Finder(project.pycore, name, filters=filters)
     if resources is None:
         resources = project.pycore.get_python_files()
+    resources = project.pycore.name_index.get_candidates(name, resources)
     job_set = task_handle.create_jobset('Finding Implementations',
                                         count=len(resources))
     return _find_locations(finder, resources, job_set)
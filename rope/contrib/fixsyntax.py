@@ -1,20 +1,39 @@
 import rope.base.codeanalyze
 import rope.base.evaluate
-from rope.base import worder, exceptions, utils
+from rope.base import ast, fscommands, worder, exceptions, utils
 from rope.base.codeanalyze import ArrayLinesAdapter, LogicalLineFinder
 
 
 class FixSyntax(object):
+    """Makes a `PyModule` for code that might have syntax errors
 
-    def __init__(self, pycore, code, resource, maxfixes=1):
+    If `pymodule` is given, it is used instead of parsing `code`; it
+    should be the module of an older version of `code` whose lines
+    are the same as those of `code` except for the lines whose names
+    are looked up.
+
+    When `code` has syntax errors and `resource` holds a version of it
+    without errors, the errors are looked for and commented in the
+    statements of the innermost class, function or module body that
+    hold the changed lines; only these statements are parsed while
+    fixing them.  The whole module is parsed once they are fixed.
+
+    """
+
+    def __init__(self, pycore, code, resource, maxfixes=1, pymodule=None):
         self.pycore = pycore
         self.code = code
         self.resource = resource
         self.maxfixes = maxfixes
+        self.pymodule = pymodule
 
-    @utils.saveit
     def get_pymodule(self):
         """Get a `PyModule`"""
+        if self.pymodule is None:
+            self.pymodule = self._parse()
+        return self.pymodule
+
+    def _parse(self):
         errors = []
         code = self.code
         tries = 0
@@ -27,6 +46,10 @@ class FixSyntax(object):
                 return self.pycore.get_string_module(
                     code, resource=self.resource, force_errors=True)
             except exceptions.ModuleSyntaxError, e:
+                if tries == 0 and self.maxfixes > 0:
+                    pymodule = self._parse_region(e.lineno)
+                    if pymodule is not None:
+                        return pymodule
                 if tries < self.maxfixes:
                     tries += 1
                     self.commenter.comment(e.lineno)
@@ -41,6 +64,80 @@ class FixSyntax(object):
                     raise exceptions.ModuleSyntaxError(e.filename, e.lineno,
                                                        new_message)
 
+    def _parse_region(self, lineno):
+        saved = self._get_saved_module()
+        if saved is None or '\r' in self.code:
+            return None
+        filename = self.resource.path
+        old_lines = saved.source_code.split('\n')
+        lines = self.code.split('\n')
+        prefix = _common_lines(old_lines, lines)
+        suffix = _common_lines(reversed(old_lines[prefix:]),
+                               reversed(lines[prefix:]))
+        shift = len(lines) - len(old_lines)
+        # the region should hold the changed lines and `lineno`
+        first = min(prefix + 1, lineno)
+        last = max(len(old_lines) - suffix, lineno - shift)
+        body = saved.get_ast().body
+        start, begin, end, stop = _find_region(body, first, last, shift,
+                                               len(lines) + 1)
+        if begin is None:
+            start, begin = 1, 0
+        if begin == 0 and stop == len(body):
+            # the whole module would be parsed anyway
+            return None
+        # descending into the classes and functions that hold the region
+        indents = []
+        while stop - begin == 1 and \
+              isinstance(body[begin], (ast.ClassDef, ast.FunctionDef)):
+            inner = _find_region(body[begin].body, first, last, shift, end)
+            if inner[1] is None:
+                break
+            body = body[begin].body
+            start, begin, end, stop = inner
+            indents.append(_get_indent_string(old_lines[start - 1]))
+        commenter = _Commenter(self.code, start - 1, end - 1)
+        encoding = fscommands.read_str_coding(self.code)
+        for tries in range(self.maxfixes):
+            if lineno <= commenter.start:
+                return None
+            try:
+                commenter.comment(min(lineno, commenter.end))
+            except IndentationError:
+                # the logical lines could not be found in the region
+                return None
+            try:
+                bodies = _parse_lines(commenter.lines, commenter.start,
+                                      commenter.end, filename, encoding,
+                                      indents)
+                break
+            except exceptions.ModuleSyntaxError, e:
+                lineno = e.lineno
+        else:
+            return None
+        if any(bodies[:-1]):
+            return None
+        try:
+            # the nodes of the module of `resource` are not shared
+            pymodule = self.pycore.get_string_module(
+                '\n'.join(commenter.lines), resource=self.resource,
+                force_errors=True)
+        except exceptions.ModuleSyntaxError:
+            return None
+        self._commenter = commenter
+        return pymodule
+
+    def _get_saved_module(self):
+        if self.resource is None or not self.resource.exists():
+            return None
+        try:
+            pymodule = self.pycore.resource_to_pyobject(self.resource)
+            if not pymodule.has_errors:
+                pymodule.get_ast()
+                return pymodule
+        except exceptions.ModuleSyntaxError:
+            pass
+
     @property
     @utils.saveit
     def commenter(self):
@@ -68,16 +165,29 @@ class FixSyntax(object):
 
 
 class _Commenter(object):
+    """Comments out the statements with syntax errors
+
+    If `end` is not `None`, only the lines in ``lines[start:end]``
+    are looked at when finding the statements to comment.
 
-    def __init__(self, code):
+    """
+
+    def __init__(self, code, start=0, end=None):
         self.code = code
         self.lines = self.code.split('\n')
         self.lines.append('\n')
         self.origs = range(len(self.lines) + 1)
         self.diffs = [0] * (len(self.lines) + 1)
+        self.start = start
+        self.region = end is not None
+        if end is None:
+            end = len(self.lines)
+        self.end = end
 
     def comment(self, lineno):
-        start = _logical_start(self.lines, lineno, check_prev=True) - 1
+        lines = self.lines[self.start:self.end]
+        start = _logical_start(lines, lineno - self.start,
+                               check_prev=True) + self.start - 1
         # using self._get_stmt_end() instead of self._get_block_end()
         # to lower commented lines
         end = self._get_stmt_end(start)
@@ -121,13 +231,11 @@ class _Commenter(object):
         return lineno
 
     def _fix_incomplete_try_blocks(self, lineno, indents):
-        block_start = lineno
-        last_indents = current_indents = indents
-        while block_start > 0:
-            block_start = rope.base.codeanalyze.get_block_start(
-                ArrayLinesAdapter(self.lines), block_start) - 1
-            if self.lines[block_start].strip().startswith('try:'):
-                indents = _get_line_indents(self.lines[block_start])
+        last_indents = indents
+        for block_start in self._get_block_starts(lineno):
+            line = self.lines[block_start]
+            if line.strip().startswith('try:'):
+                indents = _get_line_indents(line)
                 if indents > last_indents:
                     continue
                 last_indents = indents
@@ -139,6 +247,18 @@ class _Commenter(object):
                     self._insert(block_end, ' ' * indents + 'finally:')
                     self._insert(block_end + 1, ' ' * indents + '    pass')
 
+    def _get_block_starts(self, lineno):
+        if self.region:
+            # only the lines of the region are looked at
+            for block_start in range(lineno - 1, self.start - 1, -1):
+                yield block_start
+            return
+        block_start = lineno
+        while block_start > 0:
+            block_start = rope.base.codeanalyze.get_block_start(
+                ArrayLinesAdapter(self.lines), block_start) - 1
+            yield block_start
+
     def _find_matching_deindent(self, line_number):
         indents = _get_line_indents(self.lines[line_number])
         current_line = line_number + 1
@@ -159,6 +279,8 @@ class _Commenter(object):
         self.diffs[self.origs[lineno]] += len(line) + 1
         self.origs.insert(lineno, self.origs[lineno])
         self.lines.insert(lineno, line)
+        if lineno < self.end:
+            self.end += 1
 
 def _logical_start(lines, lineno, check_prev=False):
     logical_finder = LogicalLineFinder(ArrayLinesAdapter(lines))
@@ -176,3 +298,91 @@ def _logical_start(lines, lineno, check_prev=False):
 
 def _get_line_indents(line):
     return rope.base.codeanalyze.count_line_indents(line)
+
+
+def _get_statement_start(node):
+    """Return the first line of a statement
+
+    `None` is returned for multi-line strings; their nodes hold the
+    line they end in.
+
+    """
+    if node.col_offset == -1:
+        return None
+    lines = [node.lineno]
+    for decorator in getattr(node, 'decorator_list', ()):
+        lines.append(decorator.lineno)
+    return min(lines)
+
+
+def _find_region(body, first, last, shift, end):
+    """Find the statements of `body` that hold lines `first` to `last`
+
+    Returns a ``(start, begin, end, stop)`` tuple; ``body[begin:stop]``
+    are the statements and `start` and `end` are the lines they start
+    and end before after shifting the lines after `last` by `shift`.
+    `begin` is `None` if no statement starts before `first`.
+
+    """
+    start = begin = None
+    stop = len(body)
+    for index, node in enumerate(body):
+        line = _get_statement_start(node)
+        if line is None:
+            continue
+        if line <= first:
+            start, begin = line, index
+        elif line > last:
+            end, stop = line + shift, index
+            break
+    return start, begin, end, stop
+
+
+def _common_lines(lines1, lines2):
+    count = 0
+    for line1, line2 in zip(lines1, lines2):
+        if line1 != line2:
+            break
+        count += 1
+    return count
+
+
+def _parse_lines(lines, start, end, filename, encoding, indents=()):
+    """Parse ``lines[start:end]`` keeping their line numbers
+
+    `indents` are the indentations of the blocks that hold the lines;
+    ``if 1:`` headers are inserted for them in the lines before
+    `start`, followed by ``pass`` statements if there is room, so that
+    the blocks can be empty.  Returns the statements parsed in each of
+    these blocks and at the top level, outermost first.
+
+    """
+    headers = []
+    header_indent = ''
+    for indent in indents:
+        headers.append(header_indent + 'if 1:')
+        if 2 * len(indents) <= start:
+            headers.append(indent + 'pass')
+        header_indent = indent
+    if len(headers) > start:
+        raise exceptions.ModuleSyntaxError(filename, start + 1,
+                                           'no room for block headers')
+    source = '\n' * (start - len(headers)) + \
+             '\n'.join(headers + lines[start:end]) + '\n'
+    try:
+        source = fscommands.unicode_to_file_data(source, encoding)
+        body = ast.parse(source, filename).body
+    except SyntaxError, e:
+        raise exceptions.ModuleSyntaxError(filename, e.lineno, e.msg)
+    except UnicodeError, e:
+        raise exceptions.ModuleSyntaxError(filename, 1, str(e))
+    result = []
+    for indent in indents:
+        result.append([node for node in body if node.lineno > start])
+        body = [node for node in body if node.lineno <= start][-1].body
+    result.append([node for node in body if node.lineno > start])
+    return result
+
+
+def _get_indent_string(line):
+    return line[:len(line) - len(line.lstrip())]
@@ -126,6 +126,8 @@ class InlineMethod(_Inliner):
             resources = [self.original]
             if remove:
                 resources.append(self.resource)
+        resources = self.pycore.name_index.get_candidates(
+            self.name, resources, keep=[self.resource])
         job_set = task_handle.create_jobset('Collecting Changes',
                                             len(resources))
         for file in resources:
@@ -236,6 +238,8 @@ class InlineVariable(_Inliner):
             resources = [self.original]
             if remove and self.original != self.resource:
                 resources.append(self.resource)
+        resources = self.pycore.name_index.get_candidates(
+            self.name, resources, keep=[self.resource])
         changes = ChangeSet('Inline variable <%s>' % self.name)
         jobset = task_handle.create_jobset('Calculating changes',
                                            len(resources))
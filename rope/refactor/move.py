@@ -242,6 +242,8 @@ class MoveGlobal(object):
 
     def _calculate_changes(self, dest, resources, task_handle):
         changes = ChangeSet('Moving global <%s>' % self.old_name)
+        resources = self.pycore.name_index.get_candidates(
+            self.old_name, resources, keep=[self.source, dest])
         job_set = task_handle.create_jobset('Collecting Changes',
                                             len(resources))
         for file_ in resources:
@@ -395,6 +397,8 @@ class MoveModule(object):
 
     def _calculate_changes(self, dest, resources, task_handle):
         changes = ChangeSet('Moving module <%s>' % self.old_name)
+        resources = self.pycore.name_index.get_candidates(
+            self.old_name, resources, keep=[self.source])
         job_set = task_handle.create_jobset('Collecting changes',
                                             len(resources))
         for module in resources:
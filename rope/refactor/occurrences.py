@@ -28,6 +28,9 @@ class Finder(object):
 
     def find_occurrences(self, resource=None, pymodule=None):
         """Generate `Occurrence` instances"""
+        if pymodule is None and \
+           not self.pycore.name_index.might_contain(resource, self.name):
+            return
         tools = _OccurrenceToolsCreator(self.pycore, resource=resource,
                                         pymodule=pymodule, docs=self.docs)
         for offset in self._textual_finder.find_offsets(tools.source_code):
@@ -1,6 +1,6 @@
 import warnings
 
-from rope.base import exceptions, pyobjects, pynames, taskhandle, evaluate, worder, codeanalyze
+from rope.base import exceptions, pyobjects, pynames, taskhandle, evaluate, worder, codeanalyze, parallel
 from rope.base.change import ChangeSet, ChangeContents, MoveResource
 from rope.refactor import occurrences, sourceutils
 
@@ -18,6 +18,7 @@ class Rename(object):
         self.project = project
         self.pycore = project.pycore
         self.resource = resource
+        self.offset = offset
         if offset is not None:
             self.old_name = worder.get_name_at(self.resource, offset)
             this_pymodule = self.pycore.resource_to_pyobject(self.resource)
@@ -44,7 +45,7 @@ class Rename(object):
 
     def get_changes(self, new_name, in_file=None, in_hierarchy=False,
                     unsure=None, docs=False, resources=None,
-                    task_handle=taskhandle.NullTaskHandle()):
+                    task_handle=taskhandle.NullTaskHandle(), processes=None):
         """Get the changes needed for this refactoring
 
         Parameters:
@@ -64,6 +65,9 @@ class Rename(object):
           will be applied to all python files.
         - `in_file`: this argument has been deprecated; use
           `resources` instead.
+        - `processes`: if not `None`, files are searched in this
+          many worker processes (see `rope.base.parallel`).  `unsure`
+          should be picklable in that case.
 
         """
         if unsure in (True, False):
@@ -85,23 +89,41 @@ class Rename(object):
             resources = self.pycore.get_python_files()
         changes = ChangeSet('Renaming <%s> to <%s>' %
                             (self.old_name, new_name))
-        finder = occurrences.create_finder(
-            self.pycore, self.old_name, self.old_pyname, unsure=unsure,
-            docs=docs, instance=self.old_instance,
-            in_hierarchy=in_hierarchy and self.is_method())
-        job_set = task_handle.create_jobset('Collecting Changes', len(resources))
-        for file_ in resources:
-            job_set.started_job(file_.path)
-            new_content = rename_in_module(finder, new_name, resource=file_)
+        candidates = self.pycore.name_index.get_candidates(self.old_name,
+                                                           resources)
+        job_set = task_handle.create_jobset('Collecting Changes',
+                                            len(candidates))
+        if processes is None:
+            finder = self._create_finder(unsure, docs, in_hierarchy)
+            new_contents = self._rename_in_modules(finder, new_name,
+                                                   candidates, job_set)
+        else:
+            worker = _RenameWorker(self.resource.path, self.offset, new_name,
+                                   unsure, docs, in_hierarchy)
+            new_contents = parallel.map_resources(
+                self.project, worker, candidates, job_set, processes)
+        for file_, new_content in new_contents:
             if new_content is not None:
                 changes.add_change(ChangeContents(file_, new_content))
-            job_set.finished_job()
         if self._is_renaming_a_module():
             resource = self.old_pyname.get_object().get_resource()
             if self._is_allowed_to_move(resources, resource):
                 self._rename_module(resource, new_name, changes)
         return changes
 
+    def _create_finder(self, unsure, docs, in_hierarchy):
+        return occurrences.create_finder(
+            self.pycore, self.old_name, self.old_pyname, unsure=unsure,
+            docs=docs, instance=self.old_instance,
+            in_hierarchy=in_hierarchy and self.is_method())
+
+    def _rename_in_modules(self, finder, new_name, resources, job_set):
+        for file_ in resources:
+            job_set.started_job(file_.path)
+            new_content = rename_in_module(finder, new_name, resource=file_)
+            job_set.finished_job()
+            yield file_, new_content
+
     def _is_allowed_to_move(self, resources, resource):
         if resource.is_folder():
             try:
@@ -133,6 +155,28 @@ class Rename(object):
         changes.add_change(MoveResource(resource, new_location))
 
 
+class _RenameWorker(object):
+    """Renames occurrences in the worker processes of `Rename`"""
+
+    def __init__(self, path, offset, new_name, unsure, docs, in_hierarchy):
+        self.path = path
+        self.offset = offset
+        self.new_name = new_name
+        self.unsure = unsure
+        self.docs = docs
+        self.in_hierarchy = in_hierarchy
+        self.finder = None
+
+    def __call__(self, project, resource):
+        if self.finder is None:
+            rename = Rename(project, project.get_resource(self.path),
+                            self.offset)
+            self.finder = rename._create_finder(self.unsure, self.docs,
+                                                self.in_hierarchy)
+        return rename_in_module(self.finder, self.new_name,
+                                resource=resource)
+
+
 class ChangeOccurrences(object):
     """A class for changing the occurrences of a name in a scope
 
@@ -211,8 +211,8 @@ def replace(code, pattern, goal):
     """used by other refactorings"""
     finder = similarfinder.RawSimilarFinder(code)
     matches = list(finder.get_matches(pattern))
-    ast = patchedast.get_patched_ast(code)
     lines = codeanalyze.SourceLinesAdapter(code)
+    ast = patchedast.get_patched_ast(code)
     template = similarfinder.CodeTemplate(goal)
     computer = _ChangeComputer(code, ast, lines, template, matches)
     result = computer.get_changed()
@@ -12,6 +12,10 @@ import ropetest.runmodtest
 import ropetest.builtinstest
 import ropetest.historytest
 import ropetest.simplifytest
+import ropetest.summariestest
+import ropetest.nameindextest
+import ropetest.datastoretest
+import ropetest.watchertest
 
 
 def suite():
@@ -27,6 +31,10 @@ def suite():
     result.addTests(ropetest.builtinstest.suite())
     result.addTests(ropetest.historytest.suite())
     result.addTests(ropetest.simplifytest.suite())
+    result.addTests(ropetest.summariestest.suite())
+    result.addTests(ropetest.nameindextest.suite())
+    result.addTests(ropetest.datastoretest.suite())
+    result.addTests(ropetest.watchertest.suite())
     return result
 
 
@@ -1,7 +1,10 @@
+import os
 import unittest
 
 import rope.base.oi
 import rope.base.libutils
+import rope.base.project
+import rope.base.taskhandle
 from ropetest import testutils
 
 
@@ -52,6 +55,26 @@ class DynamicOITest(unittest.TestCase):
         self.assertEquals(pymod2['AClass'].get_object(),
                           pymod2['a_var'].get_object())
 
+    def test_dti_with_saved_object_information(self):
+        testutils.remove_project(self.project)
+        self.project = testutils.sample_project(save_objectdb=True)
+        mod1 = testutils.create_module(self.project, 'mod1')
+        mod2 = testutils.create_module(self.project, 'mod2')
+        code = 'def a_func(arg):\n    return eval("arg")\n' \
+               'a_var = a_func(a_func)\n'
+        mod1.write(code)
+        mod2.write(code)
+        self.project.pycore.run_module(mod1).wait_process()
+        self.project.close()
+        self.project = rope.base.project.Project(self.project.address,
+                                                 save_objectdb=True)
+        objectdb = self.project.pycore.object_info.objectdb
+        self.assertTrue('mod1.py' in objectdb.get_files())
+        self.project.pycore.run_module(mod2).wait_process()
+        pymod = self.project.pycore.resource_to_pyobject(mod2)
+        self.assertEquals(pymod['a_func'].get_object(),
+                          pymod['a_var'].get_object())
+
 
     def test_class_dti(self):
         mod = testutils.create_module(self.project, 'mod')
@@ -694,6 +717,56 @@ class NewStaticOITest(unittest.TestCase):
         self.assertNotEquals(c_class, var_pyname.get_object().get_type(),
                              'Class `C` no more exists')
 
+    def test_validating_object_information_of_all_files(self):
+        testutils.remove_project(self.project)
+        self.project = testutils.sample_project(save_objectdb=True,
+                                                validate_objectdb=True)
+        mod = testutils.create_module(self.project, 'mod')
+        code = 'class C(object):\n    pass\ndef f(p):\n    pass\nf(C())\n'
+        mod.write(code)
+        self.project.pycore.analyze_module(mod)
+        self.project.close()
+        output = open(mod.real_path, 'w')
+        output.write(code.replace('f(', 'g('))
+        output.close()
+        self.project = rope.base.project.Project(
+            self.project.address, save_objectdb=True, validate_objectdb=True)
+        object_info = self.project.pycore.object_info
+        self.assertTrue('f' in object_info.objectdb.files['mod.py'])
+        object_info.validate()
+        self.assertFalse('f' in object_info.objectdb.files['mod.py'])
+
+    def test_validating_files_changed_with_the_same_stamp(self):
+        testutils.remove_project(self.project)
+        self.project = testutils.sample_project()
+        mod = testutils.create_module(self.project, 'mod')
+        code = 'class C(object):\n    pass\ndef f(p):\n    pass\nf(C())\n'
+        mod.write(code)
+        object_info = self.project.pycore.object_info
+        self.project.pycore.analyze_module(mod)
+        object_info.validate()
+        stat = os.stat(mod.real_path)
+        mod.write(code.replace('f(', 'g('))
+        os.utime(mod.real_path, (stat.st_atime, stat.st_mtime))
+        object_info.validate()
+        self.assertFalse('f' in object_info.objectdb.files['mod.py'])
+
+    def test_removing_object_information_of_removed_files(self):
+        self.mod.write('def f(p):\n    pass\nf(1)\n')
+        self.pycore.analyze_module(self.mod)
+        os.remove(self.mod.real_path)
+        self.pycore.object_info.validate()
+        objectdb = self.pycore.object_info.objectdb
+        self.assertFalse('mod.py' in objectdb.get_files())
+
+    def test_stopping_validation(self):
+        self.mod.write('def f(p):\n    pass\nf(1)\n')
+        self.pycore.analyze_module(self.mod)
+        handle = rope.base.taskhandle.TaskHandle()
+        handle.stop()
+        self.assertRaises(rope.base.exceptions.InterruptedTaskError,
+                          self.pycore.object_info.validate, handle)
+
     def test_validation_problems_for_changing_builtin_types(self):
         mod1 = testutils.create_module(self.project, 'mod1')
         mod1.write('l = []\nl.append("")\n')
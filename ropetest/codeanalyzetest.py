@@ -44,6 +44,19 @@ class SourceLinesAdapterTest(unittest.TestCase):
         to_lines = SourceLinesAdapter('line1')
         self.assertEquals(1, to_lines.get_line_number(5))
 
+    def test_source_lines_sharing_line_starts(self):
+        code = 'line1\nline2\n'
+        lines1 = SourceLinesAdapter(code)
+        lines2 = SourceLinesAdapter('line1\n' + 'line2\n')
+        self.assertTrue(lines1.starts is lines2.starts)
+        self.assertFalse(lines1.starts is SourceLinesAdapter('line1\n').starts)
+
+    def test_source_lines_empty_source(self):
+        to_lines = SourceLinesAdapter('')
+        self.assertEquals(1, to_lines.length())
+        self.assertEquals('', to_lines.get_line(1))
+        self.assertEquals(1, to_lines.get_line_number(0))
+
 
 class WordRangeFinderTest(unittest.TestCase):
 
@@ -601,6 +614,18 @@ class CustomLogicalLineFinderTest(LogicalLineFinderTest):
         return codeanalyze.CachingLogicalLineFinder(
             lines, codeanalyze.custom_generator)
 
+    def test_logical_lines_before_the_first_line(self):
+        line_finder = self._logical_finder('\n\na = (1,\n     2)\n\n')
+        self.assertEquals((3, 4), line_finder.logical_line_in(1))
+        self.assertEquals((3, 4), line_finder.logical_line_in(4))
+        self.assertEquals((3, 4), line_finder.logical_line_in(5))
+
+    def test_generating_line_starts_in_a_range(self):
+        code = 'a = 1\nb = (\n   2)\nc = 3\nd = 4\n'
+        line_finder = self._logical_finder(code)
+        self.assertEquals([2, 4], list(line_finder.generate_starts(2, 5)))
+        self.assertEquals([], list(line_finder.generate_starts(3, 4)))
+
 
 def suite():
     result = unittest.TestSuite()
@@ -1,3 +1,4 @@
+import os
 import unittest
 
 from ropetest import testutils
@@ -19,33 +20,33 @@ class AutoImportTest(unittest.TestCase):
         super(AutoImportTest, self).tearDown()
 
     def test_simple_case(self):
-        self.assertEquals([], self.importer.import_assist('A'))
+        self.assertEquals([], list(self.importer.import_assist('A')))
 
     def test_update_resource(self):
         self.mod1.write('myvar = None\n')
         self.importer.update_resource(self.mod1)
         self.assertEquals([('myvar', 'mod1')],
-                          self.importer.import_assist('myva'))
+                          list(self.importer.import_assist('myva')))
 
     def test_update_module(self):
         self.mod1.write('myvar = None')
         self.importer.update_module('mod1')
         self.assertEquals([('myvar', 'mod1')],
-                          self.importer.import_assist('myva'))
+                          list(self.importer.import_assist('myva')))
 
     def test_update_non_existent_module(self):
         self.importer.update_module('does_not_exists_this')
-        self.assertEquals([], self.importer.import_assist('myva'))
+        self.assertEquals([], list(self.importer.import_assist('myva')))
 
     def test_module_with_syntax_errors(self):
         self.mod1.write('this is a syntax error\n')
         self.importer.update_resource(self.mod1)
-        self.assertEquals([], self.importer.import_assist('myva'))
+        self.assertEquals([], list(self.importer.import_assist('myva')))
 
     def test_excluding_imported_names(self):
         self.mod1.write('import pkg\n')
         self.importer.update_resource(self.mod1)
-        self.assertEquals([], self.importer.import_assist('pkg'))
+        self.assertEquals([], list(self.importer.import_assist('pkg')))
 
     def test_get_modules(self):
         self.mod1.write('myvar = None\n')
@@ -60,6 +61,34 @@ class AutoImportTest(unittest.TestCase):
         self.assertEquals(set(['mod1', 'pkg.mod2']),
                           set(self.importer.get_modules('myvar')))
 
+    def test_sorted_import_assist(self):
+        self.mod1.write('myvar2 = None\nmyvar1 = None\n')
+        self.mod2.write('myvar1 = None\n')
+        self.importer.update_resource(self.mod1)
+        self.importer.update_resource(self.mod2)
+        self.assertEquals(
+            [('myvar1', 'mod1'), ('myvar1', 'pkg.mod2'), ('myvar2', 'mod1')],
+            list(self.importer.import_assist('myva')))
+
+    def test_limiting_import_assist(self):
+        self.mod1.write('myvar2 = None\nmyvar1 = None\n')
+        self.importer.update_resource(self.mod1)
+        self.assertEquals([('myvar1', 'mod1')],
+                          list(self.importer.import_assist('myva', limit=1)))
+
+    def test_import_assist_after_changing_names(self):
+        self.mod1.write('myvar = None\n')
+        self.importer.update_resource(self.mod1)
+        self.assertEquals([('myvar', 'mod1')],
+                          list(self.importer.import_assist('myva')))
+        self.mod1.write('another_var = None\n')
+        self.importer.update_resource(self.mod1)
+        self.assertEquals([], list(self.importer.import_assist('myva')))
+        self.mod1.write('myvar = None\n')
+        self.importer.update_resource(self.mod1)
+        self.assertEquals([('myvar', 'mod1')],
+                          list(self.importer.import_assist('myva')))
+
     def test_trivial_insertion_line(self):
         result = self.importer.find_insertion_line('')
         self.assertEquals(1, result)
@@ -121,6 +150,26 @@ class AutoImportTest(unittest.TestCase):
         self.importer.update_module('sys')
         self.assertTrue('sys' in self.importer.get_modules('exit'))
 
+    def test_generating_cache(self):
+        self.mod1.write('myvar = None\n')
+        self.mod2.write('myvar = None\n')
+        self.importer.generate_cache()
+        self.assertEquals(['mod1', 'pkg.mod2'],
+                          self.importer.get_modules('myvar'))
+
+    def test_generating_cache_in_worker_processes(self):
+        self.mod1.write('myvar = None\ndef myfunc():\n    pass\n')
+        self.mod2.write('myvar = None\nthis is a syntax error\n')
+        self.importer.generate_cache(processes=2)
+        self.assertEquals(['mod1'], self.importer.get_modules('myvar'))
+        self.assertEquals(['mod1'], self.importer.get_modules('myfunc'))
+
+    def test_generating_modules_cache_for_packages(self):
+        self.mod2.write('myvar = None\n')
+        self.importer.generate_modules_cache(['pkg.*', 'sys'], processes=2)
+        self.assertEquals(['pkg.mod2'], self.importer.get_modules('myvar'))
+        self.assertTrue('sys' in self.importer.get_modules('exit'))
+
     def test_submodules(self):
         self.assertEquals(set([self.mod1]),
                           autoimport.submodules(self.mod1))
@@ -155,6 +204,35 @@ class AutoImportObservingTest(unittest.TestCase):
         self.mod1.remove()
         self.assertEquals([], self.importer.get_modules('myvar'))
 
+    def _write_outside_rope(self, resource, contents):
+        output = open(resource.real_path, 'w')
+        output.write(contents)
+        output.close()
+
+    def test_refreshing_files_changed_outside_rope(self):
+        self.mod1.write('myvar = None\n')
+        self.project.close()
+        self._write_outside_rope(self.mod1, 'another_var = None\n')
+        importer = autoimport.AutoImport(self.project, observe=True)
+        self.assertEquals([], importer.get_modules('myvar'))
+        self.assertEquals(['mod1'], importer.get_modules('another_var'))
+
+    def test_refreshing_files_removed_outside_rope(self):
+        self.mod1.write('myvar = None\n')
+        self.project.close()
+        os.remove(self.mod1.real_path)
+        importer = autoimport.AutoImport(self.project, observe=True)
+        self.assertEquals([], importer.get_modules('myvar'))
+        self.assertFalse('mod1' in importer.stamps)
+
+    def test_not_refreshing_unchanged_files(self):
+        self.mod1.write('myvar = None\n')
+        self._write_outside_rope(self.mod1, 'another_var = None\n')
+        self.importer.stamps['mod1'] = (self.mod1.path,
+                                        autoimport._get_stamp(self.mod1))
+        self.importer.refresh()
+        self.assertEquals(['mod1'], self.importer.get_modules('myvar'))
+
 
 def suite():
     result = unittest.TestSuite()
@@ -5,7 +5,8 @@ from rope.base import exceptions
 from rope.contrib.codeassist import (get_definition_location, get_doc,
                                      starting_expression, code_assist,
                                      sorted_proposals, starting_offset,
-                                     get_calltip)
+                                     get_calltip, BufferSession)
+from rope.contrib import fixsyntax
 from ropetest import testutils
 
 
@@ -1025,6 +1026,36 @@ class CodeAssistInProjectsTest(unittest.TestCase):
         result = self._assist(code, maxfixes=2, resource=mod)
         self.assertTrue(len(result) > 0)
 
+    def test_fixing_errors_in_blocks_of_saved_modules(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('class C(object):\n    def a(self):\n        pass\n'
+                  '    def b(self):\n        pass\n\nvar = C()\n')
+        saved = self.pycore.resource_to_pyobject(mod)
+        code = 'class C(object):\n    def a(self):\n        x = 1 +\n' \
+               '    def b(self):\n        pass\n\nvar = C()\n'
+        fixer = fixsyntax.FixSyntax(self.pycore, code, mod, 1)
+        pymodule = fixer.get_pymodule()
+        self.assertTrue(pymodule.source_code.startswith(
+            code.replace('x = 1 +', 'pass')))
+        # the nodes of the saved module are not shared
+        body = pymodule.get_ast().body
+        self.assertTrue(body[1] is not saved.get_ast().body[1])
+        self.assertTrue(body[0].body[1] is not
+                        saved.get_ast().body[0].body[1])
+        result = self._assist(code + 'var.', resource=mod, maxfixes=2)
+        self.assert_completion_in_result('a', 'attribute', result)
+        self.assert_completion_in_result('b', 'attribute', result)
+
+    def test_fixing_errors_in_blocks_of_saved_modules_with_new_lines(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('class C(object):\n    def a(self):\n        pass\n'
+                  '    def b(self):\n        pass\n\nvar = C()\n')
+        code = 'class C(object):\n    def a(self):\n        x = (\n\n\n' \
+               '    def b(self):\n        pass\n\nvar = C()\nvar.b'
+        result = get_definition_location(self.project, code, len(code) - 1,
+                                         mod)
+        self.assertEquals((mod, 6), result)
+
     def test_completing_names_after_from_import(self):
         mod1 = testutils.create_module(self.project, 'mod1')
         mod2 = testutils.create_module(self.project, 'mod2')
@@ -1055,10 +1086,90 @@ class CodeAssistInProjectsTest(unittest.TestCase):
         self.assertEquals('l.app', starting_expression(code, len(code)))
 
 
+class BufferSessionTest(unittest.TestCase):
+
+    def setUp(self):
+        super(BufferSessionTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.code = 'class C(object):\n    def method(self):\n' \
+                    '        """a method"""\n\n\nc = C()\nc.'
+        self.session = BufferSession(self.project, self.code)
+
+    def tearDown(self):
+        self.session.close()
+        testutils.remove_project(self.project)
+        super(BufferSessionTest, self).tearDown()
+
+    def _assist(self, session=None):
+        if session is None:
+            session = self.session
+        return [proposal.name
+                for proposal in session.code_assist(len(session.code))
+                if not proposal.name.startswith('_')]
+
+    def _insert(self, offset, text):
+        self.session.edit(offset, offset, text)
+
+    def test_simple_completions(self):
+        self.assertEquals(['method'], self._assist())
+
+    def test_reusing_modules_for_edits_in_the_same_line(self):
+        self._assist()
+        pymodule = self.session.pymodule
+        self._insert(len(self.code), 'me')
+        self.assertEquals(['method'], self._assist())
+        self.session.edit(len(self.code), len(self.code) + 2, 'x')
+        self.assertEquals([], self._assist())
+        self.assertTrue(pymodule is self.session.pymodule)
+
+    def test_parsing_again_after_adding_lines(self):
+        self._assist()
+        self._insert(0, 'my_var = 1\n')
+        self._insert(len(self.session.code), '\nmy_')
+        self.assertEquals(['my_var'], self._assist())
+
+    def test_parsing_again_after_editing_other_lines(self):
+        self._assist()
+        self.session.edit(len('class C(object):\n    def '),
+                          len('class C(object):\n    def method'), 'func')
+        self.assertEquals(['func'], self._assist())
+
+    def test_setting_code(self):
+        self._assist()
+        pymodule = self.session.pymodule
+        self.session.set_code(self.code + 'm')
+        self.assertEquals(['method'], self._assist())
+        self.assertTrue(pymodule is self.session.pymodule)
+        self.session.set_code(self.code.replace('method', 'func') + 'f')
+        self.assertEquals(['func'], self._assist())
+
+    def test_getting_docs_and_definitions(self):
+        self._insert(len(self.code), 'method()')
+        offset = len(self.code) + 1
+        self.assertTrue(self.session.get_doc(offset).strip()
+                        .endswith('a method'))
+        self.assertEquals('C.method(self)', self.session.get_calltip(offset))
+        self.assertEquals((None, 2),
+                          self.session.get_definition_location(offset))
+
+    def test_parsing_again_after_resource_changes(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('my_var = 1\n')
+        session = BufferSession(self.project, 'import mod\nmod.my_')
+        try:
+            self.assertEquals(['my_var'], self._assist(session))
+            mod.write('my_var2 = 1\n')
+            self.assertEquals(None, session.pymodule)
+            self.assertEquals(['my_var2'], self._assist(session))
+        finally:
+            session.close()
+
+
 def suite():
     result = unittest.TestSuite()
     result.addTests(unittest.makeSuite(CodeAssistTest))
     result.addTests(unittest.makeSuite(CodeAssistInProjectsTest))
+    result.addTests(unittest.makeSuite(BufferSessionTest))
     return result
 
 if __name__ == '__main__':
@@ -34,6 +34,17 @@ class FindItTest(unittest.TestCase):
         modules = (result[0].resource, result[1].resource)
         self.assertTrue(mod1 in modules and mod2 in modules)
 
+    def test_finding_occurrences_in_worker_processes(self):
+        mod1 = testutils.create_module(self.project, 'mod1')
+        mod2 = testutils.create_module(self.project, 'mod2')
+        mod1.write('a_var = 1\n')
+        mod2.write('import mod1\nmy_var = mod1.a_var')
+        expected = find_occurrences(self.project, mod1, 1)
+        result = find_occurrences(self.project, mod1, 1, processes=2)
+        self.assertEquals(
+            [(location.resource, location.offset) for location in expected],
+            [(location.resource, location.offset) for location in result])
+
     def test_finding_occurrences_matching_when_unsure(self):
         mod1 = testutils.create_module(self.project, 'mod1')
         mod1.write('class C(object):\n    def a_func(self):\n        pass\n'
@@ -0,0 +1,162 @@
+import unittest
+
+import rope.base.change
+import rope.base.history
+from rope.base import datastore
+from rope.base.change import CreateResource
+from rope.base.oi import memorydb
+from ropetest import testutils
+
+
+class SQLiteStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        super(SQLiteStoreTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.path = self.project.ropefolder.real_path + '/test.db'
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(SQLiteStoreTest, self).tearDown()
+
+    def test_simple_store(self):
+        store = datastore.SQLiteStore(self.path)
+        store['key'] = 1
+        self.assertEquals(1, store['key'])
+        self.assertTrue('key' in store)
+        self.assertEquals(['key'], store.keys())
+
+    def test_missing_keys(self):
+        store = datastore.SQLiteStore(self.path)
+        self.assertFalse('key' in store)
+        self.assertEquals(None, store.get('key'))
+        self.assertRaises(KeyError, store.__getitem__, 'key')
+
+    def test_writing_stores(self):
+        store = datastore.SQLiteStore(self.path)
+        store['key'] = [1, 2]
+        store.write()
+        store.close()
+        store = datastore.SQLiteStore(self.path)
+        self.assertEquals([1, 2], store['key'])
+
+    def test_not_saving_before_writes(self):
+        store = datastore.SQLiteStore(self.path)
+        store['key'] = 1
+        self.assertFalse('key' in datastore.SQLiteStore(self.path))
+
+    def test_removing_keys(self):
+        store = datastore.SQLiteStore(self.path)
+        store['key1'] = 1
+        store['key2'] = 2
+        store.write()
+        del store['key1']
+        self.assertFalse('key1' in store)
+        store.write()
+        self.assertEquals([('key2', 2)],
+                          datastore.SQLiteStore(self.path).items())
+
+    def test_clearing_stores(self):
+        store = datastore.SQLiteStore(self.path)
+        store['key1'] = 1
+        store.write()
+        store['key2'] = 2
+        store.clear()
+        store.write()
+        self.assertEquals([], datastore.SQLiteStore(self.path).keys())
+
+    def test_compressed_stores(self):
+        store = datastore.SQLiteStore(self.path, compress=True)
+        store['key'] = 'value' * 10
+        store.write()
+        store = datastore.SQLiteStore(self.path, compress=True)
+        self.assertEquals('value' * 10, store['key'])
+
+
+class DataFilesStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        super(DataFilesStoreTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.data_files = self.project.data_files
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(DataFilesStoreTest, self).tearDown()
+
+    def test_importing_pickled_data(self):
+        self.data_files.write_data('data', {'key': 1})
+        store = self.data_files.get_store('data')
+        self.assertEquals(1, store['key'])
+        self.assertFalse(self.project.ropefolder.has_child('data'))
+
+    def test_converting_pickled_data(self):
+        self.data_files.write_data('data', [1, 2])
+        store = self.data_files.get_store(
+            'data', convert=lambda data: {'key': data})
+        self.assertEquals([1, 2], store['key'])
+
+    def test_stores_without_rope_folder(self):
+        project = testutils.sample_project(foldername='sampleproject2',
+                                           ropefolder=None)
+        try:
+            store = project.data_files.get_store('data')
+            store['key'] = 1
+            store.write()
+            self.assertEquals(1, store['key'])
+        finally:
+            testutils.remove_project(project)
+
+    def test_saving_objectdb(self):
+        db = memorydb.MemoryDB(self.project, persist=True)
+        db.create('file')
+        db['file'].create_scope('scope')
+        db['file']['scope'].save_per_name('name', 1)
+        db.write()
+        db = memorydb.MemoryDB(self.project, persist=True)
+        self.assertEquals(['file'], db.keys())
+        self.assertEquals(1, db['file']['scope'].get_per_name('name'))
+
+    def test_removing_from_saved_objectdb(self):
+        db = memorydb.MemoryDB(self.project, persist=True)
+        db.create('file')
+        db.write()
+        db = memorydb.MemoryDB(self.project, persist=True)
+        del db['file']
+        db.write()
+        db = memorydb.MemoryDB(self.project, persist=True)
+        self.assertEquals([], db.keys())
+
+    def test_importing_pickled_history(self):
+        self.project.set('save_history', True)
+        myfile = self.project.get_file('myfile.txt')
+        history = rope.base.history.History(self.project)
+        history.do(CreateResource(myfile))
+        to_data = rope.base.change.ChangeToData()
+        self.data_files.write_data('history', [[to_data(history.undo_list[0])],
+                                               []])
+        history = rope.base.history.History(self.project)
+        history.undo()
+        self.assertFalse(myfile.exists())
+
+    def test_keeping_history_keys(self):
+        self.project.set('save_history', True)
+        history = rope.base.history.History(self.project)
+        history.do(CreateResource(self.project.get_file('myfile1.txt')))
+        history.write()
+        history.do(CreateResource(self.project.get_file('myfile2.txt')))
+        history.write()
+        history = rope.base.history.History(self.project)
+        self.assertEquals(2, len(history.undo_list))
+        self.assertEquals(['0', '1'], history._get_store()['undo'])
+
+
+def suite():
+    result = unittest.TestSuite()
+    result.addTests(unittest.makeSuite(SQLiteStoreTest))
+    result.addTests(unittest.makeSuite(DataFilesStoreTest))
+    return result
+
+
+if __name__ == '__main__':
+    unittest.main()
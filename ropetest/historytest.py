@@ -1,8 +1,11 @@
+import os
+import tempfile
 import unittest
 
 import rope.base.history
-from rope.base import exceptions
+from rope.base import exceptions, fscommands
 from rope.base.change import *
+from rope.base.resourceobserver import ResourceObserver
 from ropetest import testutils
 
 
@@ -203,6 +206,39 @@ class IsolatedHistoryTest(unittest.TestCase):
         self.assertEquals('', old_file.read())
         self.assertFalse(new_file.exists())
 
+    def test_undoing_folder_creations_for_undoing_files_created_in_it(self):
+        change1 = CreateFolder(self.project.root, 'folder')
+        self.history.do(change1)
+        change2 = CreateFile(self.project.get_folder('folder'), 'file3.txt')
+        self.history.do(change2)
+        self.history.do(ChangeContents(self.file1, '1'))
+        self.assertEquals(set([change1, change2]),
+                          set(self.history.undo(change1)))
+        self.assertEquals('1', self.file1.read())
+
+    def test_dependencies_after_dropping_changes(self):
+        change1 = ChangeContents(self.file1, '1')
+        self.history.do(change1)
+        self.history.do(ChangeContents(self.file1, '2'))
+        self.history.undo(drop=True)
+        change3 = ChangeContents(self.file2, '3')
+        self.history.do(change3)
+        self.history.undo(change1)
+        self.assertEquals([change3], self.history.undo_list)
+
+    def test_forgetting_changes_removed_from_the_history(self):
+        self.project.set('max_history_items', 2)
+        change1 = ChangeContents(self.file1, '1')
+        self.history.do(change1)
+        self.assertEquals([change1], self.history.get_file_undo_list(self.file1))
+        change2 = ChangeContents(self.file2, '2')
+        change3 = ChangeContents(self.file2, '3')
+        self.history.do(change2)
+        self.history.do(change3)
+        self.assertEquals([], self.history.get_file_undo_list(self.file1))
+        self.assertEquals(set([change2, change3]),
+                          set(self.history._get_index().resources))
+
     @testutils.assert_raises(exceptions.HistoryError)
     def test_undoing_not_available_change(self):
         change = ChangeContents(self.file1, '1')
@@ -398,11 +434,306 @@ class SavingHistoryTest(unittest.TestCase):
         history.redo()
         self.assertTrue(myfile.exists())
 
+    def _change_contents(self, history, resource, contents):
+        change = ChangeSet('changing %s' % resource.path)
+        change.add_change(ChangeContents(resource, contents))
+        history.do(change)
+
+    def _get_blobs(self, history):
+        return [key for key in history._get_store().keys()
+                if key.startswith('blob:')]
+
+    def test_loading_saved_change_sets_lazily(self):
+        self.project.set('save_history', True)
+        myfile = self.project.root.create_file('myfile.txt')
+        myfile.write('1\n2\n3\n')
+        self._change_contents(self.history, myfile, '1\n3\n4\n')
+        self.history.write()
+        history = rope.base.history.History(self.project)
+        change = history.undo_list[0]
+        self.assertEquals('changing myfile.txt', change.description)
+        self.assertEquals(set([myfile]), change.get_changed_resources())
+        self.assertEquals(None, change._changes)
+        history.undo()
+        self.assertEquals('1\n2\n3\n', myfile.read())
+
+    def test_sharing_contents_between_saved_changes(self):
+        self.project.set('save_history', True)
+        myfile = self.project.root.create_file('myfile.txt')
+        myfile.write(u'a = 1\n')
+        self._change_contents(self.history, myfile, u'a = 2\n')
+        self._change_contents(self.history, myfile, u'a = 3\n')
+        self.history.write()
+        self.assertEquals(2, len(self._get_blobs(self.history)))
+        history = rope.base.history.History(self.project)
+        history.undo()
+        self.assertEquals(u'a = 2\n', myfile.read())
+        history.write()
+        history = rope.base.history.History(self.project)
+        history.undo()
+        self.assertEquals(u'a = 1\n', myfile.read())
+        history.redo()
+        history.redo()
+        self.assertEquals(u'a = 3\n', myfile.read())
+
+    def test_removing_contents_of_dropped_changes(self):
+        self.project.set('save_history', True)
+        self.project.set('max_history_items', 1)
+        myfile = self.project.root.create_file('myfile.txt')
+        for contents in [u'1', u'2', u'3', u'4']:
+            self._change_contents(self.history, myfile, contents)
+            self.history.write()
+        self.assertEquals(2, len(self._get_blobs(self.history)))
+
+    def test_not_saving_moved_changes_again(self):
+        self.project.set('save_history', True)
+        myfile = self.project.root.create_file('myfile.txt')
+        self._change_contents(self.history, myfile, '1')
+        self._change_contents(self.history, myfile, '2')
+        self.history.write()
+        to_data = rope.base.change.ChangeToData
+        rope.base.change.ChangeToData = None
+        try:
+            self.history.undo()
+            self.history.write()
+            self.history.redo()
+            self.history.write()
+        finally:
+            rope.base.change.ChangeToData = to_data
+        history = rope.base.history.History(self.project)
+        history.undo()
+        history.undo()
+        self.assertEquals('', myfile.read())
+
+    def test_saving_contents_of_different_types(self):
+        self.project.set('save_history', True)
+        myfile = self.project.root.create_file('myfile.txt')
+        self._change_contents(self.history, myfile, u'1')
+        change = ChangeSet('changing myfile.txt')
+        change.add_change(ChangeContents(myfile, '2', '1'))
+        self.history.do(change)
+        self.history.write()
+        history = rope.base.history.History(self.project)
+        history.undo()
+        self.assertEquals(str, type(history.redo_list[0].changes[0].old_contents))
+
+    def test_contents_deltas(self):
+        new = 'a\n\nb\n\nc\nd\n\ne'
+        for old in ['', 'a\n', 'a\n\nc\nb\n\nx\ne', '\n\ne\nd\nb\n']:
+            delta = rope.base.history._get_delta(new, old)
+            self.assertEquals(old, rope.base.history._apply_delta(new, delta))
+
+class ChangeDescriptionTest(unittest.TestCase):
+
+    def setUp(self):
+        super(ChangeDescriptionTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.file1 = self.project.root.create_file('file1.txt')
+        self.file1.write(''.join('line%s\n' % i for i in range(10)))
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(ChangeDescriptionTest, self).tearDown()
+
+    def _change_line(self, number, text):
+        lines = self.file1.read().splitlines(True)
+        lines[number] = text
+        return ChangeContents(self.file1, ''.join(lines))
+
+    def test_change_contents_description(self):
+        change = self._change_line(5, 'changed\n')
+        self.assertEquals(
+            '--- a/file1.txt\n+++ b/file1.txt\n@@ -5,3 +5,3 @@\n'
+            ' line4\n-line5\n+changed\n line6\n',
+            change.get_description(context=1))
+
+    def test_change_contents_description_for_inserted_lines(self):
+        change = ChangeContents(self.file1,
+                                'line0\nnew\n' + self.file1.read()[6:])
+        self.assertEquals(
+            '--- a/file1.txt\n+++ b/file1.txt\n@@ -1,2 +1,3 @@\n'
+            ' line0\n+new\n line1\n', change.get_description(context=1))
+
+    def test_change_contents_description_without_changes(self):
+        change = ChangeContents(self.file1, self.file1.read())
+        self.assertEquals('', change.get_description())
+
+    def test_iterating_change_set_descriptions(self):
+        changes = ChangeSet('changes')
+        changes.add_change(self._change_line(1, 'changed\n'))
+        changes.add_change(CreateResource(self.project.get_file('file2.txt')))
+        descriptions = changes.iter_descriptions()
+        self.assertEquals('changes:\n\n\n', descriptions.next())
+        self.assertTrue(descriptions.next().startswith('--- a/file1.txt'))
+        self.assertEquals(['\n', 'new file file2.txt', '\n'],
+                          list(descriptions))
+        self.assertEquals(''.join(changes.iter_descriptions()),
+                          changes.get_description())
+
+    def test_limiting_described_changes(self):
+        changes = ChangeSet('changes')
+        for name in ['file2.txt', 'file3.txt', 'file4.txt']:
+            changes.add_change(CreateResource(self.project.get_file(name)))
+        self.assertEquals(
+            'changes:\n\n\nnew file file2.txt\n... and 2 more changes\n',
+            ''.join(changes.iter_descriptions(max_changes=1)))
+
+
+class TransactionalChangesTest(unittest.TestCase):
+
+    def setUp(self):
+        super(TransactionalChangesTest, self).setUp()
+        self.project = testutils.sample_project(transactional_changes=True)
+        self.file1 = self.project.root.create_file('file1.txt')
+        self.file2 = self.project.root.create_file('file2.txt')
+        self.changed = []
+        self.project.add_observer(ResourceObserver(
+            changed=self._changed, moved=self._moved))
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(TransactionalChangesTest, self).tearDown()
+
+    def _changed(self, resource):
+        contents = [file.read() for file in (self.file1, self.file2)
+                    if file.exists()]
+        self.changed.append(tuple([resource] + contents))
+
+    def _moved(self, resource, new_resource):
+        self.changed.append((resource, new_resource))
+
+    def _get_changes(self, *changes):
+        result = ChangeSet('changes')
+        for change in changes:
+            result.add_change(change)
+        return result
+
+    def test_writing_files(self):
+        self.project.do(self._get_changes(
+            ChangeContents(self.file1, '1'), ChangeContents(self.file2, '2')))
+        self.assertEquals([(self.file1, '1', '2'), (self.file2, '1', '2')],
+                          self.changed)
+        self.assertEquals(['file1.txt', 'file2.txt'],
+                          sorted(os.listdir(self.project.address))[1:])
+
+    def test_undoing_written_files(self):
+        self.file1.write('old')
+        self.project.do(self._get_changes(
+            ChangeContents(self.file1, '1'), ChangeContents(self.file2, '2')))
+        self.project.history.undo()
+        self.assertEquals('old', self.file1.read())
+        self.assertEquals('', self.file2.read())
+
+    def test_keeping_file_modes(self):
+        os.chmod(self.file1.real_path, 0755)
+        self.project.do(self._get_changes(ChangeContents(self.file1, '1')))
+        self.assertEquals(0755, os.stat(self.file1.real_path).st_mode & 0777)
+
+    def test_keeping_restricted_file_modes(self):
+        os.chmod(self.file1.real_path, 0600)
+        self.project.do(self._get_changes(ChangeContents(self.file1, '1')))
+        self.assertEquals(0600, os.stat(self.file1.real_path).st_mode & 0777)
+
+    def test_writing_hard_linked_files_in_place(self):
+        link = os.path.join(self.project.address, 'link.txt')
+        os.link(self.file1.real_path, link)
+        self.project.do(self._get_changes(
+            ChangeContents(self.file1, '1'), ChangeContents(self.file2, '2')))
+        self.assertEquals('1', open(link).read())
+        self.assertEquals('2', self.file2.read())
+
+    def test_writing_in_place_when_temp_files_cannot_be_created(self):
+        os.chmod(self.file1.real_path, 0640)
+        def mkstemp(*args, **kwds):
+            raise OSError('cannot create temporary files')
+        old_mkstemp = tempfile.mkstemp
+        tempfile.mkstemp = mkstemp
+        try:
+            self.project.do(self._get_changes(
+                ChangeContents(self.file1, '1'),
+                ChangeContents(self.file2, '2')))
+        finally:
+            tempfile.mkstemp = old_mkstemp
+        self.assertEquals('1', self.file1.read())
+        self.assertEquals('2', self.file2.read())
+        self.assertEquals(0640, os.stat(self.file1.real_path).st_mode & 0777)
+        self.project.history.undo()
+        self.assertEquals('', self.file1.read())
+
+    def test_writing_links_to_the_same_file(self):
+        for name in ('link1.txt', 'link2.txt'):
+            os.symlink(self.file1.real_path,
+                       os.path.join(self.project.address, name))
+        link1 = self.project.get_file('link1.txt')
+        link2 = self.project.get_file('link2.txt')
+        self.project.do(self._get_changes(
+            ChangeContents(link1, '1'), ChangeContents(link2, '2')))
+        self.assertEquals('2', self.file1.read())
+        self.assertEquals(['file1.txt', 'file2.txt', 'link1.txt', 'link2.txt'],
+                          sorted(os.listdir(self.project.address))[1:])
+
+    def test_keeping_file_owners(self):
+        if not hasattr(os, 'chown') or os.getuid() != 0:
+            return
+        os.chown(self.file1.real_path, 1, 1)
+        self.project.do(self._get_changes(ChangeContents(self.file1, '1')))
+        info = os.stat(self.file1.real_path)
+        self.assertEquals((1, 1), (info.st_uid, info.st_gid))
+
+    def test_using_overridden_fscommands_writes(self):
+        testutils.remove_project(self.project)
+        commands = _RecordingCommands()
+        self.project = testutils.sample_project(transactional_changes=True,
+                                                fscommands=commands)
+        file1 = self.project.root.create_file('file1.txt')
+        self.project.do(self._get_changes(ChangeContents(file1, '1')))
+        self.assertEquals([file1.real_path], commands.written)
+        self.assertEquals('1', file1.read())
+
+    def test_failures_while_writing(self):
+        missing = self.project.get_file('folder/file.txt')
+        changes = self._get_changes(ChangeContents(self.file1, '1'),
+                                    ChangeContents(missing, '2', ''))
+        self.assertRaises(EnvironmentError, self.project.do, changes)
+        self.assertEquals('', self.file1.read())
+        self.assertEquals([], self.changed)
+        self.assertEquals(['file1.txt', 'file2.txt'],
+                          sorted(os.listdir(self.project.address))[1:])
+
+    def test_writing_and_moving_files(self):
+        self.project.do(self._get_changes(
+            ChangeContents(self.file1, '1'), MoveResource(self.file1, 'file3'),
+            ChangeContents(self.file2, '2')))
+        file3 = self.project.get_file('file3')
+        # observers are informed after all of the changes
+        self.assertEquals([(self.file1, '2'), (self.file1, file3),
+                           (self.file2, '2')], self.changed)
+        self.assertEquals('1', file3.read())
+
+    def test_writing_files_twice(self):
+        self.project.do(self._get_changes(
+            ChangeContents(self.file1, '1'), ChangeContents(self.file1, '2')))
+        self.project.history.undo()
+        self.assertEquals('', self.file1.read())
+
+
+class _RecordingCommands(fscommands.FileSystemCommands):
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, path, data):
+        self.written.append(path)
+        super(_RecordingCommands, self).write(path, data)
+
+
 def suite():
     result = unittest.TestSuite()
     result.addTests(unittest.makeSuite(HistoryTest))
     result.addTests(unittest.makeSuite(IsolatedHistoryTest))
     result.addTests(unittest.makeSuite(SavingHistoryTest))
+    result.addTests(unittest.makeSuite(ChangeDescriptionTest))
+    result.addTests(unittest.makeSuite(TransactionalChangesTest))
     return result
 
 if __name__ == '__main__':
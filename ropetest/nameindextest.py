@@ -0,0 +1,119 @@
+import os
+import unittest
+
+import rope.base.project
+from ropetest import testutils
+
+
+class NameIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        super(NameIndexTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.index = self.project.pycore.name_index
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(NameIndexTest, self).tearDown()
+
+    def test_simple_candidates(self):
+        mod1 = testutils.create_module(self.project, 'mod1')
+        mod2 = testutils.create_module(self.project, 'mod2')
+        mod1.write('a_var = 1\n')
+        mod2.write('another_var = 1\n')
+        self.assertEquals([mod1],
+                          self.index.get_candidates('a_var', [mod1, mod2]))
+
+    def test_matching_whole_words(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('a_var_2 = 1\n# a_var\n')
+        self.assertTrue(self.index.might_contain(mod, 'a_var'))
+        self.assertFalse(self.index.might_contain(mod, 'var'))
+
+    def test_keeping_resources(self):
+        mod1 = testutils.create_module(self.project, 'mod1')
+        mod2 = testutils.create_module(self.project, 'mod2')
+        self.assertEquals([mod2], self.index.get_candidates(
+            'a_var', [mod1, mod2], keep=[mod2]))
+
+    def test_updating_after_changes(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('a_var = 1\n')
+        self.assertTrue(self.index.might_contain(mod, 'a_var'))
+        mod.write('b_var = 1\n')
+        self.assertFalse(self.index.might_contain(mod, 'a_var'))
+        self.assertTrue(self.index.might_contain(mod, 'b_var'))
+
+    def test_updating_after_changes_with_the_same_stamp(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('foo = 1\n')
+        self.assertTrue(self.index.might_contain(mod, 'foo'))
+        stat = os.stat(mod.real_path)
+        mod.write('bar = 1\n')
+        os.utime(mod.real_path, (stat.st_atime, stat.st_mtime))
+        self.assertTrue(self.index.might_contain(mod, 'bar'))
+        self.assertFalse(self.index.might_contain(mod, 'foo'))
+
+    def test_updating_after_moves(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('a_var = 1\n')
+        self.assertTrue(self.index.might_contain(mod, 'a_var'))
+        mod.move('newmod.py')
+        self.assertFalse('mod.py' in self.index.files)
+        newmod = self.project.get_resource('newmod.py')
+        self.assertTrue(self.index.might_contain(newmod, 'a_var'))
+
+    def test_updating_after_removing_folders(self):
+        pkg = testutils.create_package(self.project, 'pkg')
+        mod = testutils.create_module(self.project, 'mod', pkg)
+        mod.write('a_var = 1\n')
+        self.assertTrue(self.index.might_contain(mod, 'a_var'))
+        pkg.remove()
+        self.assertFalse('pkg/mod.py' in self.index.files)
+
+    def test_noticing_changes_after_validation(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('a_var = 1\n')
+        self.assertTrue(self.index.might_contain(mod, 'a_var'))
+        output = open(mod.real_path, 'w')
+        output.write('another_var = 10\n')
+        output.close()
+        self.project.validate()
+        self.assertFalse(self.index.might_contain(mod, 'a_var'))
+
+    def test_saving_the_index(self):
+        self.project.prefs['save_nameindex'] = True
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('a_var = 1\n')
+        self.index.might_contain(mod, 'a_var')
+        self.project.close()
+        self.project = rope.base.project.Project(self.project.address,
+                                                 save_nameindex=True)
+        index = self.project.pycore.name_index
+        index._get_names()
+        self.assertTrue('mod.py' in index.files)
+        self.assertTrue(index.might_contain(mod, 'a_var'))
+
+    def test_reading_pickled_indices(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('a_var = 1\n')
+        stat = os.stat(mod.real_path)
+        self.project.data_files.write_data(
+            'nameindex', {'mod.py': ((stat.st_mtime, stat.st_size),
+                                     set(['b_var']))})
+        self.project.close()
+        self.project = rope.base.project.Project(self.project.address,
+                                                 save_nameindex=True)
+        index = self.project.pycore.name_index
+        self.assertTrue(index.might_contain(mod, 'b_var'))
+        self.assertFalse(index.might_contain(mod, 'a_var'))
+
+
+def suite():
+    result = unittest.TestSuite()
+    result.addTests(unittest.makeSuite(NameIndexTest))
+    return result
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,9 +19,6 @@ class _MockValidation(object):
     def is_more_valid(self, new, old):
         return new != -1
 
-    def is_file_valid(self, path):
-        return path != 'invalid'
-
     def is_scope_valid(self, path, key):
         return path != 'invalid' and key != 'invalid'
 
@@ -121,9 +118,9 @@ class ObjectDBTest(unittest.TestCase):
         self.assertEquals(set(['file1', 'file2']), set(db.get_files()))
 
     @_do_for_all_dbs
-    def test_validating_files(self, db):
+    def test_removing_files(self, db):
         db.add_callinfo('invalid', 'key', (1, 2), 3)
-        db.validate_files()
+        db.remove_file('invalid')
         self.assertEquals(0, len(db.get_files()))
 
     @_do_for_all_dbs
@@ -146,13 +143,56 @@ class ObjectDBTest(unittest.TestCase):
         db.add_callinfo('invalid', 'key', (1, 2), 3)
         observer = _MockFileListObserver()
         db.add_file_list_observer(observer)
-        db.validate_files()
+        db.remove_file('invalid')
         self.assertEquals('removed invalid ', observer.log)
 
 
+class MemoryDBTest(unittest.TestCase):
+
+    def setUp(self):
+        super(MemoryDBTest, self).setUp()
+        self.project = testutils.sample_project(objectdb_cache_size=2)
+        self.db = self._create_db()
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(MemoryDBTest, self).tearDown()
+
+    def _create_db(self):
+        return objectdb.ObjectDB(memorydb.MemoryDB(self.project, True),
+                                 _MockValidation())
+
+    def test_limiting_loaded_files(self):
+        for i in range(5):
+            self.db.add_pername('file%s' % i, 'key', 'name', i)
+        self.assertTrue(len(self.db.files._files) <= 2)
+        for i in range(5):
+            self.assertEquals(
+                i, self.db.get_pername('file%s' % i, 'key', 'name'))
+
+    def test_saving_evicted_files(self):
+        for i in range(5):
+            self.db.add_pername('file%s' % i, 'key', 'name', i)
+        self.db.write()
+        db = self._create_db()
+        self.assertEquals(5, len(db.get_files()))
+        self.assertEquals(0, len(db.files._files))
+        self.assertEquals(3, db.get_pername('file3', 'key', 'name'))
+
+    def test_saving_changes_to_loaded_files(self):
+        self.db.add_pername('file', 'key', 'name', 1)
+        self.db.write()
+        db = self._create_db()
+        db.add_pername('file', 'key', 'name', 2)
+        db.write()
+        self.assertEquals(2, self._create_db().get_pername('file', 'key',
+                                                           'name'))
+
+
 def suite():
     result = unittest.TestSuite()
     result.addTests(unittest.makeSuite(ObjectDBTest))
+    result.addTests(unittest.makeSuite(MemoryDBTest))
     return result
 
 
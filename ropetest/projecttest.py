@@ -1,6 +1,10 @@
 import os.path
+import subprocess
 import unittest
 
+from rope.base import fscommands
+from rope.base.change import (Change, ChangeSet, ChangeContents, CreateFile,
+                              MoveResource, RemoveResource)
 from rope.base.exceptions import RopeError, ResourceNotFoundError
 from rope.base.fscommands import FileSystemCommands
 from rope.base.libutils import path_to_resource
@@ -695,6 +699,108 @@ class ResourceObserverTest(unittest.TestCase):
         sample_file.write('1')
         self.assertEquals(0, sample_observer.change_count)
 
+    def test_batching_events(self):
+        sample_file = self.project.root.create_file('myfile.txt')
+        sample_observer = _SampleObserver()
+        self.project.add_observer(sample_observer)
+        self.project.batch_events()
+        sample_file.write('1')
+        sample_file.write('2')
+        self.assertEquals(0, sample_observer.change_count)
+        self.project.flush_events()
+        self.assertEquals(1, sample_observer.change_count)
+        self.assertEquals(sample_file, sample_observer.last_changed)
+
+    def test_receiving_batches(self):
+        file1 = self.project.root.create_file('file1.txt')
+        file2 = self.project.root.create_file('file2.txt')
+        batches = []
+        self.project.add_observer(ResourceObserver(batch=batches.append))
+        self.project.batch_events()
+        file1.write('1')
+        file2.write('2')
+        file1.write('3')
+        file1.move('file3.txt')
+        file3 = self.project.get_file('file3.txt')
+        file3.write('4')
+        self.project.flush_events()
+        self.assertEquals([[('changed', file1), ('changed', file2),
+                            ('moved', file1, file3), ('changed', file3)]],
+                          batches)
+
+    def test_nested_batches(self):
+        sample_file = self.project.root.create_file('myfile.txt')
+        sample_observer = _SampleObserver()
+        self.project.add_observer(sample_observer)
+        self.project.batch_events()
+        self.project.batch_events()
+        sample_file.write('1')
+        self.project.flush_events()
+        self.assertEquals(0, sample_observer.change_count)
+        self.project.flush_events()
+        self.assertEquals(1, sample_observer.change_count)
+
+    def test_filtered_observers_and_batches(self):
+        file1 = self.project.root.create_file('file1.txt')
+        file2 = self.project.root.create_file('file2.txt')
+        batches = []
+        self.project.add_observer(FilteredResourceObserver(
+            ResourceObserver(batch=batches.append), [file1, file2]))
+        self.project.batch_events()
+        file1.write('1')
+        file2.write('2')
+        file2.remove()
+        file1.write('3')
+        self.project.flush_events()
+        self.assertEquals(1, len(batches))
+        self.assertEquals(
+            set([('changed', file1), ('changed', file2)]),
+            set(batches[0][:2]))
+        self.assertEquals([('removed', file2), ('changed', file1)],
+                          batches[0][2:])
+
+    def test_batches_of_changes(self):
+        file1 = self.project.root.create_file('file1.txt')
+        file2 = self.project.root.create_file('file2.txt')
+        batches = []
+        self.project.add_observer(ResourceObserver(batch=batches.append))
+        changes = ChangeSet('changes')
+        changes.add_change(ChangeContents(file1, '1'))
+        changes.add_change(ChangeContents(file2, '2'))
+        self.project.do(changes)
+        self.assertEquals([[('changed', file1), ('changed', file2)]],
+                          batches)
+
+    def test_ending_batches_when_rolling_back_fails(self):
+        file1 = self.project.root.create_file('file1.txt')
+        observer = _SampleObserver()
+        self.project.add_observer(observer)
+        changes = ChangeSet('changes')
+        changes.add_change(_FailingChange(file1, fail_undo=True))
+        changes.add_change(_FailingChange(file1, fail_do=True))
+        self.assertRaises(RopeError, self.project.do, changes)
+        file1.write('1')
+        self.assertEquals(1, observer.change_count)
+
+
+class _FailingChange(Change):
+
+    def __init__(self, resource, fail_do=False, fail_undo=False):
+        self.resource = resource
+        self.fail_do = fail_do
+        self.fail_undo = fail_undo
+
+    def do(self, job_set=None):
+        if self.fail_do:
+            raise RopeError('do failed')
+
+    def undo(self, job_set=None):
+        if self.fail_undo:
+            raise RopeError('undo failed')
+
+    def get_changed_resources(self):
+        return [self.resource]
+
 
 class _MockChangeIndicator(object):
 
@@ -870,6 +976,65 @@ class RopeFolderTest(unittest.TestCase):
         myfile = self.project.root.create_file('myfile.txt')
         self.assertEquals(0, len(self.project.get_files()))
 
+    def test_ignored_folders_and_get_files(self):
+        self.project = testutils.sample_project(
+            ignored_resources=['build'], ropefolder=None)
+        build = self.project.root.create_folder('build')
+        build.create_folder('lib').create_file('mod.py')
+        myfile = self.project.root.create_file('myfile.txt')
+        self.assertEquals(set([myfile]), self.project.get_files())
+
+    def test_links_and_get_files(self):
+        if not hasattr(os, 'symlink'):
+            return
+        self.project = testutils.sample_project(ropefolder=None)
+        myfile = self.project.root.create_file('myfile.txt')
+        folder = self.project.root.create_folder('folder')
+        os.symlink(myfile.real_path,
+                   os.path.join(self.project.address, 'link.txt'))
+        os.symlink(folder.real_path,
+                   os.path.join(self.project.address, 'link'))
+        folder.create_file('file.txt')
+        self.assertEquals(set([myfile, folder.get_child('file.txt')]),
+                          self.project.get_files())
+
+    def test_updating_file_list_after_creations(self):
+        self.project = testutils.sample_project(
+            ignored_resources=['build'], ropefolder=None)
+        myfile = self.project.root.create_file('myfile.txt')
+        files = self.project.get_files()
+        folder = self.project.root.create_folder('folder')
+        mod = folder.create_file('mod.py')
+        self.project.root.create_folder('build').create_file('mod.py')
+        self.assertEquals(set([myfile]), files)
+        self.assertEquals(set([myfile, mod]), self.project.get_files())
+        self.assertEquals([mod], self.project.pycore.get_python_files())
+
+    def test_updating_file_list_after_removals_and_moves(self):
+        self.project = testutils.sample_project(ropefolder=None)
+        folder = self.project.root.create_folder('folder')
+        mod1 = folder.create_file('mod1.py')
+        mod2 = self.project.root.create_file('mod2.py')
+        self.assertEquals(2, len(self.project.pycore.get_python_files()))
+        folder.move('pkg')
+        mod2.remove()
+        pkg = self.project.get_folder('pkg')
+        self.assertEquals(set([pkg.get_child('mod1.py')]),
+                          self.project.get_files())
+        self.assertEquals([pkg.get_child('mod1.py')],
+                          self.project.pycore.get_python_files())
+
+    def test_updating_file_list_after_validating_folders(self):
+        self.project = testutils.sample_project(ropefolder=None)
+        folder = self.project.root.create_folder('folder')
+        mod1 = folder.create_file('mod1.py')
+        self.project.get_files()
+        os.remove(mod1.real_path)
+        open(os.path.join(folder.real_path, 'mod2.py'), 'w').close()
+        self.project.validate(folder)
+        self.assertEquals(set([folder.get_child('mod2.py')]),
+                          self.project.get_files())
+
     def test_setting_ignored_resources_patterns(self):
         self.project = testutils.sample_project(ignored_resources=['m?file.*'])
         myfile = self.project.get_file('myfile.txt')
@@ -946,12 +1111,113 @@ class RopeFolderTest(unittest.TestCase):
         self.assertTrue(ropefolder.exists())
 
 
+class GITCommandsTest(unittest.TestCase):
+
+    def setUp(self):
+        super(GITCommandsTest, self).setUp()
+        self.project = testutils.sample_project(
+            foldername='sample_git_project', ropefolder=None)
+        self._git('init', '-q')
+        self.project.close()
+        self.project = Project(self.project.address, ropefolder=None)
+        self.commands = []
+        do = self.project.fscommands._do
+        def log_commands(args, input=None):
+            self.commands.append(args[0])
+            do(args, input)
+        self.project.fscommands._do = log_commands
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(GITCommandsTest, self).tearDown()
+
+    def _git(self, *args):
+        process = subprocess.Popen(('git',) + args, stdout=subprocess.PIPE,
+                                   cwd=self.project.address)
+        return process.communicate()[0]
+
+    def _get_index(self):
+        result = {}
+        for line in self._git('ls-files', '-s').splitlines():
+            info, path = line.split('\t')
+            result[path] = info.split()[1]
+        return result
+
+    def _create_files(self, parent, names):
+        changes = ChangeSet('create')
+        for name in names:
+            changes.add_change(CreateFile(parent, name))
+        self.project.do(changes)
+
+    def test_git_commands(self):
+        self.assertTrue(isinstance(self.project.fscommands,
+                                   fscommands.GITCommands))
+
+    def test_batching_created_files(self):
+        self._create_files(self.project.root, ['mod1.py', 'mod2.py'])
+        self.assertEquals(['mod1.py', 'mod2.py'],
+                          sorted(self._get_index()))
+        self.assertEquals(['add'], self.commands)
+
+    def test_batching_moves(self):
+        pkg = self.project.root.create_folder('pkg')
+        self._create_files(pkg, ['mod1.py', 'mod2.py'])
+        mod3 = self.project.root.create_file('mod3.py')
+        old_index = self._get_index()
+        pkg.get_child('mod1.py').write('changed\n')
+        changes = ChangeSet('move')
+        changes.add_change(MoveResource(pkg, 'newpkg'))
+        changes.add_change(MoveResource(mod3, 'newpkg/mod3.py'))
+        self.commands = []
+        self.project.do(changes)
+        self.assertEquals(
+            {'newpkg/mod1.py': old_index['pkg/mod1.py'],
+             'newpkg/mod2.py': old_index['pkg/mod2.py'],
+             'newpkg/mod3.py': old_index['mod3.py']}, self._get_index())
+        self.assertEquals(['update-index'], self.commands)
+        self.assertEquals('changed\n', self.project.get_file(
+            'newpkg/mod1.py').read())
+
+    def test_undoing_batched_moves(self):
+        self._create_files(self.project.root, ['mod1.py'])
+        old_index = self._get_index()
+        changes = ChangeSet('move')
+        changes.add_change(MoveResource(self.project.get_file('mod1.py'),
+                                        'mod2.py'))
+        changes.add_change(CreateFile(self.project.root, 'mod1.py'))
+        self.project.do(changes)
+        self.assertEquals(['mod1.py', 'mod2.py'], sorted(self._get_index()))
+        self.project.history.undo()
+        self.assertEquals(old_index, self._get_index())
+        self.assertFalse(self.project.get_file('mod2.py').exists())
+
+    def test_batching_removals(self):
+        self._create_files(self.project.root, ['mod1.py', 'mod2.py'])
+        changes = ChangeSet('remove')
+        changes.add_change(MoveResource(self.project.get_file('mod1.py'),
+                                        'mod3.py'))
+        changes.add_change(RemoveResource(self.project.get_file('mod3.py')))
+        changes.add_change(RemoveResource(self.project.get_file('mod2.py')))
+        self.project.do(changes)
+        self.assertEquals({}, self._get_index())
+        self.assertFalse(self.project.get_file('mod2.py').exists())
+
+
+def _has_git():
+    try:
+        return fscommands._execute(['git', 'version']) == 0
+    except OSError:
+        return False
+
+
 def suite():
     result = unittest.TestSuite()
     result.addTests(unittest.makeSuite(ProjectTest))
     result.addTests(unittest.makeSuite(ResourceObserverTest))
     result.addTests(unittest.makeSuite(OutOfProjectTest))
     result.addTests(unittest.makeSuite(RopeFolderTest))
+    if _has_git():
+        result.addTests(unittest.makeSuite(GITCommandsTest))
     return result
 
 if __name__ == '__main__':
@@ -998,6 +998,43 @@ class PyCoreInProjectsTest(unittest.TestCase):
         mod1.write('class A(object):\n    def func2(self):\n        pass\n')
         self.assertTrue('func2' in b_class)
 
+    def test_recording_module_dependencies(self):
+        mod1 = testutils.create_module(self.project, 'mod1')
+        mod2 = testutils.create_module(self.project, 'mod2')
+        mod3 = testutils.create_module(self.project, 'mod3')
+        mod2.write('import mod1\n')
+        mod3.write('from mod2 import mod1\n')
+        self.pycore.resource_to_pyobject(mod3)['mod1'].get_object()
+        self.assertEquals(set([mod2, mod3]), self.pycore.get_dependents(mod1))
+        self.assertEquals(set([mod3]), self.pycore.get_dependents(mod2))
+        self.assertEquals(set(), self.pycore.get_dependents(mod3))
+
+    def test_not_forgetting_unrelated_modules_after_change(self):
+        mod1 = testutils.create_module(self.project, 'mod1')
+        mod2 = testutils.create_module(self.project, 'mod2')
+        mod3 = testutils.create_module(self.project, 'mod3')
+        mod1.write('class A(object):\n    pass\n')
+        mod2.write('import mod1\nclass B(mod1.A):\n    pass\n')
+        mod3.write('class C(object):\n    pass\n')
+        b_class = self.pycore.resource_to_pyobject(mod2)['B'].get_object()
+        pymod3 = self.pycore.resource_to_pyobject(mod3)
+        c_class = pymod3['C'].get_object()
+        b_class.get_superclasses()
+        c_class.get_attributes()
+        mod1.write('class A(object):\n    def f(self):\n        pass\n')
+        self.assertTrue(c_class.attributes.get() is not None)
+        self.assertTrue(b_class.attributes.get() is None)
+        self.assertTrue('f' in b_class)
+
+    def test_forgetting_dependency_edges_after_change(self):
+        mod1 = testutils.create_module(self.project, 'mod1')
+        mod2 = testutils.create_module(self.project, 'mod2')
+        mod2.write('import mod1\n')
+        self.pycore.resource_to_pyobject(mod2)['mod1'].get_object()
+        mod2.write('\n')
+        self.pycore.resource_to_pyobject(mod2)
+        self.assertEquals(set(), self.pycore.get_dependents(mod1))
+
     def test_caching_pymodule_with_syntax_errors(self):
         self.project.prefs['ignore_syntax_errors'] = True
         self.project.prefs['automatic_soa'] = True
@@ -1043,6 +1080,31 @@ class TextChangeDetectorTest(unittest.TestCase):
         self.assertTrue(detector.consume_changes(1, 2))
         self.assertFalse(detector.is_changed(1, 2))
 
+    def test_changing_similar_lines(self):
+        old = ''.join('var%s = %s\n' % (i, i) for i in range(100))
+        new = old.replace(' = 5', ' = 6').replace('var70', 'name70')
+        detector = _TextChangeDetector(new, old)
+        self.assertEquals([6] + range(51, 61) + [71], detector.lines)
+
+    def test_changing_blocks_of_lines(self):
+        old = ''.join('var%s = %s\n' % (i, i) for i in range(100))
+        new = old.replace('var2', 'name2').replace('var90 = 90\n', '')
+        detector = _TextChangeDetector(new, old)
+        self.assertEquals([3] + range(21, 31), detector.lines)
+
+    def test_too_many_changed_lines(self):
+        detector = _TextChangeDetector('1\n2\n3\n4\n5\n', '1\n3\n5\n')
+        detector.max_lines = 2
+        detector._set_diffs()
+        self.assertEquals([2, 3, 4], detector.lines)
+
+    def test_large_changed_files(self):
+        lines = ['line%s\n' % i for i in range(3000)]
+        old = ''.join(lines)
+        new = ''.join(['changed\n'] + lines[1:-1] + ['changed\n', 'added\n'])
+        detector = _TextChangeDetector(old, new)
+        self.assertEquals(range(1, 3001), detector.lines)
+
 
 class PyCoreProjectConfigsTest(unittest.TestCase):
 
@@ -205,6 +205,33 @@ class PyCoreScopesTest(unittest.TestCase):
         f_in_c = c_scope.get_scopes()[0]
         self.assertEquals(f_in_c, scope.get_inner_scope_for_line(7))
 
+    def test_get_inner_scope_for_line_in_many_scopes(self):
+        code = ''.join('def f%d():\n    pass\n\n' % i for i in range(20))
+        code += 'class C(object):\n\n    def g(self):\n        pass\n' \
+                'var = 1\n'
+        scope = self.pycore.get_string_scope(code)
+        c_scope = scope['C'].get_object().get_scope()
+        g_scope = c_scope.get_scopes()[0]
+        self.assertEquals(scope, scope.get_inner_scope_for_line(65))
+        self.assertEquals(g_scope, scope.get_inner_scope_for_line(64))
+        self.assertEquals(c_scope, scope.get_inner_scope_for_line(61))
+        self.assertEquals(scope['f19'].get_object().get_scope(),
+                          scope.get_inner_scope_for_line(59))
+        self.assertEquals(scope, scope.get_inner_scope_for_line(30))
+        self.assertEquals(scope['f5'].get_object().get_scope(),
+                          scope.get_inner_scope_for_line(17))
+        self.assertEquals(scope['f0'].get_object().get_scope(),
+                          scope.get_inner_scope_for_line(2))
+
+    def test_get_inner_scope_for_line_and_overlapping_scopes(self):
+        scope = self.pycore.get_string_scope(
+            'def f():\n    """\ndoc"""\n    pass\n'
+            'def g():\n    pass\n')
+        f_scope = scope.get_scopes()[0]
+        self.assertEquals(f_scope.get_end(),
+                          scope.get_scopes()[1].get_end())
+        self.assertEquals(f_scope, scope.get_inner_scope_for_line(6))
+
     def test_getting_defined_names_for_classes(self):
         scope = self.pycore.get_string_scope(
             'class A(object):\n    def a(self):\n        pass\n'
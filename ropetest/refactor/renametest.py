@@ -169,6 +169,16 @@ class RenameRefactoringTest(unittest.TestCase):
                           mod1.read())
         self.assertEquals('import mod1\nmod1.new_func()\n', mod2.read())
 
+    def test_renaming_functions_in_worker_processes(self):
+        mod1 = testutils.create_module(self.project, 'mod1')
+        mod1.write('def a_func():\n    pass\na_func()\n')
+        mod2 = testutils.create_module(self.project, 'mod2')
+        mod2.write('import mod1\nmod1.a_func()\n')
+        self._rename(mod1, len(mod1.read()) - 5, 'new_func', processes=2)
+        self.assertEquals('def new_func():\n    pass\nnew_func()\n',
+                          mod1.read())
+        self.assertEquals('import mod1\nmod1.new_func()\n', mod2.read())
+
     def test_renaming_functions_across_modules_from_import(self):
         mod1 = testutils.create_module(self.project, 'mod1')
         mod1.write('def a_func():\n    pass\na_func()\n')
@@ -0,0 +1,113 @@
+import unittest
+
+import rope.base.project
+from rope.base import summaries
+from ropetest import testutils
+
+
+class SummaryTest(unittest.TestCase):
+
+    def test_global_names(self):
+        code = 'import os.path\nfrom sys import argv as args\n' \
+               'a_var = 1\nb, (c, d) = 1, (2, 3)\n' \
+               'class C(object):\n    attr = 1\n' \
+               'def f():\n    local = 1\n'
+        summary = summaries.summarize(code)
+        self.assertEquals({'os': 'imported', 'args': 'imported',
+                           'a_var': 'assigned', 'b': 'assigned',
+                           'c': 'assigned', 'd': 'assigned',
+                           'C': 'class', 'f': 'function'}, summary.names)
+
+    def test_names_in_blocks(self):
+        code = 'try:\n    import json\nexcept ImportError:\n' \
+               '    json = None\nif True:\n    def f():\n        pass\n' \
+               'for i in range(2):\n    pass\n'
+        summary = summaries.summarize(code)
+        self.assertEquals(['f', 'i', 'json'], sorted(summary.get_names()))
+        self.assertEquals(['f'], summary.get_names(['function']))
+
+    def test_scopes(self):
+        code = 'class C(object):\n\n    def f(self):\n        pass\n\n' \
+               'def g(a,\n      b):\n    if a:\n        return (a,\n' \
+               '                b)\n'
+        summary = summaries.summarize(code)
+        self.assertEquals([('class', 'C', 1, 4), ('function', 'C.f', 3, 4),
+                           ('function', 'g', 6, 10)], summary.scopes)
+
+    def test_imports(self):
+        code = 'import os\nfrom . import mod\nfrom ..pkg import name\n' \
+               'def f():\n    import sys\n'
+        summary = summaries.summarize(code)
+        self.assertEquals([('os', 0), ('', 1), ('pkg', 2), ('sys', 0)],
+                          summary.imports)
+
+    def test_syntax_errors(self):
+        summary = summaries.summarize('a_var = 1\nsyntax error\n')
+        self.assertEquals(2, summary.syntax_error[0])
+        self.assertEquals({}, summary.names)
+
+
+class SummaryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        super(SummaryCacheTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.pycore = self.project.pycore
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(SummaryCacheTest, self).tearDown()
+
+    def test_getting_summaries(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('def f():\n    pass\n')
+        self.assertEquals(['f'], self.pycore.get_summary(mod).get_names())
+
+    def test_caching_summaries(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('def f():\n    pass\n')
+        summary = self.pycore.get_summary(mod)
+        self.assertTrue(summary is self.pycore.get_summary(mod))
+
+    def test_summaries_after_changes(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('def f():\n    pass\n')
+        self.pycore.get_summary(mod)
+        mod.write('def g():\n    pass\n')
+        self.assertEquals(['g'], self.pycore.get_summary(mod).get_names())
+
+    def test_not_summarizing_parsed_modules(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('var = 1\n')
+        self.pycore.resource_to_pyobject(mod)
+        cache = self.pycore.summary_cache
+        self.assertTrue(cache.lookup(mod, mod.read()) is None)
+
+    def test_saving_summaries(self):
+        self.project.prefs['save_summaries'] = True
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('var = 1\n')
+        self.pycore.get_summary(mod)
+        self.project.close()
+        self.project = rope.base.project.Project(self.project.address,
+                                                 save_summaries=True)
+        cache = self.project.pycore.summary_cache
+        self.assertEquals(['var'], cache.lookup(mod, mod.read()).get_names())
+
+    def test_forgetting_removed_files(self):
+        mod = testutils.create_module(self.project, 'mod')
+        mod.write('var = 1\n')
+        self.pycore.get_summary(mod)
+        mod.remove()
+        self.assertFalse('mod.py' in self.pycore.summary_cache.summaries)
+
+
+def suite():
+    result = unittest.TestSuite()
+    result.addTests(unittest.makeSuite(SummaryTest))
+    result.addTests(unittest.makeSuite(SummaryCacheTest))
+    return result
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,6 +16,7 @@ def sample_project(root=None, foldername=None, **kwds):
             root = '/dev/shm/' + root
     # Using these prefs for faster tests
     prefs = {'save_objectdb': False, 'save_history': False,
+             'save_summaries': False, 'save_nameindex': False,
              'validate_objectdb': False, 'automatic_soa': False,
              'ignored_resources': ['.ropeproject', '*.pyc'],
              'import_dynload_stdmods': False}
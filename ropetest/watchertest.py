@@ -0,0 +1,135 @@
+import os
+import shutil
+import unittest
+
+from rope.base import watcher
+from rope.base.resourceobserver import (ResourceObserver,
+                                        FilteredResourceObserver)
+from ropetest import testutils
+
+
+class PollingWatcherTest(unittest.TestCase):
+
+    polling = True
+
+    def setUp(self):
+        super(PollingWatcherTest, self).setUp()
+        self.project = testutils.sample_project(
+            ignored_resources=['build', '.ropeproject'])
+        self.mod = self.project.root.create_file('mod.py')
+        self.folder = self.project.root.create_folder('folder')
+        self.watcher = watcher.Watcher(self.project, delay=0,
+                                       polling=self.polling, interval=0)
+
+    def tearDown(self):
+        self.watcher.close()
+        testutils.remove_project(self.project)
+        super(PollingWatcherTest, self).tearDown()
+
+    def _write(self, path, contents):
+        output = open(os.path.join(self.project.address, path), 'w')
+        output.write(contents)
+        output.close()
+
+    def _observe(self, resource):
+        events = []
+        observer = ResourceObserver(
+            changed=lambda resource: events.append(('changed', resource)),
+            removed=lambda resource: events.append(('removed', resource)),
+            created=lambda resource: events.append(('created', resource)))
+        self.project.add_observer(FilteredResourceObserver(observer,
+                                                           [resource]))
+        return events
+
+    def test_no_changes(self):
+        self.assertEquals(0, self.watcher.check())
+
+    def test_changed_files(self):
+        events = self._observe(self.mod)
+        self._write('mod.py', 'var = 1\n')
+        self.assertEquals(1, self.watcher.check())
+        self.assertEquals([('changed', self.mod)], events)
+        self.assertEquals(0, self.watcher.check())
+
+    def test_changed_modules(self):
+        pymod = self.project.pycore.resource_to_pyobject(self.mod)
+        self._write('mod.py', 'var = 1\n')
+        self.watcher.check()
+        pymod = self.project.pycore.resource_to_pyobject(self.mod)
+        self.assertTrue('var' in pymod)
+
+    def test_created_and_removed_files(self):
+        self.project.get_files()
+        self._write('folder/mod2.py', '\n')
+        os.remove(self.mod.real_path)
+        self.watcher.check()
+        self.assertEquals(set([self.folder.get_child('mod2.py')]),
+                          self.project.get_files())
+
+    def test_removed_folders(self):
+        mod2 = self.folder.create_file('mod2.py')
+        events = self._observe(mod2)
+        shutil.rmtree(self.folder.real_path)
+        self.assertEquals(1, self.watcher.check())
+        self.assertEquals([('removed', mod2)], events)
+
+    def test_created_folders(self):
+        self.project.get_files()
+        os.mkdir(os.path.join(self.project.address, 'pkg'))
+        self._write('pkg/mod2.py', '\n')
+        self.watcher.check()
+        self.assertEquals(2, len(self.project.get_files()))
+        self._write('pkg/mod3.py', '\n')
+        self.watcher.check()
+        self.assertEquals(3, len(self.project.get_files()))
+
+    def test_ignored_resources(self):
+        os.mkdir(os.path.join(self.project.address, 'build'))
+        self._write('build/mod2.py', '\n')
+        self.assertEquals(0, self.watcher.check())
+
+    def test_delaying_validations(self):
+        self.watcher.delay = 60
+        events = self._observe(self.mod)
+        self._write('mod.py', 'var = 1\n')
+        self.assertEquals(0, self.watcher.check())
+        self.assertEquals([], events)
+        self.watcher.delay = 0
+        self.assertEquals(1, self.watcher.check())
+        self.assertEquals([('changed', self.mod)], events)
+
+
+class InotifyWatcherTest(PollingWatcherTest):
+
+    # falls back to polling where inotify is not available
+    polling = False
+
+    def test_moved_folders(self):
+        mod2 = self.folder.create_file('mod2.py')
+        self.project.get_files()
+        os.rename(self.folder.real_path,
+                  os.path.join(self.project.address, 'pkg'))
+        self.watcher.check()
+        self._write('pkg/mod3.py', '\n')
+        self._write('folder2', '\n')
+        self.watcher.check()
+        pkg = self.project.get_folder('pkg')
+        self.assertEquals(
+            set([self.mod, pkg.get_child('mod2.py'), pkg.get_child('mod3.py'),
+                 self.project.get_file('folder2')]),
+            self.project.get_files())
+
+    def test_file_descriptor(self):
+        self.assertEquals(self.watcher.polling,
+                          self.watcher.fileno() is None)
+
+
+def suite():
+    result = unittest.TestSuite()
+    result.addTests(unittest.makeSuite(PollingWatcherTest))
+    result.addTests(unittest.makeSuite(InotifyWatcherTest))
+    return result
+
+
+if __name__ == '__main__':
+    unittest.main()